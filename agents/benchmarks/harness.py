@@ -0,0 +1,76 @@
+"""Small helpers shared by the benchmark scripts in this directory."""
+
+import importlib.util
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+AGENTS_DIR = Path(__file__).resolve().parents[1]
+TASK_MANAGER_PATH = AGENTS_DIR / "task_manager" / "task_manager.py"
+CALCULATOR_PATH = AGENTS_DIR / "examples" / "calculator" / "main.py"
+
+if str(AGENTS_DIR) not in sys.path:
+    sys.path.insert(0, str(AGENTS_DIR))
+
+
+def load_script(path: Path, name: str) -> ModuleType:
+    """Import an agent script by path without running its ``__main__`` block."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile, ``q`` in [0, 100]."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Latency summary in milliseconds for samples given in seconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def environment() -> dict[str, Any]:
+    """Where the numbers came from, so result files can be compared between commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=AGENTS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def write_json(path: Path, benchmark: str, results: Any) -> None:
+    payload = {"benchmark": benchmark, "environment": environment(), "results": results}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n")
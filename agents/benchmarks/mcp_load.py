@@ -0,0 +1,423 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# dependencies = [
+#   "claude-code-sdk==0.0.22",
+#   "numpy",
+#   "rich",
+# ]
+# requires-python = ">=3.11"
+# ///
+"""Load generator for the SDK MCP servers, in process or shared (no model, no CLI).
+
+Tools are called through the same MCP request path the CLI uses:
+``tools/list`` once, then ``tools/call`` requests handed to the server's
+request handler. That path includes input validation against the tool's JSON
+schema and the SDK's result conversion. ``concurrency`` workers pick a tool
+from a weighted mix for ``duration`` seconds, generate its arguments, call it
+and record the latency. Results are per tool: throughput, latency percentiles
+and error rate.
+
+    uv run agents/benchmarks/mcp_load.py task_manager --concurrency 1 16 --duration 10
+    uv run agents/benchmarks/mcp_load.py calculator --mix mix.json --json load.json
+
+With ``--server-url`` the calls go over SSE to a server started with
+``task_manager.py serve`` instead. ``--sessions`` opens several client
+sessions, like several agent processes sharing the server, and spreads the
+workers over them. The server's data is used as is (no seeding). A server
+that needs a token gets it from ``TASK_SERVER_TOKEN``, as the agents do.
+
+A mix file is a JSON list of ``{"tool": ..., "weight": ..., "args": {...}}``.
+Each argument is either a literal or a generator:
+
+    {"choice": [...]}              one of the values
+    {"int": [lo, hi]}              integer in [lo, hi]
+    {"float": [lo, hi]}            float in [lo, hi]
+    {"list": {"len": [lo, hi], "of": <generator>}}
+
+claude-code-sdk 0.0.22 does not pass ``is_error`` through to the MCP result.
+A call therefore counts as an error when ``isError`` is set (exceptions,
+schema validation) or when its text starts with ``Error`` or ``❌``, which is
+how the tools in this repository report failures.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.types import (
+    CallToolRequest,
+    CallToolRequestParams,
+    CallToolResult,
+    ListToolsRequest,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import (  # noqa: E402
+    CALCULATOR_PATH,
+    TASK_MANAGER_PATH,
+    load_script,
+    summarize,
+    write_json,
+)
+from common.mcp_serve import auth_headers  # noqa: E402
+
+ERROR_TEXT = re.compile(r"^\s*(Error\b|❌)")
+WARMUP_CALLS = 20
+
+
+def generate(spec: Any, rng: random.Random) -> Any:
+    """Draw one value from an argument spec (see the module docstring)."""
+    if not isinstance(spec, dict) or len(spec) != 1:
+        return spec
+    ((kind, params),) = spec.items()
+    if kind == "choice":
+        return rng.choice(params)
+    if kind == "int":
+        return rng.randint(*params)
+    if kind == "float":
+        return rng.uniform(*params)
+    if kind == "list":
+        length = rng.randint(*params["len"])
+        return [generate(params["of"], rng) for _ in range(length)]
+    return spec
+
+
+def task_manager_mix(seed_tasks: int) -> list[dict[str, Any]]:
+    tm = load_script(TASK_MANAGER_PATH, "task_manager")
+    last_id = max(1, seed_tasks)
+    return [
+        {
+            "tool": "list_tasks",
+            "weight": 4,
+            "args": {
+                "status_filter": {"choice": ["", *tm.TASK_STATUSES]},
+                "priority_filter": {"choice": ["", *tm.TASK_PRIORITIES]},
+            },
+        },
+        {"tool": "task_stats", "weight": 1, "args": {"days": {"choice": [7, 14, 30]}}},
+        {
+            "tool": "changes_since",
+            "weight": 1,
+            "args": {"cursor": {"int": [0, last_id]}, "limit": 50},
+        },
+        {
+            "tool": "add_task",
+            "weight": 1,
+            "args": {
+                "name": "負荷テスト",
+                "priority": {"choice": tm.TASK_PRIORITIES},
+            },
+        },
+        {
+            "tool": "change_task_status",
+            "weight": 1,
+            "args": {
+                "task_id": {"int": [1, last_id]},
+                "status": {"choice": tm.TASK_STATUSES},
+            },
+        },
+    ]
+
+
+def calculator_mix() -> list[dict[str, Any]]:
+    number = {"float": [-1e6, 1e6]}
+    return [
+        *(
+            {"tool": op, "weight": 2, "args": {"a": number, "b": number}}
+            for op in ("add", "subtract", "multiply", "divide")
+        ),
+        {"tool": "sqrt", "weight": 1, "args": {"n": {"float": [0, 1e6]}}},
+        {
+            "tool": "evaluate",
+            "weight": 2,
+            "args": {
+                "expression": {
+                    "choice": ["(12 + 8) * 3 - 10", "2 ** 10 / 7", "sqrt(2) * pi"]
+                }
+            },
+        },
+        {
+            "tool": "batch_sqrt",
+            "weight": 1,
+            "args": {
+                "values": {"list": {"len": [10, 1000], "of": {"float": [0, 1e6]}}}
+            },
+        },
+        {
+            "tool": "reduce",
+            "weight": 1,
+            "args": {
+                "operation": {"choice": ["sum", "mean", "min", "max"]},
+                "values": {"list": {"len": [10, 1000], "of": number}},
+            },
+        },
+    ]
+
+
+def seed_tasks(tm: Any, size: int, rng: random.Random) -> None:
+    def insert(conn: sqlite3.Connection) -> None:
+        with conn:
+            conn.executemany(
+                "INSERT INTO tasks (name, priority, status) VALUES (?, ?, ?)",
+                (
+                    (
+                        f"タスク {i}",
+                        rng.choice(tm.TASK_PRIORITIES),
+                        rng.choice(tm.TASK_STATUSES),
+                    )
+                    for i in range(size)
+                ),
+            )
+
+    tm.store.call(insert)
+
+
+def open_server(name: str, data_dir: Path, *, seed: int, rng: random.Random) -> Any:
+    """Build the server the way the agent script does; returns the MCP ``Server``."""
+    if name == "task_manager":
+        tm = load_script(TASK_MANAGER_PATH, "task_manager")
+        tm.open_store(data_dir)
+        if seed:
+            seed_tasks(tm, seed, rng)
+        return tm.create_task_server()["instance"]
+    calculator = load_script(CALCULATOR_PATH, "calculator")
+    return calculator.create_calculator_server()["instance"]
+
+
+@dataclass
+class ToolLoad:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    messages: Counter[str] = field(default_factory=Counter)
+
+    def record(self, elapsed: float, error: str | None) -> None:
+        self.latencies.append(elapsed)
+        if error is not None:
+            self.errors += 1
+            self.messages[error[:80]] += 1
+
+
+class InProcess:
+    """Calls the server's request handlers directly, as the SDK transport does."""
+
+    def __init__(self, server: Any) -> None:
+        self.server = server
+
+    async def list_tools(self) -> set[str]:
+        handler = self.server.request_handlers[ListToolsRequest]
+        listed = await handler(ListToolsRequest(method="tools/list"))
+        return {t.name for t in listed.root.tools}
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> CallToolResult:
+        request = CallToolRequest(
+            method="tools/call",
+            params=CallToolRequestParams(name=tool, arguments=arguments),
+        )
+        return (await self.server.request_handlers[CallToolRequest](request)).root
+
+
+class Remote:
+    """One MCP client session to a shared server."""
+
+    def __init__(self, session: ClientSession) -> None:
+        self.session = session
+
+    async def list_tools(self) -> set[str]:
+        return {t.name for t in (await self.session.list_tools()).tools}
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> CallToolResult:
+        return await self.session.call_tool(tool, arguments)
+
+
+async def call_tool(target: Any, tool: str, arguments: dict[str, Any]) -> str | None:
+    """One ``tools/call`` round trip; returns an error message or None."""
+    try:
+        result = await target.call(tool, arguments)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    text = "".join(c.text for c in result.content if getattr(c, "text", None))
+    if result.isError or ERROR_TEXT.match(text):
+        return text.strip().splitlines()[0] if text.strip() else "isError"
+    return None
+
+
+async def run_load(
+    targets: list[Any],
+    mix: list[dict[str, Any]],
+    *,
+    concurrency: int,
+    duration: float,
+    rng: random.Random,
+) -> tuple[dict[str, ToolLoad], float]:
+    tools = [entry["tool"] for entry in mix]
+    weights = [entry.get("weight", 1) for entry in mix]
+    specs = {entry["tool"]: entry.get("args", {}) for entry in mix}
+    loads = {tool: ToolLoad() for tool in tools}
+    deadline = time.perf_counter() + duration
+
+    async def worker(target: Any) -> None:
+        while time.perf_counter() < deadline:
+            tool = rng.choices(tools, weights)[0]
+            arguments = {k: generate(v, rng) for k, v in specs[tool].items()}
+            started = time.perf_counter()
+            error = await call_tool(target, tool, arguments)
+            loads[tool].record(time.perf_counter() - started, error)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(worker(targets[i % len(targets)]) for i in range(concurrency))
+    )
+    return loads, time.perf_counter() - started
+
+
+def report(loads: dict[str, ToolLoad], elapsed: float, concurrency: int) -> list[dict]:
+    rows = []
+    everything = ToolLoad()
+    for tool, load in [*loads.items(), ("(all)", everything)]:
+        if tool != "(all)":
+            everything.latencies += load.latencies
+            everything.errors += load.errors
+            everything.messages.update(load.messages)
+        calls = len(load.latencies)
+        if not calls:
+            continue
+        stats = summarize(load.latencies)
+        row = {
+            "tool": tool,
+            "concurrency": concurrency,
+            **stats,
+            "errors": load.errors,
+            "error_rate": load.errors / calls,
+            "throughput_per_s": calls / elapsed if elapsed else 0.0,
+            "top_errors": dict(load.messages.most_common(3)),
+        }
+        rows.append(row)
+        print(
+            f"{tool:<20} c={concurrency:<4} {calls:>7} calls "
+            f"{row['throughput_per_s']:>9.1f}/s  p50 {stats['p50_ms']:8.2f}  "
+            f"p90 {stats['p90_ms']:8.2f}  p99 {stats['p99_ms']:8.2f} ms  "
+            f"errors {row['error_rate']:6.1%}"
+        )
+    for message, count in everything.messages.most_common(3):
+        print(f"    {count:>6} × {message}")
+    return rows
+
+
+async def open_targets(
+    args: argparse.Namespace, stack: AsyncExitStack, rng: random.Random
+) -> list[Any]:
+    if args.server_url is None:
+        data_dir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        server = open_server(args.server, data_dir, seed=args.seed_tasks, rng=rng)
+        if args.server == "task_manager":
+            tm = load_script(TASK_MANAGER_PATH, "task_manager")
+            stack.callback(tm.store.close)
+        return [InProcess(server)]
+
+    headers = auth_headers(os.environ.get("TASK_SERVER_TOKEN"))
+    if args.project:
+        headers["X-Task-Project"] = args.project
+    targets = []
+    for _ in range(args.sessions):
+        read, write = await stack.enter_async_context(
+            sse_client(args.server_url, headers=headers)
+        )
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        targets.append(Remote(session))
+    return targets
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("server", choices=["task_manager", "calculator"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="seconds per concurrency level"
+    )
+    parser.add_argument(
+        "--mix", type=Path, help="JSON file with the tool mix (default: built in)"
+    )
+    parser.add_argument("--tools", nargs="+", help="only call these tools of the mix")
+    parser.add_argument(
+        "--seed-tasks",
+        type=int,
+        default=10_000,
+        help="tasks inserted before an in-process task_manager run",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--server-url", help="SSE endpoint of a shared server (task_manager.py serve)"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=1, help="client sessions with --server-url"
+    )
+    parser.add_argument("--project", help="project header sent with --server-url")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    if args.mix:
+        mix = json.loads(args.mix.read_text(encoding="utf-8"))
+    elif args.server == "task_manager":
+        mix = task_manager_mix(args.seed_tasks)
+    else:
+        mix = calculator_mix()
+    if args.tools:
+        mix = [entry for entry in mix if entry["tool"] in args.tools]
+
+    results = []
+    rng = random.Random(args.seed)
+    async with AsyncExitStack() as stack:
+        targets = await open_targets(args, stack, rng)
+        # like the CLI: list the tools first (this also enables input validation)
+        for target in targets:
+            available = await target.list_tools()
+        missing = [entry["tool"] for entry in mix if entry["tool"] not in available]
+        if missing:
+            parser.error(
+                f"unknown tools {missing}; {args.server} has {sorted(available)}"
+            )
+        if not mix:
+            parser.error("the mix is empty (check --tools)")
+
+        for entry in mix:  # warm caches and lazy imports outside the measurement
+            for _ in range(WARMUP_CALLS // len(mix) + 1):
+                spec = entry.get("args", {})
+                await call_tool(
+                    targets[0],
+                    entry["tool"],
+                    {k: generate(v, rng) for k, v in spec.items()},
+                )
+
+        for concurrency in args.concurrency:
+            loads, elapsed = await run_load(
+                targets,
+                mix,
+                concurrency=concurrency,
+                duration=args.duration,
+                rng=rng,
+            )
+            results += report(loads, elapsed, concurrency)
+
+    if args.json:
+        where = "shared" if args.server_url else "in-process"
+        write_json(args.json, f"mcp_load:{args.server}:{where}", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# dependencies = [
+#   "claude-code-sdk==0.0.22",
+#   "numpy",
+#   "rich",
+# ]
+# requires-python = ">=3.11"
+# ///
+"""Run the task manager and calculator agent loops offline and time them.
+
+Each iteration connects an ``OfflineClient``, sends one prompt, lets the
+scripted turn call the real SDK MCP tools and hooks, renders the response and
+disconnects. Nothing leaves the process, so the numbers only contain our own
+code: control protocol, hooks, tool handlers, database and rendering.
+
+Before timing, a scripted two-query session (and its resumption in a new
+client) checks that the metrics record each response's own cost.
+
+    uv run agents/benchmarks/offline_agents.py --iterations 200 --json out.json
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from claude_code_sdk import ClaudeCodeOptions
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import (  # noqa: E402
+    CALCULATOR_PATH,
+    TASK_MANAGER_PATH,
+    load_script,
+    summarize,
+    write_json,
+)
+from common.metrics import MetricsCollector, SessionCosts  # noqa: E402
+from common.offline import OfflineClient, Say, Turn, UseTool  # noqa: E402
+from common.streaming import PlainRenderer, ResponseConsumer, RichRenderer  # noqa: E402
+
+
+def task_manager_scenario():
+    task_manager = load_script(TASK_MANAGER_PATH, "task_manager")
+    task_manager.open_store(Path(tempfile.mkdtemp()))
+    turn = Turn(
+        [
+            Say("タスクを追加して一覧を確認します。"),
+            UseTool(
+                "mcp__task_manager__add_task", {"name": "設計書作成", "priority": "高"}
+            ),
+            UseTool(
+                "mcp__task_manager__list_tasks",
+                {"status_filter": "", "priority_filter": "高"},
+            ),
+            UseTool(
+                "mcp__task_manager__change_task_status",
+                {"task_id": 1, "status": "進行中"},
+            ),
+            Say("完了しました。"),
+        ]
+    )
+    return task_manager.build_options(), turn
+
+
+def calculator_scenario():
+    calculator = load_script(CALCULATOR_PATH, "calculator_example")
+    turn = Turn(
+        [
+            UseTool("mcp__calc__evaluate", {"expression": "(12 + 8) * 3 - 10"}),
+            UseTool("mcp__calc__batch_sqrt", {"values": list(range(1000))}),
+            Say("(12 + 8) * 3 - 10 = 50"),
+        ]
+    )
+    return calculator.build_options(), turn
+
+
+SCENARIOS = {"task_manager": task_manager_scenario, "calculator": calculator_scenario}
+
+
+async def check_metric_costs() -> None:
+    """Fail unless per-response costs survive the CLI's running session total."""
+    expected = [0.01, 0.02, 0.04]
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics = MetricsCollector(Path(tmp) / "metrics.jsonl")
+        turns = iter(Turn([Say("ok")], cost_usd=cost) for cost in expected)
+        script = lambda prompt: next(turns)  # noqa: E731
+        async with OfflineClient(script=script) as client:
+            for prompt in ("first", "second"):
+                await client.query(prompt)
+                await ResponseConsumer().consume(
+                    metrics.observe(client.receive_response())
+                )
+            session_id = client.transport.session_id
+        # resumed by a new client, whose running total starts again from zero
+        options = ClaudeCodeOptions(resume=session_id)
+        costs = SessionCosts()
+        async with OfflineClient(options, script=script) as client:
+            await client.query("third")
+            await ResponseConsumer().consume(
+                metrics.observe(client.receive_response(), costs=costs)
+            )
+
+        recorded = [round(entry["cost_usd"], 6) for entry in metrics.entries()]
+        (session,) = metrics.rollup("session")
+        if recorded != expected or round(session.cost_usd, 6) != round(
+            sum(expected), 6
+        ):
+            raise SystemExit(
+                f"metrics recorded costs {recorded} (session {session.cost_usd:.4f}), "
+                f"expected {expected}"
+            )
+
+
+def make_renderer(kind: str) -> ResponseConsumer:
+    if kind == "rich":
+        from rich.console import Console
+
+        return RichRenderer(Console(file=io.StringIO(), width=100))
+    if kind == "plain":
+        return PlainRenderer(io.StringIO(), show_tool_results=True)
+    return ResponseConsumer()
+
+
+async def run_scenario(name: str, iterations: int, render: str) -> dict:
+    options, turn = SCENARIOS[name]()
+    connect_times, turn_times, total_times = [], [], []
+    tool_calls = 0
+
+    for _ in range(iterations):
+        renderer = make_renderer(render)
+        started = time.perf_counter()
+        async with OfflineClient(options, script=lambda prompt: turn) as client:
+            connected = time.perf_counter()
+            await client.query("benchmark")
+            await renderer.consume(client.receive_response())
+            finished = time.perf_counter()
+            tool_calls += client.transport.tool_calls
+        connect_times.append(connected - started)
+        turn_times.append(finished - connected)
+        total_times.append(time.perf_counter() - started)
+
+    elapsed = sum(total_times)
+    return {
+        "scenario": name,
+        "render": render,
+        "iterations": iterations,
+        "tool_calls": tool_calls,
+        "turns_per_s": iterations / elapsed if elapsed else 0.0,
+        "connect": summarize(connect_times),
+        "turn": summarize(turn_times),
+        "total": summarize(total_times),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--render", choices=["rich", "plain", "none"], default="rich")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    await check_metric_costs()
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = []
+    for name in names:
+        result = await run_scenario(name, args.iterations, args.render)
+        results.append(result)
+        print(
+            f"{name:<14} {result['turns_per_s']:8.1f} turns/s  "
+            f"turn p50 {result['turn']['p50_ms']:7.2f} ms  "
+            f"p99 {result['turn']['p99_ms']:7.2f} ms  "
+            f"connect p50 {result['connect']['p50_ms']:6.2f} ms"
+        )
+
+    if args.json:
+        write_json(args.json, "offline_agents", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,279 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# dependencies = [
+#   "claude-code-sdk==0.0.22",
+#   "numpy",
+#   "rich",
+# ]
+# requires-python = ">=3.11"
+# ///
+"""Cold start of the agent scripts: wall time and an import-time breakdown.
+
+Every scenario starts a fresh interpreter. The timed runs measure the wall time
+until the process exits, or for interactive scenarios until the first prompt
+is printed (time to first prompt). One extra run with ``-X importtime`` gives
+the self time per top-level package.
+
+Headless scenarios also list modules they must not import themselves, such as
+rich for the batch mode. An import only counts if it comes from our own code:
+third-party packages sometimes pull rich in on their own (httpx does when its
+CLI extras happen to be installed), and that is not something a lazy import on
+our side can avoid.
+
+    uv run agents/benchmarks/startup.py --runs 10 --json startup.json
+    uv run agents/benchmarks/startup.py --budget-ms 1500 --budget task_manager.batch=1200
+
+The script exits with status 1 when a scenario imports a forbidden module.
+Timings are report-only by default, because wall times depend on the machine.
+Pass ``--budget-ms`` / ``--budget`` to also fail when a scenario's p50 is over
+its budget, which makes the script usable as a CI regression check.
+
+The task_manager scenarios run with ``--no-cache``, so they leave no response
+cache behind in the source tree.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import (  # noqa: E402
+    AGENTS_DIR,
+    CALCULATOR_PATH,
+    TASK_MANAGER_PATH,
+    summarize,
+    write_json,
+)
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+# modules that belong to this repository (the scripts import them by top-level name)
+FIRST_PARTY = ("common", "harness", "task_cache", "task_store", "task_transfer")
+
+
+def load_code(path: Path, name: str) -> str:
+    """``python -c`` code that imports a script without running its main."""
+    return "\n".join(
+        [
+            "import sys",
+            "from pathlib import Path",
+            f"sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})",
+            "from harness import load_script",
+            f"load_script(Path({str(path)!r}), {name!r})",
+        ]
+    )
+
+
+@dataclass
+class Scenario:
+    name: str
+    argv: list[str]
+    stdin: str = ""
+    ready: str | None = None  # stdout marker for time to first prompt
+    forbid: tuple[str, ...] = ()
+
+
+def scenarios() -> list[Scenario]:
+    return [
+        Scenario("python", ["-c", "pass"]),
+        Scenario(
+            "task_manager.import",
+            ["-c", load_code(TASK_MANAGER_PATH, "task_manager")],
+            forbid=("rich",),
+        ),
+        Scenario(
+            "task_manager.batch",
+            [str(TASK_MANAGER_PATH), "--no-cache", "batch", "-"],
+            forbid=("rich",),
+        ),
+        Scenario(
+            "task_manager.prompt",
+            [str(TASK_MANAGER_PATH), "--no-cache"],
+            stdin="q\n",
+            ready="あなた",
+        ),
+        Scenario(
+            "calculator.import",
+            ["-c", load_code(CALCULATOR_PATH, "calculator")],
+            forbid=("rich",),
+        ),
+    ]
+
+
+@dataclass
+class ImportProfile:
+    self_us: dict[str, int] = field(default_factory=dict)
+    parent: dict[str, str | None] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, text: str) -> "ImportProfile":
+        """Parse ``-X importtime`` output (children are printed before their parent)."""
+        profile = cls()
+        pending: list[tuple[int, str]] = []
+        for line in text.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match is None:
+                continue
+            self_us, _, indent, module = match.groups()
+            depth = len(indent) // 2
+            profile.self_us[module] = int(self_us)
+            profile.parent.setdefault(module, None)
+            while pending and pending[-1][0] > depth:
+                child_depth, child = pending.pop()
+                if child_depth == depth + 1:
+                    profile.parent[child] = module
+            pending.append((depth, module))
+        return profile
+
+    def by_package(self) -> dict[str, float]:
+        """Self time in milliseconds per top-level package."""
+        totals: dict[str, float] = defaultdict(float)
+        for module, us in self.self_us.items():
+            totals[module.partition(".")[0]] += us / 1000
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+    def imported_by_us(self, prefix: str) -> list[str]:
+        """Modules under ``prefix`` whose import chain is first-party code only."""
+        found = []
+        for module in self.self_us:
+            if module != prefix and not module.startswith(prefix + "."):
+                continue
+            chain = self.parent[module]
+            while chain is not None and chain.partition(".")[0] in FIRST_PARTY:
+                chain = self.parent[chain]
+            if chain is None:
+                found.append(module)
+        return found
+
+
+def run_once(scenario: Scenario, *, importtime: bool) -> tuple[float, str]:
+    """Start the scenario once; returns (seconds, stderr)."""
+    argv = [
+        sys.executable,
+        *(["-X", "importtime"] if importtime else []),
+        *scenario.argv,
+    ]
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as stderr:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            argv,
+            cwd=AGENTS_DIR,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+        assert proc.stdin is not None and proc.stdout is not None
+        if scenario.ready is None:
+            proc.communicate(scenario.stdin.encode())
+            elapsed = time.perf_counter() - started
+        else:
+            marker, seen = scenario.ready.encode(), b""
+            while marker not in seen:
+                chunk = os.read(proc.stdout.fileno(), 4096)
+                if not chunk:
+                    raise RuntimeError(
+                        f"{scenario.name}: exited before {scenario.ready!r}"
+                    )
+                seen = seen[-len(marker) :] + chunk
+            elapsed = time.perf_counter() - started
+            proc.communicate(scenario.stdin.encode(), timeout=30)
+        if proc.returncode:
+            stderr.seek(0)
+            raise RuntimeError(
+                f"{scenario.name}: exit status {proc.returncode}\n{stderr.read()[-2000:]}"
+            )
+        stderr.seek(0)
+        return elapsed, stderr.read()
+
+
+def parse_budgets(values: list[str]) -> dict[str, float]:
+    budgets = {}
+    for value in values:
+        name, sep, ms = value.partition("=")
+        if not sep:
+            raise SystemExit(f"--budget expects SCENARIO=MS, got {value!r}")
+        budgets[name] = float(ms)
+    return budgets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per scenario")
+    parser.add_argument(
+        "--top", type=int, default=8, help="packages to list per scenario"
+    )
+    parser.add_argument("--scenarios", nargs="+", help="only run these scenarios")
+    parser.add_argument(
+        "--budget-ms", type=float, help="fail when a scenario's p50 exceeds this"
+    )
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="SCENARIO=MS",
+        help="per-scenario budget, overrides --budget-ms",
+    )
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+
+    results, failures = [], []
+    for scenario in scenarios():
+        if args.scenarios and scenario.name not in args.scenarios:
+            continue
+        run_once(scenario, importtime=False)  # warm the bytecode and page caches
+        samples = [run_once(scenario, importtime=False)[0] for _ in range(args.runs)]
+        profile = ImportProfile.parse(run_once(scenario, importtime=True)[1])
+
+        stats = summarize(samples)
+        packages = profile.by_package()
+        forbidden = [
+            m for prefix in scenario.forbid for m in profile.imported_by_us(prefix)
+        ]
+        budget = budgets.get(scenario.name, args.budget_ms)
+        what = "first prompt" if scenario.ready else "exit"
+        print(
+            f"{scenario.name:<22} p50 {stats['p50_ms']:8.1f} ms  max {stats['max_ms']:8.1f} ms"
+            f"  ({what}, {len(profile.self_us)} modules, "
+            f"{sum(profile.self_us.values()) / 1000:.0f} ms importing)"
+        )
+        for package, ms in list(packages.items())[: args.top]:
+            print(f"    {package:<28} {ms:8.1f} ms")
+        if forbidden:
+            print(f"    imported by our code: {', '.join(sorted(forbidden))}")
+            failures.append(f"{scenario.name} imports {', '.join(sorted(forbidden))}")
+        if budget is not None and stats["p50_ms"] > budget:
+            failures.append(
+                f"{scenario.name} p50 {stats['p50_ms']:.1f} ms > {budget:.0f} ms"
+            )
+
+        results.append(
+            {
+                "scenario": scenario.name,
+                "measured_until": what,
+                **stats,
+                "modules": len(profile.self_us),
+                "packages_ms": packages,
+                "forbidden_imports": sorted(forbidden),
+                "budget_ms": budget,
+            }
+        )
+
+    if args.json:
+        write_json(args.json, "startup", results)
+    if failures:
+        print("\n" + "\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# dependencies = [
+#   "claude-code-sdk==0.0.22",
+#   "rich",
+# ]
+# requires-python = ">=3.11"
+# ///
+"""Latency and throughput of the task manager tools as tasks.db grows.
+
+For every database size the store is seeded directly with SQL, then each tool
+coroutine is called in-process (no model, no MCP round trip) with a single
+caller and with several concurrent callers. Before measuring, the warm task
+cache is checked against plain SQL for every filter. Results go to a JSON file that can
+be diffed between commits.
+
+    uv run agents/benchmarks/task_tools.py --sizes 1000 100000 --json tools.json
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import TASK_MANAGER_PATH, load_script, summarize, write_json  # noqa: E402
+
+task_manager = load_script(TASK_MANAGER_PATH, "task_manager")
+import task_cache  # noqa: E402  (on sys.path once task_manager is loaded)
+
+SEED_BATCH = 50_000
+
+
+def seed(size: int, rng: random.Random) -> None:
+    """Fill a fresh project shard (``tasks-n<size>.db``) and make it current."""
+
+    def insert(conn: sqlite3.Connection) -> None:
+        with conn:
+            for start in range(0, size, SEED_BATCH):
+                conn.executemany(
+                    "INSERT INTO tasks (name, priority, status) VALUES (?, ?, ?)",
+                    (
+                        (
+                            f"タスク {i}",
+                            rng.choice(task_manager.TASK_PRIORITIES),
+                            rng.choice(task_manager.TASK_STATUSES),
+                        )
+                        for i in range(start, min(start + SEED_BATCH, size))
+                    ),
+                )
+
+    task_manager.current_project.set(f"n{size}")
+    task_manager.store.call(insert)
+
+
+def check_cache() -> None:
+    """Fail unless the warm task cache returns exactly what SQL returns.
+
+    The cache is filled in an awkward order first (a single task, a filter,
+    then the full list) so that its records are not loaded in ID order.
+    """
+    filters = [
+        (status, priority)
+        for status in (None, *task_manager.TASK_STATUSES)
+        for priority in (None, *task_manager.TASK_PRIORITIES)
+    ]
+    query = f"SELECT {task_cache.SELECT_COLUMNS} FROM tasks"
+
+    def compare(conn: sqlite3.Connection) -> list[str]:
+        cache = conn.task_cache
+        cache.clear()
+        (last_id,) = conn.execute("SELECT MAX(id) FROM tasks").fetchone()
+        cache.get(conn, last_id)
+        cache.select(conn, *filters[-1])
+        cache.select(conn)
+        mismatches = []
+        for status, priority in filters:
+            cached = [
+                tuple(r.as_dict().values())
+                for r in cache.select(conn, status, priority)
+            ]
+            expected = [
+                tuple(row)
+                for row in conn.execute(
+                    f"{query} WHERE (?1 IS NULL OR status = ?1)"
+                    " AND (?2 IS NULL OR priority = ?2) ORDER BY id",
+                    (status, priority),
+                )
+            ]
+            if cached != expected:
+                mismatches.append(f"status={status} priority={priority}")
+        return mismatches
+
+    mismatches = task_manager.store.call(compare)
+    if mismatches:
+        raise SystemExit("task cache differs from SQL for " + ", ".join(mismatches))
+
+
+def scenarios(
+    size: int, rng: random.Random
+) -> dict[str, tuple[Any, Callable[[], dict]]]:
+    """Tool and argument factory per scenario name."""
+    return {
+        "add_task": (
+            task_manager.add_task,
+            lambda: {
+                "name": "ベンチマーク",
+                "priority": rng.choice(task_manager.TASK_PRIORITIES),
+            },
+        ),
+        "list_tasks": (
+            task_manager.list_tasks,
+            lambda: {"status_filter": "", "priority_filter": ""},
+        ),
+        "list_tasks_by_status": (
+            task_manager.list_tasks,
+            lambda: {
+                "status_filter": rng.choice(task_manager.TASK_STATUSES),
+                "priority_filter": "",
+            },
+        ),
+        "list_tasks_by_status_priority": (
+            task_manager.list_tasks,
+            lambda: {
+                "status_filter": rng.choice(task_manager.TASK_STATUSES),
+                "priority_filter": rng.choice(task_manager.TASK_PRIORITIES),
+            },
+        ),
+        "change_task_status": (
+            task_manager.change_task_status,
+            lambda: {
+                "task_id": rng.randint(1, size),
+                "status": rng.choice(task_manager.TASK_STATUSES),
+            },
+        ),
+        "changes_since_recent": (
+            task_manager.changes_since_tool,
+            lambda: {"cursor": max(0, size - rng.randint(0, 50)), "limit": 50},
+        ),
+        "task_stats": (task_manager.task_stats_tool, lambda: {"days": 14}),
+    }
+
+
+async def measure(
+    tool: Any,
+    make_args: Callable[[], dict],
+    calls: int,
+    concurrency: int,
+    time_limit: float,
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + time_limit
+
+    async def caller(count: int) -> None:
+        nonlocal errors
+        for done in range(count):
+            if done >= 1 and time.perf_counter() > deadline:
+                return
+            args = make_args()
+            started = time.perf_counter()
+            try:
+                await tool.handler(args)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    per_caller = max(1, calls // concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(per_caller) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        **summarize(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--calls", type=int, default=200, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=20.0,
+        help="stop a scenario after this many seconds (at least one call per caller)",
+    )
+    parser.add_argument("--scenarios", nargs="+", help="only run these scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        task_manager.open_store(Path(tmp))
+        for size in args.sizes:
+            rng = random.Random(args.seed)
+            started = time.perf_counter()
+            seed(size, rng)
+            print(f"== {size:,} tasks (seeded in {time.perf_counter() - started:.1f}s)")
+            check_cache()
+
+            for name, (tool, make_args) in scenarios(size, rng).items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                for concurrency in args.concurrency:
+                    result = await measure(
+                        tool, make_args, args.calls, concurrency, args.time_limit
+                    )
+                    results.append({"size": size, "scenario": name, **result})
+                    print(
+                        f"{name:<30} c={concurrency:<3} "
+                        f"p50 {result['p50_ms']:9.2f} ms  "
+                        f"p99 {result['p99_ms']:9.2f} ms  "
+                        f"{result['throughput_per_s']:9.1f} calls/s"
+                    )
+        task_manager.store.close()
+
+    if args.json:
+        write_json(args.json, "task_tools", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,5 @@
+"""Helpers shared by the agent scripts under ``agents/``.
+
+The scripts are run standalone (``uv run --script``), so they put the
+``agents/`` directory on ``sys.path`` themselves before importing from here.
+"""
@@ -0,0 +1,235 @@
+"""Headless batch runner: many prompts, a bounded pool of sessions, JSONL out.
+
+Input is read lazily, one prompt per line. A line is either plain text or a
+JSON object such as ``{"id": "42", "prompt": "...", "project": "web",
+"cache": false}``. ``concurrency`` workers take prompts from a bounded
+queue. Each prompt gets its own short-lived session so requests cannot see
+each other's context. All sessions share the options passed to the factory,
+and therefore the same in-process MCP server.
+
+For every prompt one JSON line is written as soon as it finishes, in
+completion order, with the outcome and its timings:
+
+    {"id": "42", "line": 3, "ok": true, "result": "...", "tools": {...},
+     "cost_usd": 0.01, "queued_ms": 3.1, "wall_ms": 5210.4, ...}
+
+Nothing is rendered, so the runner has no terminal dependencies.
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter
+from collections.abc import AsyncIterable, Awaitable, Callable, Iterator
+from dataclasses import dataclass, field
+from typing import Any, TextIO
+
+from claude_code_sdk import Message, ResultMessage, ToolUseBlock
+
+from .cache import CachedClient
+from .streaming import ResponseConsumer
+
+
+@dataclass
+class BatchItem:
+    id: str
+    prompt: str
+    line: int
+    project: str | None = None
+    cache: bool = True
+
+
+def read_items(stream: TextIO) -> Iterator[BatchItem | str]:
+    """Yield a ``BatchItem`` per non-empty line, or an error message for bad lines.
+
+    Open the stream with ``errors="surrogateescape"`` so that a line with
+    invalid UTF-8 is reported on its own; a stream that fails to read (I/O or
+    decoding errors) ends the input after an error message.
+    """
+    lines = iter(stream)
+    line_no = 0
+    while True:
+        line_no += 1
+        try:
+            line = next(lines)
+        except StopIteration:
+            return
+        except (OSError, ValueError) as e:  # UnicodeDecodeError is a ValueError
+            yield f"near line {line_no}: cannot read input, stopping ({e})"
+            return
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            text.encode("utf-8")
+        except UnicodeEncodeError:
+            yield f"line {line_no}: not valid UTF-8"
+            continue
+        if not text.startswith("{"):
+            yield BatchItem(id=str(line_no), prompt=text, line=line_no)
+            continue
+        try:
+            data = json.loads(text)
+            prompt = data["prompt"]
+        except (ValueError, KeyError, TypeError) as e:
+            yield f"line {line_no}: expected a prompt or a JSON object with 'prompt' ({e})"
+            continue
+        yield BatchItem(
+            id=str(data.get("id", line_no)),
+            prompt=str(prompt),
+            line=line_no,
+            project=data.get("project"),
+            cache=bool(data.get("cache", True)),
+        )
+
+
+class _Collector(ResponseConsumer):
+    """Keeps the final text and counts tool calls, renders nothing."""
+
+    def __init__(self) -> None:
+        super().__init__(history_size=1, max_segment_chars=0)
+        self.tools: Counter[str] = Counter()
+        self.text: list[str] = []
+
+    def on_text(self, text: str) -> None:
+        self.text.append(text)
+
+    def on_tool_use(self, block: ToolUseBlock) -> None:
+        self.tools[block.name] += 1
+
+
+@dataclass
+class BatchSummary:
+    items: int = 0
+    ok: int = 0
+    failed: int = 0
+    cached: int = 0
+    cost_usd: float = 0.0
+    elapsed: float = 0.0
+    invalid: list[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        rate = self.items / self.elapsed * 3600 if self.elapsed else 0.0
+        return (
+            f"{self.items} prompts: {self.ok} ok, {self.failed} failed, "
+            f"{self.cached} cached, {len(self.invalid)} invalid lines, "
+            f"${self.cost_usd:.4f}, {self.elapsed:.1f}s ({rate:,.0f}/hour)"
+        )
+
+
+ClientFactory = Callable[[BatchItem], Any]
+Observe = Callable[[AsyncIterable[Message]], AsyncIterable[Message]]
+
+
+async def run_batch(
+    items: Iterator[BatchItem | str],
+    *,
+    make_client: ClientFactory,
+    output: TextIO,
+    concurrency: int = 4,
+    timeout: float | None = None,
+    prepare: Callable[[BatchItem], Awaitable[None] | None] | None = None,
+    observe: Observe | None = None,
+) -> BatchSummary:
+    """Run every item and write one JSON line per item to ``output``.
+
+    ``make_client(item)`` returns an unconnected client used as an async
+    context manager (a ``ClaudeSDKClient`` or a ``CachedClient``).
+    ``prepare(item)`` runs in the worker before the client is created, for
+    example to set a context variable that routes tool calls. ``observe``
+    wraps the response stream (for ``MetricsCollector.observe``).
+    """
+    summary = BatchSummary()
+    queue: asyncio.Queue[tuple[BatchItem, float] | None] = asyncio.Queue(
+        maxsize=concurrency * 2
+    )
+    started = time.perf_counter()
+
+    def emit(record: dict[str, Any]) -> None:
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    async def produce() -> None:
+        last_line = 0
+        try:
+            while True:
+                # reading stdin may block, keep it off the event loop
+                item = await asyncio.to_thread(next, items, None)
+                if item is None:
+                    break
+                if isinstance(item, str):
+                    summary.invalid.append(item)
+                    continue
+                last_line = item.line
+                await queue.put((item, time.perf_counter()))
+        except Exception as e:  # the workers still need their stop signal
+            summary.invalid.append(
+                f"after line {last_line}: input failed, stopping ({type(e).__name__}: {e})"
+            )
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def run_one(item: BatchItem, record: dict[str, Any]) -> None:
+        if prepare is not None:
+            prepared = prepare(item)
+            if prepared is not None:
+                await prepared
+        collector = _Collector()
+        async with make_client(item) as client:
+            if isinstance(client, CachedClient):
+                await client.query(item.prompt, cache=item.cache)
+                record["cached"] = client.last_hit
+            else:
+                await client.query(item.prompt)
+            messages = client.receive_response()
+            result = await collector.consume(
+                observe(messages) if observe is not None else messages
+            )
+        record["tools"] = dict(collector.tools)
+        if not isinstance(result, ResultMessage):
+            record["error"] = "no result message"
+            return
+        record.update(
+            ok=not result.is_error,
+            result=result.result
+            if result.result is not None
+            else "\n\n".join(collector.text),
+            session_id=result.session_id,
+            cost_usd=result.total_cost_usd or 0.0,
+            num_turns=result.num_turns,
+            duration_ms=result.duration_ms,
+            duration_api_ms=result.duration_api_ms,
+        )
+        if result.is_error:
+            record["error"] = result.subtype
+
+    async def work() -> None:
+        while (entry := await queue.get()) is not None:
+            item, enqueued = entry
+            begin = time.perf_counter()
+            record: dict[str, Any] = {
+                "id": item.id,
+                "line": item.line,
+                "project": item.project,
+                "ok": False,
+                "cached": False,
+            }
+            try:
+                await asyncio.wait_for(run_one(item, record), timeout)
+            except TimeoutError:
+                record["error"] = f"timeout after {timeout}s"
+            except Exception as e:  # one bad prompt must not stop the batch
+                record["error"] = f"{type(e).__name__}: {e}"
+            record["queued_ms"] = round((begin - enqueued) * 1000, 1)
+            record["wall_ms"] = round((time.perf_counter() - begin) * 1000, 1)
+
+            summary.items += 1
+            summary.ok += record["ok"]
+            summary.failed += not record["ok"]
+            summary.cached += record["cached"]
+            summary.cost_usd += record.get("cost_usd", 0.0)
+            emit(record)
+
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    summary.elapsed = time.perf_counter() - started
+    return summary
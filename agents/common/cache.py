@@ -0,0 +1,313 @@
+"""Response cache in front of ``ClaudeSDKClient.query``.
+
+A response is cached under a key built from the normalized prompt, a
+fingerprint of the ``ClaudeCodeOptions`` and a version stamp of the state the
+tools read (for example a counter bumped on every write to the task table).
+When the same key comes back the recorded messages are replayed and the model
+is not contacted at all. The CLI is not even started.
+
+Only idempotent turns are stored: the response must not be an error and the
+state version must be the same before and after the turn, so a prompt that
+changed data is never answered from the cache. Entries expire after ``ttl``
+seconds and the least recently used ones are evicted beyond ``max_entries``.
+
+The key does not cover earlier turns of a conversation, so only the first
+query of a fresh session is cached: ``CachedClient`` bypasses the cache for a
+client that resumes or continues a session, and for every later query on the
+same client.
+
+Messages are stored as JSON with the SDK class name in a ``__type__`` key and
+decoded back only into the known message and content block classes, so a
+tampered cache file can at worst produce wrong replies, never run code.
+"""
+
+import dataclasses
+import hashlib
+import inspect
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import Any
+
+from claude_code_sdk import (
+    AssistantMessage,
+    ClaudeCodeOptions,
+    ClaudeSDKClient,
+    Message,
+    ResultMessage,
+    SystemMessage,
+    TextBlock,
+    ThinkingBlock,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+
+# Options that do not change what the model answers, or cannot be hashed
+_IGNORED_OPTIONS = {"can_use_tool", "hooks", "debug_stderr"}
+# The only classes a stored response is decoded into
+_MESSAGE_TYPES = {
+    cls.__name__: cls
+    for cls in (
+        UserMessage,
+        AssistantMessage,
+        SystemMessage,
+        ResultMessage,
+        TextBlock,
+        ThinkingBlock,
+        ToolUseBlock,
+        ToolResultBlock,
+    )
+}
+
+
+def _to_json(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        fields = {
+            f.name: _to_json(getattr(value, f.name)) for f in dataclasses.fields(value)
+        }
+        return {"__type__": type(value).__name__, **fields}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    return value
+
+
+def _from_json(obj: dict[str, Any]) -> Any:
+    cls = _MESSAGE_TYPES.get(obj.get("__type__"))  # type: ignore[arg-type]
+    if cls is None:
+        return obj
+    names = {f.name for f in dataclasses.fields(cls)}
+    return cls(**{k: v for k, v in obj.items() if k in names})
+
+
+def encode_messages(messages: list[Message]) -> str:
+    return json.dumps(_to_json(messages), ensure_ascii=False, default=str)
+
+
+def decode_messages(data: str) -> list[Message]:
+    return json.loads(data, object_hook=_from_json)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold width, case and whitespace differences that do not change the meaning."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", prompt)).strip().casefold()
+
+
+def options_fingerprint(options: ClaudeCodeOptions) -> str:
+    parts: dict[str, Any] = {}
+    for f in dataclasses.fields(options):
+        if f.name in _IGNORED_OPTIONS:
+            continue
+        value = getattr(options, f.name)
+        if f.name == "mcp_servers" and isinstance(value, dict):
+            value = {
+                name: (
+                    {
+                        "type": "sdk",
+                        "name": config["name"],
+                        "version": getattr(config["instance"], "version", None),
+                    }
+                    if config.get("type") == "sdk"
+                    else config
+                )
+                for name, config in value.items()
+            }
+        parts[f.name] = value
+    encoded = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite backed TTL/LRU store of complete responses."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        ttl: float = 3600.0,
+        max_entries: int = 256,
+        max_messages: int = 200,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_messages = max_messages
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(str(path))
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    messages TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+
+    def key(self, prompt: str, options: ClaudeCodeOptions, state_version: Any) -> str:
+        material = json.dumps(
+            [normalize_prompt(prompt), options_fingerprint(options), state_version],
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str) -> list[Message] | None:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT messages, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        try:
+            messages = decode_messages(row[0])
+        except (ValueError, TypeError):  # entries written by an older format
+            with self._conn:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key)
+            )
+        self.hits += 1
+        return messages
+
+    def put(self, key: str, messages: list[Message]) -> None:
+        if len(messages) > self.max_messages:
+            return
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, encode_messages(messages), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+            )
+            self._conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses
+                    ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+
+class CachedClient:
+    """Wraps an unconnected ``ClaudeSDKClient`` and connects only on a cache miss.
+
+    Use it like the client itself::
+
+        async with CachedClient(ClaudeSDKClient(options), cache) as client:
+            await client.query(prompt)               # or cache=False to opt out
+            async for message in client.receive_response():
+                ...
+
+    With ``cache=None`` every query goes to the client, and so does every
+    query after the first or on a client that resumes a session (its answer
+    depends on earlier turns the key does not cover). A replayed first answer
+    is not part of the session a later query opens.
+
+    Replayed responses end with a copy of the original ``ResultMessage`` that
+    has zero cost and duration, so metrics do not count them twice.
+    """
+
+    def __init__(
+        self,
+        client: ClaudeSDKClient,
+        cache: ResponseCache | None,
+        *,
+        state_version: Callable[[], Any] = lambda: None,  # may return an awaitable
+    ) -> None:
+        self.client = client
+        self.cache = cache
+        self.state_version = state_version
+        self.last_hit = False
+        self._connected = False
+        options = client.options
+        self._fresh = not (options.resume or options.continue_conversation)
+        self._replay: list[Message] | None = None
+        self._pending: tuple[str, Any] | None = None
+
+    async def __aenter__(self) -> "CachedClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> bool:
+        if self._connected:
+            await self.client.disconnect()
+            self._connected = False
+        return False
+
+    async def query(self, prompt: str, *, cache: bool = True) -> None:
+        self._replay = None
+        self._pending = None
+        self.last_hit = False
+        fresh, self._fresh = self._fresh, False
+        if cache and fresh and self.cache is not None:
+            version = await self._state_version()
+            key = self.cache.key(prompt, self.client.options, version)
+            messages = self.cache.get(key)
+            if messages is not None:
+                self._replay = messages
+                self.last_hit = True
+                return
+            self._pending = (key, version)
+
+        if not self._connected:
+            await self.client.connect()
+            self._connected = True
+        await self.client.query(prompt)
+
+    async def receive_response(self) -> AsyncIterator[Message]:
+        if self._replay is not None:
+            replay, self._replay = self._replay, None
+            for message in replay:
+                if isinstance(message, ResultMessage):
+                    message = dataclasses.replace(
+                        message,
+                        total_cost_usd=0.0,
+                        duration_ms=0,
+                        duration_api_ms=0,
+                        num_turns=0,
+                        usage=None,
+                    )
+                yield message
+            return
+
+        pending, self._pending = self._pending, None
+        recorded: list[Message] = []
+        async for message in self.client.receive_response():
+            if pending is not None:
+                recorded.append(message)
+            if (
+                isinstance(message, ResultMessage)
+                and pending is not None
+                and not message.is_error
+                and await self._state_version() == pending[1]
+            ):
+                self.cache.put(pending[0], recorded)
+            yield message
+
+    async def _state_version(self) -> Any:
+        version = self.state_version()
+        if inspect.isawaitable(version):
+            version = await version
+        return version
+
+    async def interrupt(self) -> None:
+        if self._connected:
+            await self.client.interrupt()
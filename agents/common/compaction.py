@@ -0,0 +1,247 @@
+"""Compact, token-budgeted results for SDK MCP tools.
+
+Everything a tool returns is sent to the model and stays in the context for
+the rest of the session, so decoration (box drawing, padding, pretty printed
+JSON) is paid for on every later turn. This module provides:
+
+- ``format_rows()`` / ``rows_result()`` to return tabular data as TSV or as
+  compact JSON rows instead of a rendered table
+- ``CompactionPolicy`` which strips padding, re-serializes JSON without
+  whitespace and truncates results over a token budget, leaving a note with
+  what was omitted so the model can narrow its request
+- ``compact_tool()`` / ``compact_tools()`` which wrap ``SdkMcpTool`` handlers
+  with a policy and record the byte and token savings per tool in
+  ``CompactionStats``
+
+Token counts are estimates (UTF-8 bytes / 4), good enough for budgets and
+comparisons but not for billing.
+"""
+
+import json
+import math
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from claude_code_sdk import SdkMcpTool
+
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def _tsv_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def format_rows(
+    rows: Iterable[Mapping[str, Any]], columns: Sequence[str], *, fmt: str = "tsv"
+) -> str:
+    """Serialize ``rows`` as TSV with a header line, or as ``{"columns", "rows"}`` JSON."""
+    if fmt == "tsv":
+        lines = ["\t".join(columns)]
+        lines.extend(
+            "\t".join(_tsv_cell(row.get(column)) for column in columns) for row in rows
+        )
+        return "\n".join(lines)
+    if fmt == "json":
+        payload = {
+            "columns": list(columns),
+            "rows": [[row.get(column) for column in columns] for row in rows],
+        }
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    raise ValueError(f"unknown format: {fmt}")
+
+
+def rows_result(
+    rows: Iterable[Mapping[str, Any]], columns: Sequence[str], *, fmt: str = "tsv"
+) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": format_rows(rows, columns, fmt=fmt)}]}
+
+
+@dataclass
+class CompactionPolicy:
+    """How a single text result is shaped.
+
+    Results within ``max_tokens`` are only normalized. Longer line-oriented
+    results keep the header line and as many leading lines as fit; JSON
+    objects have their lists shortened. ``max_tokens=None`` disables
+    truncation.
+    """
+
+    max_tokens: int | None = 2000
+    keep_header: bool = True
+
+    def apply(self, text: str) -> tuple[str, bool]:
+        """Return the shaped text and whether anything was cut."""
+        data = _parse_json(text)
+        if data is not None:
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        else:
+            text = "\n".join(line.rstrip() for line in text.splitlines())
+
+        if self.max_tokens is None or estimate_tokens(text) <= self.max_tokens:
+            return text, False
+        if isinstance(data, dict):
+            shortened = self._truncate_json(data)
+            if shortened is not None:
+                return shortened, True
+        return self._truncate_lines(text), True
+
+    def _budget_bytes(self) -> int:
+        assert self.max_tokens is not None
+        return self.max_tokens * BYTES_PER_TOKEN
+
+    def _truncate_json(self, data: dict[str, Any]) -> str | None:
+        def size(value: Any) -> int:
+            encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            return len(encoded.encode("utf-8"))
+
+        lists = [k for k, v in data.items() if isinstance(v, list) and v]
+        if not lists:
+            return None
+        budget = self._budget_bytes() - 80  # room for the "truncated" entry
+        shortened = dict(data)
+        omitted = {}
+        # Shorten the largest lists first so small ones (errors, ...) survive
+        for key in sorted(lists, key=lambda k: size(data[k]), reverse=True):
+            excess = size(shortened) - budget
+            if excess <= 0:
+                break
+            values = data[key]
+            list_bytes = size(values)
+            keep = int(len(values) * max(0, list_bytes - excess) / list_bytes)
+            shortened[key] = values[:keep]
+            omitted[key] = len(values) - keep
+        shortened["truncated"] = {"omitted": omitted}
+        text = json.dumps(shortened, ensure_ascii=False, separators=(",", ":"))
+        if estimate_tokens(text) > self.max_tokens:
+            return None
+        return text
+
+    def _truncate_lines(self, text: str) -> str:
+        budget = self._budget_bytes() - 120  # room for the note
+        lines = text.split("\n")
+        start = 1 if self.keep_header and len(lines) > 1 else 0
+        kept = lines[:start]
+        used = sum(len(line.encode("utf-8")) + 1 for line in kept)
+        for line in lines[start:]:
+            size = len(line.encode("utf-8")) + 1
+            if used + size > budget:
+                break
+            kept.append(line)
+            used += size
+
+        if len(kept) == start:
+            # a single oversized line: cut it by characters
+            head = text.encode("utf-8")[: max(budget, 0)].decode("utf-8", "ignore")
+            return (
+                f"{head}\n[truncated: {len(text) - len(head)} of {len(text)} "
+                f"characters omitted, ~{estimate_tokens(text)} tokens in full]"
+            )
+        omitted = len(lines) - len(kept)
+        kept.append(
+            f"[truncated: {omitted} of {len(lines) - start} rows omitted, "
+            f"~{estimate_tokens(text)} tokens in full; use filters to narrow]"
+        )
+        return "\n".join(kept)
+
+
+def _parse_json(text: str) -> Any:
+    stripped = text.lstrip()
+    if not stripped or stripped[0] not in "[{":
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+@dataclass
+class ToolSavings:
+    calls: int = 0
+    truncated: int = 0
+    raw_bytes: int = 0
+    shaped_bytes: int = 0
+    raw_tokens: int = 0
+    shaped_tokens: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.raw_tokens - self.shaped_tokens
+
+    @property
+    def saved_ratio(self) -> float:
+        return 1 - self.shaped_bytes / self.raw_bytes if self.raw_bytes else 0.0
+
+
+@dataclass
+class CompactionStats:
+    tools: dict[str, ToolSavings] = field(default_factory=dict)
+
+    def add(self, tool: str, raw: str, shaped: str, truncated: bool) -> None:
+        savings = self.tools.setdefault(tool, ToolSavings())
+        savings.calls += 1
+        savings.truncated += truncated
+        savings.raw_bytes += len(raw.encode("utf-8"))
+        savings.shaped_bytes += len(shaped.encode("utf-8"))
+        savings.raw_tokens += estimate_tokens(raw)
+        savings.shaped_tokens += estimate_tokens(shaped)
+
+    def report(self) -> str:
+        lines = [
+            f"{'tool':<24} {'calls':>6} {'cut':>4} {'raw B':>10} "
+            f"{'sent B':>10} {'saved tok':>10} {'saved':>6}"
+        ]
+        for name, s in sorted(
+            self.tools.items(), key=lambda item: -item[1].saved_tokens
+        ):
+            lines.append(
+                f"{name[:24]:<24} {s.calls:>6} {s.truncated:>4} {s.raw_bytes:>10} "
+                f"{s.shaped_bytes:>10} {s.saved_tokens:>10} {s.saved_ratio:>6.1%}"
+            )
+        return "\n".join(lines)
+
+
+def compact_tool(
+    sdk_tool: SdkMcpTool[Any],
+    *,
+    policy: CompactionPolicy | None = None,
+    stats: CompactionStats | None = None,
+) -> SdkMcpTool[Any]:
+    """Return a copy of ``sdk_tool`` whose text results are shaped by ``policy``."""
+    policy = policy or CompactionPolicy()
+    inner: Callable[[Any], Any] = sdk_tool.handler
+
+    async def handler(args: Any) -> dict[str, Any]:
+        result = await inner(args)
+        content = []
+        for item in result.get("content", []):
+            if item.get("type") == "text":
+                raw = item["text"]
+                shaped, truncated = policy.apply(raw)
+                if stats is not None:
+                    stats.add(sdk_tool.name, raw, shaped, truncated)
+                item = {**item, "text": shaped}
+            content.append(item)
+        return {**result, "content": content}
+
+    return SdkMcpTool(
+        name=sdk_tool.name,
+        description=sdk_tool.description,
+        input_schema=sdk_tool.input_schema,
+        handler=handler,
+    )
+
+
+def compact_tools(
+    tools: Iterable[SdkMcpTool[Any]],
+    *,
+    policy: CompactionPolicy | None = None,
+    stats: CompactionStats | None = None,
+) -> list[SdkMcpTool[Any]]:
+    return [compact_tool(t, policy=policy, stats=stats) for t in tools]
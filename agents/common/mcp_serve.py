@@ -0,0 +1,165 @@
+"""Run an SDK MCP server as a standalone process shared by many agents.
+
+``create_sdk_mcp_server()`` builds an in-process server: only the
+``ClaudeSDKClient`` in the same process can call it, so every agent process
+opens its own database connections and warms its own caches. The ``instance``
+inside it is a regular MCP ``Server``, so the same tools can also be served
+from one long-lived process:
+
+    await serve_sse(create_task_server()["instance"], port=8765)
+
+and the agents connect to it with ``sse_config(url)`` in ``mcp_servers``. The
+tool names the model sees stay ``mcp__<key>__<tool>``, so allowed tools and
+hooks do not change.
+
+Over SSE every client session runs in its own task. ``session_setup`` is
+called in that task with the request headers, so context variables it sets
+(such as the current project) apply to that session's tool calls only.
+Raising ``ValueError`` rejects the connection with status 400.
+
+The server listens on loopback addresses only, where DNS rebinding protection
+checks the ``Host`` header. Any other address needs a shared ``token`` that
+clients send as ``Authorization: Bearer <token>``; the tools can change data,
+so an open port on the network must not be enough to call them.
+
+``serve_stdio`` speaks the protocol on stdin/stdout for MCP clients that
+start the server themselves; that process is not shared.
+"""
+
+import hmac
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING
+
+from claude_code_sdk.types import McpSSEServerConfig
+
+if TYPE_CHECKING:
+    from mcp.server.lowlevel import Server
+    from starlette.applications import Starlette
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+SSE_PATH = "/sse"
+MESSAGES_PATH = "/messages/"
+
+
+def sse_config(
+    url: str, headers: Mapping[str, str] | None = None, *, token: str | None = None
+) -> McpSSEServerConfig:
+    """``mcp_servers`` entry for a server started with ``serve_sse``."""
+    config: McpSSEServerConfig = {"type": "sse", "url": url}
+    headers = {**(headers or {}), **auth_headers(token)}
+    if headers:
+        config["headers"] = dict(headers)
+    return config
+
+
+def auth_headers(token: str | None) -> dict[str, str]:
+    """Request headers that carry ``token`` (none without a token)."""
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def _host_pattern(host: str) -> str:
+    """``Host`` header pattern for any port; IPv6 addresses are bracketed."""
+    return f"[{host}]:*" if ":" in host else f"{host}:*"
+
+
+def sse_app(
+    server: "Server",
+    *,
+    session_setup: Callable[[Mapping[str, str]], None] | None = None,
+    allowed_hosts: list[str] | None = None,
+    token: str | None = None,
+) -> "Starlette":
+    """Starlette app with the SSE stream at ``/sse`` and messages at ``/messages/``.
+
+    ``allowed_hosts`` enables DNS rebinding protection (``host:*`` patterns);
+    ``serve_sse`` sets it for loopback addresses. With ``token`` a session
+    only opens with a matching ``Authorization`` header (401 otherwise); the
+    message endpoint needs the session id that only the stream hands out.
+    """
+    from mcp.server.sse import SseServerTransport
+    from mcp.server.transport_security import TransportSecuritySettings
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import PlainTextResponse, Response
+    from starlette.routing import Mount, Route
+
+    security = None
+    if allowed_hosts is not None:
+        security = TransportSecuritySettings(
+            allowed_hosts=allowed_hosts,
+            allowed_origins=[f"http://{host}" for host in allowed_hosts],
+        )
+    transport = SseServerTransport(MESSAGES_PATH, security_settings=security)
+    options = server.create_initialization_options()
+
+    expected = auth_headers(token).get("Authorization", "").encode()
+
+    async def handle_sse(request: Request) -> Response:
+        if token is not None:
+            given = request.headers.get("Authorization", "").encode()
+            if not hmac.compare_digest(given, expected):
+                return PlainTextResponse("invalid or missing token", status_code=401)
+        if session_setup is not None:
+            try:
+                session_setup(request.headers)
+            except ValueError as e:
+                return PlainTextResponse(str(e), status_code=400)
+        async with transport.connect_sse(
+            request.scope, request.receive, request._send
+        ) as (read, write):
+            await server.run(read, write, options)
+        return Response()
+
+    return Starlette(
+        routes=[
+            Route(SSE_PATH, endpoint=handle_sse, methods=["GET"]),
+            Mount(MESSAGES_PATH, app=transport.handle_post_message),
+        ]
+    )
+
+
+def check_host(host: str, token: str | None) -> None:
+    """Raise ``ValueError`` unless ``serve_sse`` may listen on ``host``."""
+    if host.startswith("["):
+        raise ValueError(f"host {host!r}: give IPv6 addresses without brackets")
+    if host not in LOOPBACK_HOSTS and not token:
+        raise ValueError(
+            f"refusing to serve on non-loopback host {host!r} without a token"
+        )
+
+
+async def serve_sse(
+    server: "Server",
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    session_setup: Callable[[Mapping[str, str]], None] | None = None,
+    token: str | None = None,
+    log_level: str = "warning",
+) -> None:
+    """Serve over HTTP/SSE until the process is interrupted.
+
+    Raises ``ValueError`` as ``check_host`` does.
+    """
+    import uvicorn
+
+    check_host(host, token)
+    allowed_hosts = None
+    if host in LOOPBACK_HOSTS:
+        allowed_hosts = [_host_pattern(h) for h in LOOPBACK_HOSTS]
+    app = sse_app(
+        server,
+        session_setup=session_setup,
+        allowed_hosts=allowed_hosts,
+        token=token or None,
+    )
+    config = uvicorn.Config(app, host=host, port=port, log_level=log_level)
+    await uvicorn.Server(config).serve()
+
+
+async def serve_stdio(server: "Server") -> None:
+    """Serve one client over stdin/stdout (nothing else may write to stdout)."""
+    from mcp.server.stdio import stdio_server
+
+    async with stdio_server() as (read, write):
+        await server.run(read, write, server.create_initialization_options())
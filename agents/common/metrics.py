@@ -0,0 +1,214 @@
+# /// script
+# dependencies = [
+#   "claude-code-sdk==0.0.22",
+# ]
+# requires-python = ">=3.11"
+# ///
+"""Cost, token and latency accounting across agent runs.
+
+``MetricsCollector.observe()`` wraps a response stream, passes every message
+through unchanged, and appends one JSON line per ``ResultMessage`` to a local
+file: session, prompt type, tools used, cost, token usage, durations and
+turn count. The file is append-only, so many processes can share it, and the
+rollups below stream it line by line.
+
+``cost_usd`` is the cost of that response alone. The CLI reports a running
+total per session and process, which ``SessionCosts`` turns into per-response
+costs, so the rollups can simply add them up. A collector shared by clients
+that resume the same session should get a ``SessionCosts`` per client.
+
+    uv run agents/common/metrics.py agents/task_manager/metrics.jsonl --by tool
+"""
+
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterable, AsyncIterator, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from claude_code_sdk import AssistantMessage, Message, ResultMessage, ToolUseBlock
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+ROLLUP_KEYS = ("session", "tool", "prompt_type")
+
+
+class SessionCosts:
+    """Per-query costs from the running ``ResultMessage.total_cost_usd``.
+
+    The CLI reports what a session has cost since the CLI process started, so
+    the value grows with every query on the same client and starts again from
+    zero when a session is resumed by a new process. ``query_cost()`` returns
+    the difference to the last total seen for the session; a total below that
+    means a new process, whose total is then the whole cost. Keep one instance
+    per client, or at least per process that records results.
+    """
+
+    def __init__(self) -> None:
+        self._last_total: dict[str, float] = {}
+
+    def query_cost(self, result: ResultMessage) -> float:
+        total = result.total_cost_usd or 0.0
+        last = self._last_total.get(result.session_id, 0.0)
+        self._last_total[result.session_id] = total
+        return total - last if total >= last else total
+
+
+class MetricsCollector:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.costs = SessionCosts()
+
+    async def observe(
+        self,
+        messages: AsyncIterable[Message],
+        *,
+        prompt_type: str = "default",
+        costs: SessionCosts | None = None,
+    ) -> AsyncIterator[Message]:
+        """Pass ``messages`` through and record the ``ResultMessage`` that ends them.
+
+        ``costs`` tracks the client's running total, by default ``self.costs``.
+        """
+        started = time.perf_counter()
+        tools: Counter[str] = Counter()
+        async for message in messages:
+            if isinstance(message, AssistantMessage):
+                for block in message.content:
+                    if isinstance(block, ToolUseBlock):
+                        tools[block.name] += 1
+            elif isinstance(message, ResultMessage):
+                self.record(
+                    message,
+                    prompt_type=prompt_type,
+                    tools=dict(tools),
+                    wall_ms=(time.perf_counter() - started) * 1000,
+                    cost_usd=(costs or self.costs).query_cost(message),
+                )
+            yield message
+
+    def record(
+        self,
+        result: ResultMessage,
+        *,
+        prompt_type: str = "default",
+        tools: dict[str, int] | None = None,
+        wall_ms: float | None = None,
+        cost_usd: float | None = None,
+    ) -> None:
+        """Append one response; ``cost_usd`` defaults to its share of the session total."""
+        if cost_usd is None:
+            cost_usd = self.costs.query_cost(result)
+        usage = result.usage or {}
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "session_id": result.session_id,
+            "prompt_type": prompt_type,
+            "tools": tools or {},
+            "cost_usd": cost_usd,
+            "duration_ms": result.duration_ms,
+            "duration_api_ms": result.duration_api_ms,
+            "wall_ms": wall_ms,
+            "num_turns": result.num_turns,
+            "is_error": result.is_error,
+            **{name: usage.get(name, 0) or 0 for name in USAGE_FIELDS},
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def entries(self) -> Iterator[dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def rollup(self, by: str) -> list["Rollup"]:
+        """Aggregate by ``session``, ``tool`` or ``prompt_type``, most expensive first.
+
+        For ``tool`` the cost and tokens of a response are split between the
+        tools it used in proportion to their call counts. Responses that used
+        no tool are reported under ``(none)``.
+        """
+        if by not in ROLLUP_KEYS:
+            raise ValueError(f"by must be one of {', '.join(ROLLUP_KEYS)}")
+
+        groups: dict[str, Rollup] = defaultdict(Rollup)
+        for entry in self.entries():
+            if by == "session":
+                shares = {entry["session_id"]: 1.0}
+            elif by == "prompt_type":
+                shares = {entry["prompt_type"]: 1.0}
+            else:
+                calls = entry["tools"]
+                total_calls = sum(calls.values())
+                shares = (
+                    {name: count / total_calls for name, count in calls.items()}
+                    if total_calls
+                    else {"(none)": 1.0}
+                )
+            for key, share in shares.items():
+                groups[key].add(entry, share)
+
+        for key, rollup in groups.items():
+            rollup.key = key
+        return sorted(groups.values(), key=lambda r: r.cost_usd, reverse=True)
+
+
+@dataclass
+class Rollup:
+    key: str = ""
+    responses: int = 0
+    errors: int = 0
+    cost_usd: float = 0.0
+    num_turns: int = 0
+    total_duration_ms: float = 0.0
+    tokens: Counter[str] = field(default_factory=Counter)
+
+    def add(self, entry: dict[str, Any], share: float) -> None:
+        self.responses += 1
+        self.errors += bool(entry["is_error"])
+        self.cost_usd += entry["cost_usd"] * share
+        self.num_turns += entry["num_turns"]
+        self.total_duration_ms += entry["duration_ms"]
+        for name in USAGE_FIELDS:
+            self.tokens[name] += entry.get(name, 0) * share
+
+    @property
+    def mean_duration_ms(self) -> float:
+        return self.total_duration_ms / self.responses if self.responses else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize a metrics file")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--by", choices=ROLLUP_KEYS, default="prompt_type")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    rollups = MetricsCollector(args.path).rollup(args.by)
+    print(
+        f"{args.by:<40} {'responses':>9} {'errors':>6} {'cost $':>10} "
+        f"{'turns':>6} {'in tok':>9} {'out tok':>9} {'mean ms':>9}"
+    )
+    for rollup in rollups[: args.top]:
+        print(
+            f"{rollup.key[:40]:<40} {rollup.responses:>9} {rollup.errors:>6} "
+            f"{rollup.cost_usd:>10.4f} {rollup.num_turns:>6} "
+            f"{rollup.tokens['input_tokens']:>9.0f} {rollup.tokens['output_tokens']:>9.0f} "
+            f"{rollup.mean_duration_ms:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""Offline stand-in for the Claude Code CLI, for tests and benchmarks.
+
+``OfflineClient`` is a ``ClaudeSDKClient`` whose transport replays a scripted
+conversation instead of starting the CLI. The script is played through the
+real control protocol, so everything on the Python side runs unchanged:
+
+- ``UseTool`` steps for ``mcp__<server>__<tool>`` names are sent to the SDK
+  as ``mcp_message`` requests and executed by the in-process SDK MCP servers
+- ``PreToolUse``, ``PostToolUse`` and ``UserPromptSubmit`` hooks are called
+  through ``hook_callback`` requests, and a deny decision blocks the tool
+- ``can_use_tool`` is consulted for tools that are not in ``allowed_tools``
+- ``interrupt()`` stops the turn at the next step
+
+No network access and no model are involved, and by default no artificial
+latency either, so agent loops run as fast as our own code allows.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import json
+import re
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from claude_code_sdk import ClaudeCodeOptions, ClaudeSDKClient, Transport
+from claude_code_sdk._internal.transport import subprocess_cli
+
+STUB_MODEL = "offline-stub"
+
+
+@dataclass
+class Say:
+    """The assistant emits a text block."""
+
+    text: str
+
+
+@dataclass
+class UseTool:
+    """The assistant calls a tool. The tool result is produced by the SDK side."""
+
+    name: str
+    input: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Turn:
+    """What the stub answers to one user message."""
+
+    steps: list[Say | UseTool] = field(default_factory=list)
+    step_delay: float = 0.0  # simulated model latency before each step
+    cost_usd: float = 0.0  # reported as part of the running session total
+
+
+Script = Iterable[Turn] | Callable[[str], Turn]
+
+
+class ScriptedTransport(Transport):
+    """``Transport`` that plays the CLI side of the protocol from a script."""
+
+    def __init__(self, script: Script, options: ClaudeCodeOptions) -> None:
+        if callable(script):
+            self._responder = script
+        else:
+            turns = iter(script)
+            self._responder = lambda prompt: next(turns, Turn([Say("(end of script)")]))
+        self._options = options
+        # like the CLI: a resumed session keeps its id, a fork gets a new one
+        resumed = options.resume and "fork-session" not in options.extra_args
+        self.session_id = options.resume if resumed else str(uuid.uuid4())
+        self.total_cost_usd = 0.0  # since this "process" started, as the CLI reports it
+        self._outgoing: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+        self._pending: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        self._request_ids = itertools.count(1)
+        self._hooks: dict[str, list[dict[str, Any]]] = {}
+        self._turn_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._interrupted = False
+        self._ready = False
+        self.tool_calls = 0
+
+    async def connect(self) -> None:
+        self._ready = True
+
+    def is_ready(self) -> bool:
+        return self._ready
+
+    async def end_input(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self._ready = False
+        for task in self._tasks:
+            task.cancel()
+        for future in self._pending.values():
+            future.cancel()
+        await self._outgoing.put(None)
+
+    async def read_messages(self) -> AsyncIterator[dict[str, Any]]:
+        while True:
+            message = await self._outgoing.get()
+            if message is None:
+                return
+            yield message
+
+    async def write(self, data: str) -> None:
+        for line in data.splitlines():
+            if line.strip():
+                self._dispatch(json.loads(line))
+
+    # SDK -> CLI
+
+    def _dispatch(self, message: dict[str, Any]) -> None:
+        msg_type = message.get("type")
+        if msg_type == "control_response":
+            response = message["response"]
+            future = self._pending.pop(response["request_id"], None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        elif msg_type == "control_request":
+            self._handle_control_request(message)
+        elif msg_type == "user":
+            content = message["message"]["content"]
+            prompt = content if isinstance(content, str) else json.dumps(content)
+            self._spawn(self._play(prompt))
+
+    def _handle_control_request(self, message: dict[str, Any]) -> None:
+        request = message["request"]
+        response: dict[str, Any] = {}
+        if request["subtype"] == "initialize":
+            self._hooks = request.get("hooks") or {}
+            response = {"commands": [], "output_style": "default"}
+        elif request["subtype"] == "interrupt":
+            self._interrupted = True
+        self._send(
+            {
+                "type": "control_response",
+                "response": {
+                    "subtype": "success",
+                    "request_id": message["request_id"],
+                    "response": response,
+                },
+            }
+        )
+
+    # CLI -> SDK
+
+    def _spawn(self, coro: Any) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _send(self, message: dict[str, Any]) -> None:
+        self._outgoing.put_nowait(message)
+
+    async def _request(self, request: dict[str, Any]) -> dict[str, Any]:
+        request_id = f"stub_{next(self._request_ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._send(
+            {"type": "control_request", "request_id": request_id, "request": request}
+        )
+        response = await future
+        if response.get("subtype") == "error":
+            raise RuntimeError(response.get("error", "control request failed"))
+        return response.get("response") or {}
+
+    async def _run_hooks(
+        self, event: str, hook_input: dict[str, Any], tool_name: str | None = None
+    ) -> list[dict[str, Any]]:
+        outputs = []
+        for matcher in self._hooks.get(event, []):
+            pattern = matcher.get("matcher")
+            if tool_name is not None and pattern not in (None, "", "*"):
+                if not re.fullmatch(pattern, tool_name):
+                    continue
+            for callback_id in matcher.get("hookCallbackIds", []):
+                outputs.append(
+                    await self._request(
+                        {
+                            "subtype": "hook_callback",
+                            "callback_id": callback_id,
+                            "input": {
+                                "session_id": self.session_id,
+                                "hook_event_name": event,
+                                **hook_input,
+                            },
+                            "tool_use_id": hook_input.get("tool_use_id"),
+                        }
+                    )
+                )
+        return outputs
+
+    async def _permission_denial(
+        self, name: str, tool_input: dict[str, Any], tool_use_id: str
+    ) -> str | None:
+        hook_input = {
+            "tool_name": name,
+            "tool_input": tool_input,
+            "tool_use_id": tool_use_id,
+        }
+        for output in await self._run_hooks("PreToolUse", hook_input, name):
+            specific = output.get("hookSpecificOutput") or {}
+            if specific.get("permissionDecision") == "deny":
+                return specific.get("permissionDecisionReason") or "denied by hook"
+            if output.get("decision") == "block":
+                return output.get("reason") or "blocked by hook"
+
+        if (
+            name not in self._options.allowed_tools
+            and self._options.permission_prompt_tool_name == "stdio"
+        ):
+            decision = await self._request(
+                {
+                    "subtype": "can_use_tool",
+                    "tool_name": name,
+                    "input": tool_input,
+                    "permission_suggestions": None,
+                    "blocked_path": None,
+                }
+            )
+            if not decision.get("allow"):
+                return decision.get("reason") or "denied by can_use_tool"
+        return None
+
+    async def _call_tool(
+        self, name: str, tool_input: dict[str, Any]
+    ) -> tuple[Any, bool]:
+        parts = name.split("__", 2)
+        if len(parts) != 3 or parts[0] != "mcp":
+            return f"offline stub: {name} is not executed", False
+
+        self.tool_calls += 1
+        response = await self._request(
+            {
+                "subtype": "mcp_message",
+                "server_name": parts[1],
+                "message": {
+                    "jsonrpc": "2.0",
+                    "id": self.tool_calls,
+                    "method": "tools/call",
+                    "params": {"name": parts[2], "arguments": tool_input},
+                },
+            }
+        )
+        mcp_response = response.get("mcp_response", {})
+        if "error" in mcp_response:
+            return mcp_response["error"].get("message", "MCP error"), True
+        result = mcp_response.get("result", {})
+        return result.get("content", []), bool(result.get("is_error"))
+
+    def _assistant(self, block: dict[str, Any]) -> None:
+        self._send(
+            {
+                "type": "assistant",
+                "message": {
+                    "role": "assistant",
+                    "model": STUB_MODEL,
+                    "content": [block],
+                },
+                "parent_tool_use_id": None,
+                "session_id": self.session_id,
+            }
+        )
+
+    async def _play(self, prompt: str) -> None:
+        async with self._turn_lock:
+            self._interrupted = False
+            started = time.perf_counter()
+            turn = self._responder(prompt)
+            self.total_cost_usd += turn.cost_usd
+            num_turns = 1
+            last_text = ""
+
+            self._send(
+                {
+                    "type": "system",
+                    "subtype": "init",
+                    "session_id": self.session_id,
+                    "model": STUB_MODEL,
+                }
+            )
+            await self._run_hooks("UserPromptSubmit", {"prompt": prompt})
+
+            for step in turn.steps:
+                if turn.step_delay:
+                    await asyncio.sleep(turn.step_delay)
+                if self._interrupted:
+                    break
+
+                if isinstance(step, Say):
+                    last_text = step.text
+                    self._assistant({"type": "text", "text": step.text})
+                    continue
+
+                num_turns += 1
+                tool_use_id = f"toolu_stub_{uuid.uuid4().hex[:12]}"
+                self._assistant(
+                    {
+                        "type": "tool_use",
+                        "id": tool_use_id,
+                        "name": step.name,
+                        "input": step.input,
+                    }
+                )
+                denial = await self._permission_denial(
+                    step.name, step.input, tool_use_id
+                )
+                if denial is not None:
+                    content, is_error = denial, True
+                else:
+                    content, is_error = await self._call_tool(step.name, step.input)
+                    await self._run_hooks(
+                        "PostToolUse",
+                        {
+                            "tool_name": step.name,
+                            "tool_input": step.input,
+                            "tool_response": content,
+                            "tool_use_id": tool_use_id,
+                        },
+                        step.name,
+                    )
+                self._send(
+                    {
+                        "type": "user",
+                        "message": {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "tool_result",
+                                    "tool_use_id": tool_use_id,
+                                    "content": content,
+                                    "is_error": is_error,
+                                }
+                            ],
+                        },
+                        "parent_tool_use_id": None,
+                        "session_id": self.session_id,
+                    }
+                )
+
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            self._send(
+                {
+                    "type": "result",
+                    "subtype": "error_during_execution"
+                    if self._interrupted
+                    else "success",
+                    "duration_ms": duration_ms,
+                    "duration_api_ms": 0,
+                    "is_error": self._interrupted,
+                    "num_turns": num_turns,
+                    "session_id": self.session_id,
+                    "total_cost_usd": self.total_cost_usd,
+                    "usage": {"input_tokens": 0, "output_tokens": 0},
+                    "result": last_text,
+                }
+            )
+
+
+_active_script: contextvars.ContextVar[Script | None] = contextvars.ContextVar(
+    "offline_script", default=None
+)
+_real_transport = subprocess_cli.SubprocessCLITransport
+
+
+def _transport_factory(
+    prompt: Any, options: ClaudeCodeOptions, **kwargs: Any
+) -> Transport:
+    script = _active_script.get()
+    if script is None:
+        return _real_transport(prompt=prompt, options=options, **kwargs)
+    return ScriptedTransport(script, options)
+
+
+class OfflineClient(ClaudeSDKClient):
+    """``ClaudeSDKClient`` connected to a ``ScriptedTransport``.
+
+    claude-code-sdk 0.0.22 has no transport argument on the client, so the
+    transport class looked up by ``connect()`` is swapped for a factory that
+    only returns the scripted transport inside ``OfflineClient.connect()``.
+    Other clients in the same process keep using the real CLI.
+    """
+
+    def __init__(
+        self, options: ClaudeCodeOptions | None = None, *, script: Script
+    ) -> None:
+        super().__init__(options)
+        self.script = script
+
+    async def connect(self, prompt: Any = None) -> None:
+        subprocess_cli.SubprocessCLITransport = _transport_factory  # type: ignore[misc]
+        token = _active_script.set(self.script)
+        try:
+            await super().connect(prompt)
+        finally:
+            _active_script.reset(token)
+
+    @property
+    def transport(self) -> ScriptedTransport:
+        assert isinstance(self._transport, ScriptedTransport)
+        return self._transport
@@ -0,0 +1,231 @@
+"""Wall-clock sampling profiler for agent runs, with spans for tools and hooks.
+
+A background thread snapshots every thread's Python stack with
+``sys._current_frames()`` every ``interval`` seconds. Nothing is traced, so the
+profiled code runs at normal speed; the cost is one stack walk per thread per
+sample, on the sampler thread. Idle time is kept on purpose: samples where the
+event loop sits in ``select`` are time spent waiting on the CLI or the model.
+
+Tool handlers and hooks wrapped with ``profile_tools()`` / ``profile_hooks()``
+run inside a named span (``tool:list_tasks``, ``hook:PreToolUse:pre_tool_hook``).
+Every stack starts with a ``[thread <name>]`` frame, followed by a
+``[<span>]`` frame for each span that was open in that thread (on the event
+loop thread: in the task running at that moment). The wall time of each span
+is recorded as well.
+
+On exit ``write_collapsed()`` writes one ``frame;frame;... count`` line per
+distinct stack, the input format of flamegraph.pl, speedscope and inferno,
+and ``summary()`` lists the hottest functions and the span timings.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any
+
+from claude_code_sdk import HookMatcher, SdkMcpTool
+
+# leaf frames that mean "blocked", shown as idle in the summary
+IDLE_FRAMES = (
+    "selectors:",
+    "threading:Condition.wait",
+    "threading:Event.wait",
+    "thread:_worker",  # idle ThreadPoolExecutor worker
+    "queue:Queue.get",
+)
+
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.calls += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+
+class SamplingProfiler:
+    """Samples all threads until ``stop()``; usable as a context manager."""
+
+    def __init__(self, interval: float = 0.005, *, max_depth: int = 128) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter[str] = Counter()
+        self.spans: dict[str, SpanStats] = {}
+        self.samples = 0
+        self.elapsed = 0.0
+        self._labels: dict[CodeType, str] = {}
+        # open spans per asyncio task (or per thread outside of a task)
+        self._open: dict[object, list[str]] = {}
+        self._loops: dict[int, asyncio.AbstractEventLoop] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed = time.perf_counter() - self._started
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Tag samples and record wall time for the code run inside the block."""
+        try:
+            key: object = asyncio.current_task() or threading.get_ident()
+            self._loops[threading.get_ident()] = asyncio.get_running_loop()
+        except RuntimeError:
+            key = threading.get_ident()
+        stack = self._open.setdefault(key, [])
+        stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            if not stack:
+                del self._open[key]
+            self.spans.setdefault(name, SpanStats()).add(elapsed)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[self._collapse(ident, names.get(ident), frame)] += 1
+            self.samples += 1
+
+    def _open_spans(self, ident: int) -> list[str]:
+        loop = self._loops.get(ident)
+        if loop is not None:
+            task = asyncio.current_task(loop)
+            if task is not None and task in self._open:
+                return self._open[task]
+        return self._open.get(ident, [])
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{Path(code.co_filename).stem}:{code.co_qualname}"
+            label = self._labels[code] = label.replace(";", ":")
+        return label
+
+    def _collapse(self, ident: int, thread: str | None, frame: FrameType | None) -> str:
+        frames = []
+        while frame is not None and len(frames) < self.max_depth:
+            frames.append(self._label(frame.f_code))
+            frame = frame.f_back
+        frames.reverse()
+        root = [f"[thread {thread or ident}]"]
+        root += [f"[{name}]" for name in self._open_spans(ident)]
+        return ";".join(root + frames)
+
+    def write_collapsed(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def summary(self, top: int = 15) -> str:
+        """Hottest functions by own and total samples, then span timings."""
+        total = sum(self.stacks.values()) or 1
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            leaf = frames[-1]
+            if leaf.startswith(IDLE_FRAMES):
+                leaf = f"{leaf} (idle)"
+            own[leaf] += count
+            for name in set(frames[1:]):
+                inclusive[name] += count
+
+        lines = [
+            f"{self.samples} samples every {self.interval * 1000:.1f} ms "
+            f"over {self.elapsed:.1f}s, {len(self.stacks)} distinct stacks",
+            "",
+            f"{'own %':>6} {'total %':>7}  function",
+        ]
+        for name, count in own.most_common(top):
+            lines.append(
+                f"{count / total:>6.1%} {inclusive[name.removesuffix(' (idle)')] / total:>7.1%}  {name}"
+            )
+        if self.spans:
+            lines += ["", f"{'span':<36} {'calls':>6} {'total s':>8} {'max ms':>8}"]
+            for name, s in sorted(self.spans.items(), key=lambda item: -item[1].total):
+                lines.append(
+                    f"{name[:36]:<36} {s.calls:>6} {s.total:>8.3f} {s.max * 1000:>8.1f}"
+                )
+        return "\n".join(lines)
+
+
+def profile_tools(
+    tools: Iterable[SdkMcpTool[Any]], profiler: SamplingProfiler
+) -> list[SdkMcpTool[Any]]:
+    """Run every tool handler inside a ``tool:<name>`` span."""
+
+    def wrap(sdk_tool: SdkMcpTool[Any]) -> SdkMcpTool[Any]:
+        inner: Callable[[Any], Any] = sdk_tool.handler
+
+        async def handler(args: Any) -> dict[str, Any]:
+            with profiler.span(f"tool:{sdk_tool.name}"):
+                return await inner(args)
+
+        return SdkMcpTool(
+            name=sdk_tool.name,
+            description=sdk_tool.description,
+            input_schema=sdk_tool.input_schema,
+            handler=handler,
+        )
+
+    return [wrap(t) for t in tools]
+
+
+def profile_hooks(
+    hooks: dict[str, list[HookMatcher]], profiler: SamplingProfiler
+) -> dict[str, list[HookMatcher]]:
+    """Run every hook callback inside a ``hook:<event>:<function>`` span."""
+
+    def wrap(event: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        name = f"hook:{event}:{getattr(fn, '__name__', 'hook')}"
+
+        async def hook(*args: Any, **kwargs: Any) -> Any:
+            with profiler.span(name):
+                return await fn(*args, **kwargs)
+
+        return hook
+
+    return {
+        event: [
+            HookMatcher(matcher=m.matcher, hooks=[wrap(event, fn) for fn in m.hooks])
+            for m in matchers
+        ]
+        for event, matchers in hooks.items()
+    }
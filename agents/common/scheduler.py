@@ -0,0 +1,219 @@
+"""Deadline, budget and replacement handling on top of ``ClaudeSDKClient``.
+
+``QueryScheduler.submit()`` sends one query and drains its response. If the
+response overruns its ``Budget`` (wall time or estimated output tokens), or a
+newer ``submit()`` replaces it, the scheduler calls ``client.interrupt()`` and
+keeps draining until the ``ResultMessage`` that closes the interrupted turn has
+arrived, so the next query never sees stale messages. The time between the
+interrupt and that ``ResultMessage`` is reported as ``interrupt_latency``. A
+turn whose ``ResultMessage`` arrived before the overrun was noticed is not
+interrupted, and its ``interrupt_latency`` stays None.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from claude_code_sdk import (
+    AssistantMessage,
+    ClaudeSDKClient,
+    Message,
+    ResultMessage,
+    TextBlock,
+)
+
+from .streaming import ResponseConsumer
+
+
+@dataclass
+class Budget:
+    """Limits for a single query. ``None`` disables a limit."""
+
+    deadline: float | None = None  # seconds from query() to ResultMessage
+    max_output_tokens: int | None = None  # estimated from streamed text
+    # how long to wait for the interrupted turn to close
+    drain_timeout: float = 10.0
+
+
+@dataclass
+class QueryReport:
+    prompt: str
+    result: ResultMessage | None
+    elapsed: float
+    output_tokens: int = 0
+    interrupted: bool = False
+    reason: str | None = None  # "deadline" | "tokens" | "replaced"
+    interrupt_latency: float | None = None
+    drained: bool = True
+    skipped: bool = False  # replaced before it was sent
+
+    def summary(self) -> str:
+        if self.skipped:
+            return "skipped (replaced before start)"
+        if not self.interrupted:
+            return f"completed in {self.elapsed:.2f}s (~{self.output_tokens} tokens)"
+        text = f"interrupted ({self.reason}) after {self.elapsed:.2f}s"
+        if self.interrupt_latency is not None:
+            text += f", idle {self.interrupt_latency:.3f}s after interrupt"
+        if not self.drained:
+            text += ", response not drained"
+        return text
+
+
+class _ActiveQuery:
+    def __init__(self) -> None:
+        self.overrun = asyncio.Event()
+        self.reason: str | None = None
+        self.interrupted = False
+        self.idle_at: float | None = None
+        self.output_chars = 0
+
+    def stop(self, reason: str) -> None:
+        if self.reason is None:
+            self.reason = reason
+        self.overrun.set()
+
+
+class QueryScheduler:
+    """Run queries on one connected client, one at a time, within a budget.
+
+    Messages are forwarded to ``consumer`` (for example a renderer from
+    ``common.streaming``) until the query is interrupted. After that the
+    remaining messages of the turn are discarded without rendering, except for
+    the closing ``ResultMessage``.
+    """
+
+    def __init__(
+        self,
+        client: ClaudeSDKClient,
+        *,
+        consumer: ResponseConsumer | None = None,
+        default_budget: Budget | None = None,
+        chars_per_token: float = 4.0,
+    ) -> None:
+        self.client = client
+        self.consumer = consumer or ResponseConsumer()
+        self.default_budget = default_budget or Budget()
+        self.chars_per_token = chars_per_token
+        self._lock = asyncio.Lock()
+        self._active: _ActiveQuery | None = None
+        self._generation = 0
+        self._stale = False
+
+    async def submit(self, prompt: str, budget: Budget | None = None) -> QueryReport:
+        """Send ``prompt``, interrupting whatever query is currently running.
+
+        Queries that were waiting for their turn and have been superseded by a
+        newer ``submit()`` are not sent at all.
+        """
+        self._generation += 1
+        generation = self._generation
+        if self._active is not None:
+            self._active.stop("replaced")
+
+        async with self._lock:
+            if generation != self._generation:
+                return QueryReport(
+                    prompt=prompt,
+                    result=None,
+                    elapsed=0.0,
+                    reason="replaced",
+                    skipped=True,
+                )
+            return await self._run(prompt, budget or self.default_budget)
+
+    def cancel_current(self) -> None:
+        """Interrupt the running query without sending a replacement."""
+        if self._active is not None:
+            self._active.stop("cancelled")
+
+    async def _run(self, prompt: str, budget: Budget) -> QueryReport:
+        if self._stale:
+            self._stale = not await self._drain_leftovers(budget.drain_timeout)
+
+        active = _ActiveQuery()
+        self._active = active
+        started = time.monotonic()
+        try:
+            await self.client.query(prompt)
+            consumer = asyncio.create_task(
+                self.consumer.consume(self._stream(active, budget))
+            )
+            overrun = asyncio.create_task(active.overrun.wait())
+            timeout = None
+            if budget.deadline is not None:
+                timeout = max(0.0, budget.deadline - (time.monotonic() - started))
+
+            await asyncio.wait(
+                {consumer, overrun},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            overrun.cancel()
+
+            report = QueryReport(prompt=prompt, result=None, elapsed=0.0)
+            if not consumer.done() and active.idle_at is not None:
+                # the turn already ended and only the consumer is still busy
+                # with its ResultMessage: there is nothing left to interrupt
+                await consumer
+            elif not consumer.done():
+                active.stop("deadline")
+                active.interrupted = True
+                interrupted_at = time.monotonic()
+                await self.client.interrupt()
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(consumer), budget.drain_timeout
+                    )
+                except TimeoutError:
+                    consumer.cancel()
+                    report.drained = False
+                    self._stale = True
+                if active.idle_at is not None:  # set after interrupted_at
+                    report.interrupt_latency = active.idle_at - interrupted_at
+                report.interrupted = True
+                report.reason = active.reason
+
+            if consumer.done() and not consumer.cancelled():
+                report.result = consumer.result()
+            report.elapsed = time.monotonic() - started
+            report.output_tokens = int(active.output_chars / self.chars_per_token)
+            return report
+        finally:
+            self._active = None
+
+    async def _stream(
+        self, active: _ActiveQuery, budget: Budget
+    ) -> AsyncIterator[Message]:
+        async for message in self.client.receive_response():
+            if isinstance(message, ResultMessage):
+                active.idle_at = time.monotonic()
+                yield message
+                continue
+
+            if active.interrupted:
+                continue  # stale part of an interrupted turn
+
+            if isinstance(message, AssistantMessage):
+                for block in message.content:
+                    if isinstance(block, TextBlock):
+                        active.output_chars += len(block.text)
+                if (
+                    budget.max_output_tokens is not None
+                    and active.output_chars / self.chars_per_token
+                    > budget.max_output_tokens
+                ):
+                    active.stop("tokens")
+            yield message
+
+    async def _drain_leftovers(self, timeout: float) -> bool:
+        async def drain() -> None:
+            async for _ in self.client.receive_response():
+                pass
+
+        try:
+            await asyncio.wait_for(drain(), timeout)
+        except TimeoutError:
+            return False
+        return True
@@ -0,0 +1,143 @@
+"""On-disk index of Claude Code sessions for resume and fork.
+
+Every ``ResultMessage`` carries the ``session_id`` of the conversation. The
+index keeps one row per session (title, parent, cost, turns, last use), so a
+later process can pass ``resume=<id>`` instead of re-sending the whole
+conversation, or fork it into a new session with ``--fork-session``.
+"""
+
+import sqlite3
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+
+from claude_code_sdk import ClaudeCodeOptions, ResultMessage
+
+
+@dataclass
+class SessionRecord:
+    session_id: str
+    title: str | None
+    parent_id: str | None
+    created_at: str
+    last_used_at: str
+    num_queries: int
+    num_turns: int
+    total_cost_usd: float
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class SessionIndex:
+    """SQLite backed session index. The cost of every recorded query is added up."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(str(path))
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    parent_id TEXT,
+                    created_at TEXT NOT NULL,
+                    last_used_at TEXT NOT NULL,
+                    num_queries INTEGER NOT NULL DEFAULT 0,
+                    num_turns INTEGER NOT NULL DEFAULT 0,
+                    total_cost_usd REAL NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_last_used ON sessions(last_used_at)"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def record(
+        self,
+        result: ResultMessage,
+        *,
+        title: str | None = None,
+        parent_id: str | None = None,
+        cost_usd: float | None = None,
+    ) -> SessionRecord:
+        """Add one finished query to the session it belongs to.
+
+        ``cost_usd`` is the cost of this query alone, from
+        ``common.metrics.SessionCosts``.
+        It defaults to ``result.total_cost_usd``, which is only right for the
+        first query of a client.
+        """
+        now = _now()
+        if cost_usd is None:
+            cost_usd = result.total_cost_usd or 0.0
+        if parent_id == result.session_id:
+            parent_id = None
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO sessions (
+                    session_id, title, parent_id, created_at, last_used_at,
+                    num_queries, num_turns, total_cost_usd
+                )
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    title = COALESCE(sessions.title, excluded.title),
+                    parent_id = COALESCE(sessions.parent_id, excluded.parent_id),
+                    last_used_at = excluded.last_used_at,
+                    num_queries = sessions.num_queries + 1,
+                    num_turns = sessions.num_turns + excluded.num_turns,
+                    total_cost_usd = sessions.total_cost_usd + excluded.total_cost_usd
+                """,
+                (
+                    result.session_id,
+                    title,
+                    parent_id,
+                    now,
+                    now,
+                    result.num_turns,
+                    cost_usd,
+                ),
+            )
+        record = self.get(result.session_id)
+        assert record is not None
+        return record
+
+    def get(self, session_id: str) -> SessionRecord | None:
+        row = self._conn.execute(
+            "SELECT * FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return SessionRecord(**dict(row)) if row else None
+
+    def latest(self) -> SessionRecord | None:
+        sessions = self.list(limit=1)
+        return sessions[0] if sessions else None
+
+    def list(self, limit: int = 20) -> list[SessionRecord]:
+        rows = self._conn.execute(
+            "SELECT * FROM sessions ORDER BY last_used_at DESC, rowid DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [SessionRecord(**dict(row)) for row in rows]
+
+    def find(self, prefix: str) -> SessionRecord | None:
+        """Look up a session by id or unambiguous id prefix."""
+        rows = self._conn.execute(
+            "SELECT * FROM sessions WHERE session_id LIKE ? || '%' LIMIT 2",
+            (prefix,),
+        ).fetchall()
+        return SessionRecord(**dict(rows[0])) if len(rows) == 1 else None
+
+
+def resume_options(
+    options: ClaudeCodeOptions, session_id: str, *, fork: bool = False
+) -> ClaudeCodeOptions:
+    """Options that continue ``session_id``, or branch off it when ``fork`` is set."""
+    extra_args = dict(options.extra_args)
+    if fork:
+        extra_args["fork-session"] = None
+    return replace(options, resume=session_id, extra_args=extra_args)
@@ -0,0 +1,147 @@
+"""Coalesce identical concurrent calls to read-only SDK MCP tools.
+
+When several sessions (or parallel tool uses in one turn) call the same tool
+with the same arguments while a call is still running, only the first one
+executes. The others wait for it and get a copy of its result, so a burst of
+identical ``list_tasks`` calls costs one query and one render.
+
+Only calls that overlap are coalesced; nothing is cached after the leader
+finishes. A caller that joins late may therefore see a result computed just
+before a concurrent write committed, which is why this is opt-in and must
+only be used for tools without side effects:
+
+    @single_flight(read_only=True, scope=current_project.get)
+    @tool("list_tasks", ...)
+    async def list_tasks(args): ...
+
+``scope`` adds ambient state that changes the result without being an
+argument (such as the project context variable) to the key.
+"""
+
+import asyncio
+import copy
+import json
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from claude_code_sdk import SdkMcpTool
+
+
+def canonical_args(args: Any) -> str:
+    """Stable text form of tool arguments: sorted keys, no whitespace."""
+    return json.dumps(
+        args, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=repr
+    )
+
+
+@dataclass
+class FlightStats:
+    calls: int = 0
+    executions: int = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self.calls - self.executions
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task[Any]
+    waiters: int = 0
+
+
+@dataclass
+class SingleFlight:
+    """A group of in-flight calls keyed by ``(tool, scope, arguments)``."""
+
+    tools: dict[str, FlightStats] = field(default_factory=dict)
+    _flights: dict[Hashable, _Flight] = field(default_factory=dict, repr=False)
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn()`` unless a call with the same key is running, then join it."""
+        stats = self.tools.setdefault(name, FlightStats())
+        stats.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            stats.executions += 1
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            leader = True
+        else:
+            leader = False
+
+        flight.waiters += 1
+        try:
+            # shield: one waiter being cancelled must not cancel the others
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()  # nobody is left to use the result
+            raise
+        finally:
+            flight.waiters -= 1
+        # waiters must not share mutable result objects with the leader
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def report(self) -> str:
+        lines = [f"{'tool':<24} {'calls':>6} {'runs':>6} {'joined':>6}"]
+        for name, s in sorted(self.tools.items(), key=lambda item: -item[1].coalesced):
+            lines.append(
+                f"{name[:24]:<24} {s.calls:>6} {s.executions:>6} {s.coalesced:>6}"
+            )
+        return "\n".join(lines)
+
+
+DEFAULT_GROUP = SingleFlight()
+
+
+def single_flight(
+    *,
+    read_only: bool,
+    group: SingleFlight | None = None,
+    scope: Callable[[], Hashable] | None = None,
+) -> Callable[[SdkMcpTool[Any]], SdkMcpTool[Any]]:
+    """Decorator for an ``SdkMcpTool`` that coalesces identical concurrent calls.
+
+    ``read_only=True`` is required: it states that the tool has no side
+    effects, so running it once for several callers is safe.
+    """
+    if not read_only:
+        raise ValueError("single_flight is only safe for read-only tools")
+    group = group if group is not None else DEFAULT_GROUP
+
+    def decorate(sdk_tool: SdkMcpTool[Any]) -> SdkMcpTool[Any]:
+        inner: Callable[[Any], Any] = sdk_tool.handler
+
+        async def handler(args: Any) -> dict[str, Any]:
+            key = (
+                sdk_tool.name,
+                scope() if scope is not None else None,
+                canonical_args(args),
+            )
+            return await group.do(sdk_tool.name, key, lambda: inner(args))
+
+        return SdkMcpTool(
+            name=sdk_tool.name,
+            description=sdk_tool.description,
+            input_schema=sdk_tool.input_schema,
+            handler=handler,
+        )
+
+    return decorate
+
+
+def single_flight_tools(
+    tools: Iterable[SdkMcpTool[Any]],
+    *,
+    read_only: bool,
+    group: SingleFlight | None = None,
+    scope: Callable[[], Hashable] | None = None,
+) -> list[SdkMcpTool[Any]]:
+    decorate = single_flight(read_only=read_only, group=group, scope=scope)
+    return [decorate(t) for t in tools]
@@ -0,0 +1,305 @@
+"""Incremental rendering of ``ClaudeSDKClient`` response streams.
+
+``client.receive_response()`` yields whole messages. The consumers here handle
+every content block as soon as its message arrives instead of re-walking the
+message afterwards, and only keep a bounded amount of state around:
+
+- ``history`` is a ring buffer of the most recent messages
+- assistant text is buffered per segment, and a segment is flushed as soon as
+  a tool call starts, the response ends or it grows past ``max_segment_chars``
+
+claude-code-sdk 0.0.22 does not expose token level deltas, so the unit of
+incremental output is one ``TextBlock``.
+
+rich is only imported once a ``RichRenderer`` is used, so plain and headless
+consumers do not load it (and scripts using them need not depend on it).
+"""
+
+from collections import deque
+from collections.abc import AsyncIterable
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Any
+
+from claude_code_sdk import (
+    AssistantMessage,
+    Message,
+    ResultMessage,
+    TextBlock,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+
+if TYPE_CHECKING:
+    from rich.console import Console, Group
+    from rich.live import Live
+    from rich.panel import Panel
+
+
+@dataclass
+class Labels:
+    """User facing strings, so front-ends in different languages can share a renderer."""
+
+    assistant: str = "Claude"
+    tool_title: str = "Tool"
+    tool: str = "Using tool"
+    tool_input: str = "Input"
+    tool_result: str = "Tool Result"
+    result: str = "Result ended"
+    cost: str = "Cost"
+    status: str = "Claude is thinking..."
+
+
+def format_tool_input(tool_input: dict[str, Any]) -> str:
+    return ", ".join(f"{k}={v}" for k, v in tool_input.items())
+
+
+class ResponseConsumer:
+    """Dispatch the content of a response stream block by block.
+
+    Subclasses override the ``on_*`` callbacks. The base class takes care of
+    text segmentation and of keeping ``history`` bounded.
+    """
+
+    def __init__(
+        self,
+        *,
+        labels: Labels | None = None,
+        history_size: int = 100,
+        max_segment_chars: int = 4000,
+    ) -> None:
+        self.labels = labels or Labels()
+        self.history: deque[Message] = deque(maxlen=history_size)
+        self.max_segment_chars = max_segment_chars
+        self.last_result: ResultMessage | None = None
+        self._segment: list[str] = []
+        self._segment_len = 0
+
+    async def consume(self, messages: AsyncIterable[Message]) -> ResultMessage | None:
+        """Drain ``messages`` (typically ``client.receive_response()``).
+
+        Returns the final ``ResultMessage`` if the stream produced one.
+        """
+        self.last_result = None
+        self.on_start()
+        try:
+            async for message in messages:
+                self.feed(message)
+        finally:
+            self.flush()
+            self.on_finish()
+        return self.last_result
+
+    def feed(self, message: Message) -> None:
+        self.history.append(message)
+
+        if isinstance(message, AssistantMessage):
+            for block in message.content:
+                if isinstance(block, TextBlock):
+                    self._append_text(block.text)
+                elif isinstance(block, ToolUseBlock):
+                    self.flush()
+                    self.on_tool_use(block)
+        elif isinstance(message, UserMessage):
+            if isinstance(message.content, list):
+                for block in message.content:
+                    if isinstance(block, ToolResultBlock):
+                        self.on_tool_result(block)
+        elif isinstance(message, ResultMessage):
+            self.flush()
+            self.last_result = message
+            self.on_result(message)
+
+    @property
+    def pending_text(self) -> str:
+        """Assistant text received but not flushed yet."""
+        return "\n\n".join(self._segment)
+
+    def flush(self) -> None:
+        if not self._segment:
+            return
+        text = self.pending_text
+        self._segment.clear()
+        self._segment_len = 0
+        self.on_text(text)
+
+    def _append_text(self, text: str) -> None:
+        if not text:
+            return
+        self._segment.append(text)
+        self._segment_len += len(text)
+        if self._segment_len >= self.max_segment_chars:
+            self.flush()
+
+    def on_start(self) -> None:
+        pass
+
+    def on_finish(self) -> None:
+        pass
+
+    def on_text(self, text: str) -> None:
+        pass
+
+    def on_tool_use(self, block: ToolUseBlock) -> None:
+        pass
+
+    def on_tool_result(self, block: ToolResultBlock) -> None:
+        pass
+
+    def on_result(self, message: ResultMessage) -> None:
+        pass
+
+
+class PlainRenderer(ResponseConsumer):
+    """Line oriented output for the examples and for non-terminal use.
+
+    Every text block is written out as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        file: IO[str] | None = None,
+        *,
+        show_tools: bool = True,
+        show_tool_results: bool = False,
+        show_cost: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.setdefault("max_segment_chars", 0)
+        super().__init__(**kwargs)
+        self.file = file
+        self.show_tools = show_tools
+        self.show_tool_results = show_tool_results
+        self.show_cost = show_cost
+
+    def _print(self, text: str) -> None:
+        print(text, file=self.file, flush=True)
+
+    def on_text(self, text: str) -> None:
+        self._print(f"{self.labels.assistant}: {text}")
+
+    def on_tool_use(self, block: ToolUseBlock) -> None:
+        if not self.show_tools:
+            return
+        self._print(f"{self.labels.tool}: {block.name}")
+        if block.input:
+            self._print(f"  {self.labels.tool_input}: {format_tool_input(block.input)}")
+
+    def on_tool_result(self, block: ToolResultBlock) -> None:
+        if not self.show_tool_results:
+            return
+        content = (
+            block.content if isinstance(block.content, str) else str(block.content)
+        )
+        self._print(
+            f"{self.labels.tool_result}: {content[:100] if block.content else 'None'}..."
+        )
+
+    def on_result(self, message: ResultMessage) -> None:
+        self._print(self.labels.result)
+        if self.show_cost and message.total_cost_usd:
+            self._print(f"{self.labels.cost}: ${message.total_cost_usd:.6f}")
+
+
+class _LiveView:
+    """Renderable evaluated by ``Live`` on each frame, not on each message."""
+
+    def __init__(self, renderer: "RichRenderer") -> None:
+        self.renderer = renderer
+
+    def __rich__(self) -> "Group":
+        from rich.console import Group
+        from rich.spinner import Spinner
+        from rich.text import Text
+
+        renderer = self.renderer
+        parts: list[Any] = []
+        pending = renderer.pending_text
+        if pending:
+            lines = pending.splitlines()[-renderer.tail_lines :]
+            parts.append(renderer.text_panel("\n".join(lines)))
+        parts.append(Spinner("dots", text=Text.from_markup(renderer.labels.status)))
+        return Group(*parts)
+
+
+class RichRenderer(ResponseConsumer):
+    """Panel based output with a single ``Live`` region per response.
+
+    The live region shows a spinner and the tail of the text segment that is
+    still being received. ``Live`` repaints on its own timer, at most
+    ``max_fps`` times per second, so a burst of messages costs one frame
+    instead of one repaint (and one spinner restart) per content block.
+    """
+
+    def __init__(
+        self,
+        console: "Console | None" = None,
+        *,
+        max_fps: float = 12.0,
+        tail_lines: int = 20,
+        show_cost: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        if console is None:
+            from rich.console import Console
+
+            console = Console()
+        self.console = console
+        self.max_fps = max_fps
+        self.tail_lines = tail_lines
+        self.show_cost = show_cost
+        self._live: "Live | None" = None
+
+    def text_panel(self, text: str) -> "Panel":
+        from rich.panel import Panel
+        from rich.text import Text
+
+        return Panel(
+            Text(text, style="white"),
+            title=self.labels.assistant,
+            title_align="left",
+            border_style="blue",
+            padding=(0, 1),
+        )
+
+    def on_start(self) -> None:
+        from rich.live import Live
+
+        self._live = Live(
+            _LiveView(self),
+            console=self.console,
+            refresh_per_second=self.max_fps,
+            transient=True,
+        )
+        self._live.start()
+
+    def on_finish(self) -> None:
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def on_text(self, text: str) -> None:
+        self.console.print(self.text_panel(text))
+
+    def on_tool_use(self, block: ToolUseBlock) -> None:
+        from rich.panel import Panel
+
+        tool_info = f"[bold cyan]{self.labels.tool}:[/bold cyan] {block.name}"
+        if block.input:
+            tool_info += f"\n[dim]{self.labels.tool_input}: {format_tool_input(block.input)}[/dim]"
+        self.console.print(
+            Panel(
+                tool_info,
+                title=self.labels.tool_title,
+                title_align="left",
+                border_style="green",
+                padding=(0, 1),
+            )
+        )
+
+    def on_result(self, message: ResultMessage) -> None:
+        if self.show_cost and message.total_cost_usd:
+            self.console.print(
+                f"[dim]{self.labels.cost}: ${message.total_cost_usd:.6f}[/dim]"
+            )
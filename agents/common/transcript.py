@@ -0,0 +1,533 @@
+# /// script
+# dependencies = [
+#   "claude-code-sdk==0.0.22",
+#   "msgpack",
+# ]
+# requires-python = ">=3.11"
+# ///
+"""Binary transcripts of agent runs with an index for random access.
+
+``TranscriptRecorder.record()`` wraps a response stream, passes every message
+through unchanged, and appends it to a log file as one record:
+
+    <u32 payload length> <u32 crc32 of payload> <msgpack payload>
+
+after an 8-byte file header. The payload is ``[stream, unix time, message]``;
+SDK dataclasses (messages and content blocks) are msgpack extension objects
+holding the class name and the field values, so ``read()`` gives back the
+same ``AssistantMessage`` / ``ToolUseBlock`` objects. ``stream`` tells apart
+responses recorded concurrently (batch mode) into the same file.
+
+A SQLite file next to the log (``<log>.idx``) has one row per record with its
+byte offset, session, turn (the n-th response of that session in this log),
+message kind and the tools it used or returned results for. ``TranscriptReader``
+queries that index and reads only the matching records through ``mmap``, so
+looking at one turn of a multi-gigabyte archive touches a few pages.
+
+The log is the source of truth: records are written before they are indexed,
+a torn record at the end (crash mid-write) is ignored, and ``reindex()``
+rebuilds the index from the log alone.
+
+    uv run agents/common/transcript.py agents/examples/hello_claude/transcript.bin
+    uv run agents/common/transcript.py transcript.bin --session <id> --turn 0
+    uv run agents/common/transcript.py transcript.bin --tool mcp__task_manager__list_tasks
+"""
+
+import argparse
+import dataclasses
+import functools
+import mmap
+import os
+import secrets
+import sqlite3
+import struct
+import time
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import msgpack
+from claude_code_sdk import (
+    AssistantMessage,
+    Message,
+    ResultMessage,
+    SystemMessage,
+    TextBlock,
+    ThinkingBlock,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks: only one process may append to a log
+    fcntl = None
+
+MAGIC = b"CCTRN\x00\x00\x01"
+RECORD_HEADER = struct.Struct("<II")
+# finished responses per index transaction when catching up with the log
+CATCH_UP_BATCH = 1000
+# msgpack extension type for SDK dataclasses
+EXT_DATACLASS = 1
+SDK_TYPES = {
+    cls.__name__: cls
+    for cls in (
+        UserMessage,
+        AssistantMessage,
+        SystemMessage,
+        ResultMessage,
+        TextBlock,
+        ThinkingBlock,
+        ToolUseBlock,
+        ToolResultBlock,
+    )
+}
+
+
+def index_path_for(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+@functools.cache
+def _field_names(cls: type) -> tuple[str, ...]:
+    return tuple(f.name for f in dataclasses.fields(cls))
+
+
+def _default(obj: Any) -> Any:
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        fields = {name: getattr(obj, name) for name in _field_names(type(obj))}
+        data = msgpack.packb([type(obj).__name__, fields], default=_default)
+        return msgpack.ExtType(EXT_DATACLASS, data)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code != EXT_DATACLASS:
+        return msgpack.ExtType(code, data)
+    name, fields = _unpack(data)
+    cls = SDK_TYPES.get(name)
+    if cls is None:
+        return {"type": name, **fields}
+    # tolerate fields added or removed by another SDK version
+    known = _field_names(cls)
+    return cls(**{k: v for k, v in fields.items() if k in known})
+
+
+def _unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_ext_hook, strict_map_key=False)
+
+
+def encode_record(stream: int, at: float, message: Any) -> bytes:
+    payload = msgpack.packb([stream, at, message], default=_default)
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def message_session(message: Any) -> str | None:
+    if isinstance(message, ResultMessage):
+        return message.session_id
+    if isinstance(message, SystemMessage):
+        return message.data.get("session_id")
+    return None
+
+
+@dataclass
+class _Turn:
+    """Records of one response stream until its session and end are known."""
+
+    stream: int
+    session: str | None = None
+    rows: list[tuple[int, int, str, float, list[str]]] = field(default_factory=list)
+    tool_names: dict[str, str] = field(default_factory=dict)
+
+    def add(self, offset: int, length: int, at: float, message: Any) -> None:
+        tools = []
+        content = getattr(message, "content", None)
+        for block in content if isinstance(content, list) else ():
+            if isinstance(block, ToolUseBlock):
+                self.tool_names[block.id] = block.name
+                tools.append(block.name)
+            elif isinstance(block, ToolResultBlock):
+                tools.append(self.tool_names.get(block.tool_use_id, "(unknown)"))
+        self.session = self.session or message_session(message)
+        self.rows.append((offset, length, type(message).__name__, at, tools))
+
+
+class TranscriptIndex:
+    """The SQLite side index of a transcript log."""
+
+    def __init__(self, path: Path) -> None:
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS records (
+                seq INTEGER PRIMARY KEY,
+                offset INTEGER NOT NULL UNIQUE,
+                length INTEGER NOT NULL,
+                session TEXT,
+                turn INTEGER,
+                kind TEXT NOT NULL,
+                at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS records_session ON records (session, turn);
+            CREATE TABLE IF NOT EXISTS record_tools (
+                tool TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (tool, seq)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+
+    @property
+    def indexed_until(self) -> int:
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'indexed_until'"
+        ).fetchone()
+        return row[0] if row else len(MAGIC)
+
+    def add_turns(
+        self, turns: Iterable[_Turn], *, indexed_until: int | None = None
+    ) -> None:
+        """Index finished streams in one transaction."""
+        with self.conn:
+            for turn in turns:
+                self._insert(turn)
+            if indexed_until is not None:
+                self.set_indexed_until(indexed_until)
+
+    def _insert(self, turn: _Turn) -> None:
+        number = None
+        if turn.session is not None:
+            (number,) = self.conn.execute(
+                "SELECT COALESCE(MAX(turn) + 1, 0) FROM records WHERE session = ?",
+                (turn.session,),
+            ).fetchone()
+        for offset, length, kind, at, tools in turn.rows:
+            cursor = self.conn.execute(
+                """INSERT OR IGNORE INTO records
+                   (offset, length, session, turn, kind, at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (offset, length, turn.session, number, kind, at),
+            )
+            if cursor.rowcount:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO record_tools (tool, seq) VALUES (?, ?)",
+                    ((tool, cursor.lastrowid) for tool in tools),
+                )
+
+    def set_indexed_until(self, offset: int) -> None:
+        self.conn.execute(
+            """INSERT INTO meta (key, value) VALUES ('indexed_until', ?)
+               ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)""",
+            (offset,),
+        )
+
+    def clear(self) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM record_tools")
+            self.conn.execute("DELETE FROM records")
+            self.conn.execute("DELETE FROM meta")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class TranscriptRecorder:
+    """Appends response streams to a transcript log and indexes them.
+
+    Several processes may record into the same log: every record is one
+    ``write()`` under an exclusive ``flock``.
+    """
+
+    def __init__(self, path: Path, *, index_path: Path | None = None) -> None:
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._end = 0  # end of our last write
+        self._open_turns: dict[int, _Turn] = {}  # by stream
+        with self._locked():
+            size = os.fstat(self._fd).st_size
+            if size == 0:
+                os.write(self._fd, MAGIC)
+            elif os.pread(self._fd, len(MAGIC), 0) != MAGIC:
+                os.close(self._fd)
+                raise ValueError(f"{path} is not a transcript log")
+            self.index = TranscriptIndex(index_path or index_path_for(path))
+            if self.index.indexed_until > size:  # index of an older, longer log
+                self.index.clear()
+            # index what a previous run left unindexed, and cut off a record it
+            # did not finish writing so that new records follow a valid one
+            log = _LogView(path)
+            try:
+                end = catch_up(log, self.index)
+            finally:
+                log.close()
+            if end < os.fstat(self._fd).st_size:
+                os.ftruncate(self._fd, end)
+
+    def _locked(self) -> "_FileLock":
+        return _FileLock(self._fd)
+
+    def append(self, stream: int, message: Any) -> tuple[int, int, float]:
+        """Write one record; returns (offset, payload length, time)."""
+        at = time.time()
+        record = encode_record(stream, at, message)
+        if self._fd < 0:
+            raise ValueError(f"{self.path} recorder is closed")
+        with self._locked():
+            offset = os.lseek(self._fd, 0, os.SEEK_END)
+            os.write(self._fd, record)
+        self._end = offset + len(record)
+        return offset, len(record) - RECORD_HEADER.size, at
+
+    async def record(self, messages: AsyncIterable[Message]) -> AsyncIterator[Message]:
+        """Pass ``messages`` through, recording each one as it arrives."""
+        turn = _Turn(stream=secrets.randbits(63))
+        self._open_turns[turn.stream] = turn
+        try:
+            async for message in messages:
+                offset, length, at = self.append(turn.stream, message)
+                turn.add(offset, length, at, message)
+                yield message
+        finally:
+            # a consumer that stopped early may finalize us after close(),
+            # which has already indexed what we recorded
+            if self._open_turns.pop(turn.stream, None) is not None:
+                # nothing of ours is pending and nobody else appended since our
+                # last write: everything up to the end of the log is indexed
+                done = None
+                if not self._open_turns:
+                    if os.fstat(self._fd).st_size == self._end:
+                        done = self._end
+                self.index.add_turns([turn], indexed_until=done)
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        # index the partial turns of streams that are still open
+        if self._open_turns:
+            self.index.add_turns(list(self._open_turns.values()), indexed_until=None)
+            self._open_turns.clear()
+        self.index.close()
+        os.close(self._fd)
+        self._fd = -1
+
+    def __enter__(self) -> "TranscriptRecorder":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class _FileLock:
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+
+    def __enter__(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc: object) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+@dataclass(frozen=True)
+class TranscriptEntry:
+    seq: int
+    offset: int
+    length: int
+    session: str | None
+    turn: int | None
+    kind: str
+    at: float
+
+
+class _LogView:
+    """Read-only ``mmap`` of a transcript log that follows its growth."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = path.open("rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a transcript log")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _slice(self, start: int, end: int) -> bytes | None:
+        """Bytes ``[start, end)`` of the log, remapping once if it has grown."""
+        if end > len(self._map):
+            if end > os.fstat(self._file.fileno()).st_size:
+                return None
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[start:end]
+
+    def payload(self, offset: int) -> bytes | None:
+        """The payload of the record at ``offset``; None if torn or corrupt."""
+        header = self._slice(offset, offset + RECORD_HEADER.size)
+        if header is None:
+            return None
+        length, crc = RECORD_HEADER.unpack(header)
+        start = offset + RECORD_HEADER.size
+        payload = self._slice(start, start + length)
+        if payload is None or zlib.crc32(payload) != crc:
+            return None
+        return payload
+
+    def scan(self, start: int = len(MAGIC)) -> Iterator[tuple[int, int, list[Any]]]:
+        """Every complete record from ``start``: (offset, payload length, payload)."""
+        offset = start
+        while (payload := self.payload(offset)) is not None:
+            yield offset, len(payload), _unpack(payload)
+            offset += RECORD_HEADER.size + len(payload)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def catch_up(log: _LogView, index: TranscriptIndex, *, final: bool = False) -> int:
+    """Index the records after ``indexed_until``; returns the end of the last one.
+
+    A response is indexed once its ``ResultMessage`` is in the log. Streams
+    without one may still be running in a recorder that will index them
+    itself, so they are left for later, unless ``final`` is set (rebuilding
+    the index of a log nobody writes to).
+    """
+    pending: dict[int, _Turn] = {}
+    finished: list[_Turn] = []
+    end = index.indexed_until
+    for offset, length, (stream, at, message) in log.scan(end):
+        turn = pending.setdefault(stream, _Turn(stream=stream))
+        turn.add(offset, length, at, message)
+        end = offset + RECORD_HEADER.size + length
+        if isinstance(message, ResultMessage):
+            finished.append(pending.pop(stream))
+            if len(finished) >= CATCH_UP_BATCH:
+                index.add_turns(finished)
+                finished.clear()
+    if final:
+        finished += pending.values()
+        pending.clear()
+    index.add_turns(
+        finished,
+        indexed_until=min((t.rows[0][0] for t in pending.values()), default=end),
+    )
+    return end
+
+
+class TranscriptReader:
+    """Random access to a transcript log through its index and ``mmap``."""
+
+    def __init__(self, path: Path, *, index_path: Path | None = None) -> None:
+        self.path = path
+        self.log = _LogView(path)
+        self.index = TranscriptIndex(index_path or index_path_for(path))
+        catch_up(self.log, self.index)
+
+    def read(self, entry: TranscriptEntry) -> Message:
+        payload = self.log.payload(entry.offset)
+        if payload is None:
+            raise ValueError(f"corrupt record at offset {entry.offset}")
+        return _unpack(payload)[2]
+
+    def find(
+        self,
+        *,
+        session: str | None = None,
+        turn: int | None = None,
+        tool: str | None = None,
+        kind: str | None = None,
+        limit: int | None = None,
+    ) -> list[TranscriptEntry]:
+        """Index entries matching all given filters, in log order."""
+        where, params = [], []
+        for column, value in (("session", session), ("turn", turn), ("kind", kind)):
+            if value is not None:
+                where.append(f"r.{column} = ?")
+                params.append(value)
+        if tool is not None:
+            where.append("r.seq IN (SELECT seq FROM record_tools WHERE tool = ?)")
+            params.append(tool)
+        sql = "SELECT r.seq, r.offset, r.length, r.session, r.turn, r.kind, r.at FROM records r"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.offset"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [TranscriptEntry(*row) for row in self.index.conn.execute(sql, params)]
+
+    def messages(self, **filters: Any) -> Iterator[tuple[TranscriptEntry, Message]]:
+        for entry in self.find(**filters):
+            yield entry, self.read(entry)
+
+    def sessions(self) -> list[tuple[str | None, int, int, float, float]]:
+        """(session, turns, records, first time, last time), most recent first."""
+        return self.index.conn.execute(
+            """SELECT session, COUNT(DISTINCT turn), COUNT(*), MIN(at), MAX(at)
+               FROM records GROUP BY session ORDER BY MAX(at) DESC"""
+        ).fetchall()
+
+    def reindex(self) -> None:
+        """Rebuild the index from the log, including unfinished responses."""
+        self.index.clear()
+        catch_up(self.log, self.index, final=True)
+
+    def close(self) -> None:
+        self.log.close()
+        self.index.close()
+
+    def __enter__(self) -> "TranscriptReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def format_message(message: Any, width: int = 160) -> str:
+    text = repr(message)
+    return text if len(text) <= width else text[: width - 1] + "…"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query a transcript log")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--session", help="session id")
+    parser.add_argument("--turn", type=int, help="n-th response of the session")
+    parser.add_argument("--tool", help="records that used or answered this tool")
+    parser.add_argument("--kind", help="message class, e.g. AssistantMessage")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--full", action="store_true", help="do not shorten messages")
+    parser.add_argument(
+        "--reindex", action="store_true", help="rebuild the index from the log first"
+    )
+    args = parser.parse_args()
+
+    with TranscriptReader(args.path) as reader:
+        if args.reindex:
+            reader.reindex()
+        filters = {
+            "session": args.session,
+            "turn": args.turn,
+            "tool": args.tool,
+            "kind": args.kind,
+        }
+        if not any(v is not None for v in filters.values()):
+            print(f"{'session':<38} {'turns':>5} {'records':>8}  last")
+            for session, turns, records, _, last in reader.sessions():
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last))
+                print(f"{session or '(unknown)':<38} {turns:>5} {records:>8}  {when}")
+            return
+        for entry, message in reader.messages(**filters, limit=args.limit):
+            text = repr(message) if args.full else format_message(message)
+            print(f"{entry.session or '-'} #{entry.turn} @{entry.offset}: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@
 # ///
 
 import asyncio
+import sys
+from pathlib import Path
+
 from claude_code_sdk import (
     ClaudeSDKClient,
     ClaudeCodeOptions,
@@ -15,6 +18,10 @@ from claude_code_sdk import (
     ToolPermissionContext,
 )
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.streaming import PlainRenderer  # noqa: E402
+
 
 async def custom_permission_handler(
     tool_name: str, input_data: dict, context: ToolPermissionContext
@@ -46,9 +53,8 @@ async def main():
     async with ClaudeSDKClient(options=options) as client:
         await client.query("Update the system config file")
 
-        async for message in client.receive_response():
-            # Will use sandbox path instead
-            print(message)
+        # Will use sandbox path instead
+        await PlainRenderer().consume(client.receive_response())
 
 
 asyncio.run(main())
@@ -2,18 +2,50 @@
 # /// script
 # dependencies = [
 #   "claude-code-sdk==0.0.22",
+#   "numpy",
 # ]
 # requires-python = ">=3.11"
 # ///
 
+import argparse
+import ast
 import asyncio
+import json
+import math
+import operator
+import sys
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
+
+import numpy as np
 from claude_code_sdk import (
     ClaudeCodeOptions,
+    ClaudeSDKClient,
     create_sdk_mcp_server,
     tool,
 )
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.cache import CachedClient, ResponseCache  # noqa: E402
+from common.compaction import CompactionPolicy, CompactionStats, compact_tools  # noqa: E402
+from common.metrics import MetricsCollector  # noqa: E402
+from common.profiling import SamplingProfiler, profile_tools  # noqa: E402
+from common.singleflight import SingleFlight, single_flight_tools  # noqa: E402
+from common.streaming import PlainRenderer  # noqa: E402
+
+METRICS_FILE = Path(__file__).parent / "metrics.jsonl"
+RESPONSE_CACHE_FILE = Path(__file__).parent / "response_cache.db"
+
+# Batch results can hold thousands of numbers; cap what goes back to the model
+TOOL_RESULT_MAX_TOKENS = 2000
+COMPACTION_STATS = CompactionStats()
+SINGLE_FLIGHT = SingleFlight()
+# Set by --profile; tool calls then run inside profiler spans
+PROFILER: SamplingProfiler | None = None
+
 # Define calculator tools using the @tool decorator
 
 
@@ -76,8 +108,6 @@ async def square_root(args: dict[str, Any]) -> dict[str, Any]:
             "is_error": True,
         }
 
-    import math
-
     result = math.sqrt(n)
     return {"content": [{"type": "text", "text": f"√{n} = {result}"}]}
 
@@ -85,83 +115,378 @@ async def square_root(args: dict[str, Any]) -> dict[str, Any]:
 @tool("power", "Raise a number to a power", {"base": float, "exponent": float})
 async def power(args: dict[str, Any]) -> dict[str, Any]:
     """Raise base to the exponent power."""
-    result = args["base"] ** args["exponent"]
+    try:
+        result = _checked_power(args["base"], args["exponent"])
+        text = f"{args['base']}^{args['exponent']} = {result}"
+    except (ValueError, OverflowError, ZeroDivisionError) as e:
+        return {
+            "content": [{"type": "text", "text": f"Error: {e}"}],
+            "is_error": True,
+        }
+    return {"content": [{"type": "text", "text": text}]}
+
+
+# Whole-expression evaluation, so multi-step arithmetic is a single tool call.
+# Expressions are parsed with ast and only whitelisted nodes are compiled into
+# closures; eval() is never used.
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_EXPONENT = 10000
+# Integer powers are exact, so their size is bounded up front: computing and
+# printing a huge int blocks the event loop (and str() fails past 4300 digits)
+MAX_RESULT_BITS = 10000
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+_UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FUNCTIONS = {
+    "sqrt": math.sqrt,
+    "abs": abs,
+    "round": round,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+def _checked_power(base: float, exponent: float) -> float:
+    # Python returns a complex number here, e.g. (-8) ** 0.5
+    if base < 0 and math.isfinite(exponent) and not float(exponent).is_integer():
+        raise ValueError(f"{base} cannot be raised to the fractional power {exponent}")
+    if abs(base) > 1:
+        if abs(exponent) > MAX_EXPONENT:
+            raise ValueError(f"Exponent {exponent} is too large")
+        if (
+            isinstance(base, int)
+            and isinstance(exponent, int)
+            and exponent * math.log2(abs(base)) > MAX_RESULT_BITS
+        ):
+            raise ValueError("Result is too large")
+    return base**exponent
+
+
+def _compile_node(node: ast.AST) -> Callable[[], float]:
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = node.value
+        return lambda: value
+
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        value = _CONSTANTS[node.id]
+        return lambda: value
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        unary = _UNARY_OPERATORS[type(node.op)]
+        operand = _compile_node(node.operand)
+        return lambda: unary(operand())
+
+    if isinstance(node, ast.BinOp):
+        left = _compile_node(node.left)
+        right = _compile_node(node.right)
+        if isinstance(node.op, ast.Pow):
+            return lambda: _checked_power(left(), right())
+        if type(node.op) in _BINARY_OPERATORS:
+            binary = _BINARY_OPERATORS[type(node.op)]
+            return lambda: binary(left(), right())
+
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCTIONS
+        and not node.keywords
+    ):
+        function = _FUNCTIONS[node.func.id]
+        arguments = [_compile_node(arg) for arg in node.args]
+        return lambda: function(*(arg() for arg in arguments))
+
+    raise ValueError(f"Unsupported syntax: {ast.unparse(node)}")
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression: str) -> Callable[[], float]:
+    """Parse and validate an expression once; later calls reuse the closure."""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError("Expression is too long")
+    normalized = (
+        expression.replace("^", "**").replace("×", "*").replace("÷", "/").strip()
+    )
+    try:
+        tree = ast.parse(normalized, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}") from None
+    return _compile_node(tree.body)
+
+
+@tool(
+    "evaluate",
+    "Evaluate a whole arithmetic expression in one step. Supports + - * / // % "
+    "and ** (or ^), parentheses, pi, e and sqrt/abs/round/floor/ceil. Prefer this "
+    "over chaining the single-operation tools.",
+    {"expression": str},
+)
+async def evaluate_expression(args: dict[str, Any]) -> dict[str, Any]:
+    """Evaluate an arithmetic expression without eval()."""
+    expression = args["expression"]
+    try:
+        # str() of a huge int raises ValueError, so format inside the try
+        text = f"{expression} = {compile_expression(expression)()}"
+    except ZeroDivisionError:
+        error = "Division by zero is not allowed"
+    except (ValueError, TypeError, OverflowError) as e:
+        error = str(e)
+    else:
+        return {"content": [{"type": "text", "text": text}]}
+
+    return {
+        "content": [{"type": "text", "text": f"Error: {error}"}],
+        "is_error": True,
+    }
+
+
+# Array variants: one call applies an operation to a whole list of numbers.
+# Elements that fail (negative sqrt, division by zero, overflow) come back as
+# null in "results" and are listed with their index in "errors".
+
+MAX_REPORTED_ERRORS = 20
+
+NUMBER_ARRAY = {"type": "array", "items": {"type": "number"}}
+ARRAY_OR_NUMBER = {"anyOf": [NUMBER_ARRAY, {"type": "number"}]}
+
+
+def _binary_schema() -> dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {"a": NUMBER_ARRAY, "b": ARRAY_OR_NUMBER},
+        "required": ["a", "b"],
+    }
+
+
+def _error_result(message: str) -> dict[str, Any]:
+    return {
+        "content": [{"type": "text", "text": f"Error: {message}"}],
+        "is_error": True,
+    }
+
+
+def _batch_result(
+    result: np.ndarray, failed: np.ndarray, reason: str
+) -> dict[str, Any]:
+    values: list[float | None] = result.tolist()
+    failed_indices = np.flatnonzero(failed)
+    for index in failed_indices:
+        values[index] = None
+
+    payload: dict[str, Any] = {"results": values}
+    if failed_indices.size:
+        payload["errors"] = [
+            {"index": int(i), "error": reason}
+            for i in failed_indices[:MAX_REPORTED_ERRORS]
+        ]
+        payload["failed"] = int(failed_indices.size)
+
+    response: dict[str, Any] = {
+        "content": [{"type": "text", "text": json.dumps(payload)}]
+    }
+    if failed_indices.size and failed_indices.size == result.size:
+        response["is_error"] = True
+    return response
+
+
+def _batch_binary(args: dict[str, Any], ufunc: np.ufunc, reason: str) -> dict[str, Any]:
+    a = np.asarray(args["a"], dtype=np.float64)
+    b = np.asarray(args["b"], dtype=np.float64)
+    if a.ndim != 1 or b.ndim > 1:
+        return _error_result("a must be a list of numbers, b a list or a number")
+    if b.ndim == 1 and b.shape != a.shape:
+        return _error_result(
+            f"a and b must have the same length ({a.size} != {b.size})"
+        )
+
+    with np.errstate(all="ignore"):
+        result = ufunc(a, b)
+    failed = ~np.isfinite(result) & np.isfinite(a) & np.isfinite(b)
+    return _batch_result(result, failed, reason)
+
+
+@tool("batch_add", "Add b to every element of a (b: list or number)", _binary_schema())
+async def batch_add(args: dict[str, Any]) -> dict[str, Any]:
+    return _batch_binary(args, np.add, "overflow")
+
+
+@tool(
+    "batch_subtract",
+    "Subtract b from every element of a (b: list or number)",
+    _binary_schema(),
+)
+async def batch_subtract(args: dict[str, Any]) -> dict[str, Any]:
+    return _batch_binary(args, np.subtract, "overflow")
+
+
+@tool(
+    "batch_multiply",
+    "Multiply every element of a by b (b: list or number)",
+    _binary_schema(),
+)
+async def batch_multiply(args: dict[str, Any]) -> dict[str, Any]:
+    return _batch_binary(args, np.multiply, "overflow")
+
+
+@tool(
+    "batch_divide",
+    "Divide every element of a by b (b: list or number)",
+    _binary_schema(),
+)
+async def batch_divide(args: dict[str, Any]) -> dict[str, Any]:
+    return _batch_binary(args, np.divide, "division by zero")
+
+
+@tool(
+    "batch_power",
+    "Raise every element of a to the power b (b: list or number)",
+    _binary_schema(),
+)
+async def batch_power(args: dict[str, Any]) -> dict[str, Any]:
+    return _batch_binary(args, np.power, "undefined result or overflow")
+
+
+@tool(
+    "batch_sqrt",
+    "Calculate the square root of every number in a list",
+    {
+        "type": "object",
+        "properties": {"values": NUMBER_ARRAY},
+        "required": ["values"],
+    },
+)
+async def batch_sqrt(args: dict[str, Any]) -> dict[str, Any]:
+    values = np.asarray(args["values"], dtype=np.float64)
+    if values.ndim != 1:
+        return _error_result("values must be a list of numbers")
+
+    with np.errstate(invalid="ignore"):
+        result = np.sqrt(values)
+    return _batch_result(result, values < 0, "negative input")
+
+
+REDUCTIONS = {"sum": np.sum, "mean": np.mean, "min": np.min, "max": np.max}
+
+
+@tool(
+    "reduce",
+    "Reduce a list of numbers to one value: sum, mean, min or max",
+    {
+        "type": "object",
+        "properties": {
+            "operation": {"type": "string", "enum": list(REDUCTIONS)},
+            "values": NUMBER_ARRAY,
+        },
+        "required": ["operation", "values"],
+    },
+)
+async def reduce_numbers(args: dict[str, Any]) -> dict[str, Any]:
+    operation = args["operation"]
+    values = np.asarray(args["values"], dtype=np.float64)
+    if operation not in REDUCTIONS:
+        return _error_result(
+            f"operation must be one of {', '.join(REDUCTIONS)}, got {operation}"
+        )
+    if values.ndim != 1 or values.size == 0:
+        return _error_result("values must be a non-empty list of numbers")
+
+    with np.errstate(over="ignore"):
+        result = float(REDUCTIONS[operation](values))
+    if not math.isfinite(result):
+        return _error_result(f"{operation} overflowed")
     return {
         "content": [
-            {"type": "text", "text": f"{args['base']}^{args['exponent']} = {result}"}
+            {"type": "text", "text": f"{operation} of {values.size} values = {result}"}
         ]
     }
 
 
-def display_message(msg):
-    """Display message content in a clean format."""
-    from claude_code_sdk import (
-        AssistantMessage,
-        ResultMessage,
-        SystemMessage,
-        TextBlock,
-        ToolResultBlock,
-        ToolUseBlock,
-        UserMessage,
+CALCULATOR_TOOLS = [
+    add_numbers,
+    subtract_numbers,
+    multiply_numbers,
+    divide_numbers,
+    square_root,
+    power,
+    evaluate_expression,
+    batch_add,
+    batch_subtract,
+    batch_multiply,
+    batch_divide,
+    batch_power,
+    batch_sqrt,
+    reduce_numbers,
+]
+
+
+def create_calculator_server():
+    """Create the calculator server with all tools."""
+    tools = compact_tools(
+        # every calculator tool is a pure function of its arguments
+        single_flight_tools(CALCULATOR_TOOLS, read_only=True, group=SINGLE_FLIGHT),
+        policy=CompactionPolicy(max_tokens=TOOL_RESULT_MAX_TOKENS),
+        stats=COMPACTION_STATS,
     )
+    if PROFILER is not None:
+        tools = profile_tools(tools, PROFILER)
+    return create_sdk_mcp_server(name="calculator", version="2.0.0", tools=tools)
 
-    if isinstance(msg, UserMessage):
-        for block in msg.content:
-            if isinstance(block, TextBlock):
-                print(f"User: {block.text}")
-            elif isinstance(block, ToolResultBlock):
-                print(
-                    f"Tool Result: {block.content[:100] if block.content else 'None'}..."
-                )
-    elif isinstance(msg, AssistantMessage):
-        for block in msg.content:
-            if isinstance(block, TextBlock):
-                print(f"Claude: {block.text}")
-            elif isinstance(block, ToolUseBlock):
-                print(f"Using tool: {block.name}")
-                # Show tool inputs for calculator
-                if block.input:
-                    print(f"  Input: {block.input}")
-    elif isinstance(msg, SystemMessage):
-        # Ignore system messages
-        pass
-    elif isinstance(msg, ResultMessage):
-        print("Result ended")
-        if msg.total_cost_usd:
-            print(f"Cost: ${msg.total_cost_usd:.6f}")
+
+def build_options() -> ClaudeCodeOptions:
+    """Configure Claude to use the calculator server with allowed tools."""
+    # Pre-approve all calculator MCP tools so they can be used without permission prompts
+    return ClaudeCodeOptions(
+        mcp_servers={"calc": create_calculator_server()},
+        allowed_tools=[f"mcp__calc__{t.name}" for t in CALCULATOR_TOOLS],
+    )
 
 
 async def main():
     """Run example calculations using the SDK MCP server with streaming client."""
-    from claude_code_sdk import ClaudeSDKClient
-
-    # Create the calculator server with all tools
-    calculator = create_sdk_mcp_server(
-        name="calculator",
-        version="2.0.0",
-        tools=[
-            add_numbers,
-            subtract_numbers,
-            multiply_numbers,
-            divide_numbers,
-            square_root,
-            power,
-        ],
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always ask the model instead of replaying cached responses",
     )
-
-    # Configure Claude to use the calculator server with allowed tools
-    # Pre-approve all calculator MCP tools so they can be used without permission prompts
-    options = ClaudeCodeOptions(
-        mcp_servers={"calc": calculator},
-        allowed_tools=[
-            "mcp__calc__add",
-            "mcp__calc__subtract",
-            "mcp__calc__multiply",
-            "mcp__calc__divide",
-            "mcp__calc__sqrt",
-            "mcp__calc__power",
-        ],
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=Path("profile.folded"),
+        type=Path,
+        metavar="FILE",
+        help="sample the run and write collapsed stacks to FILE "
+        "(default: profile.folded), then print the hottest functions",
     )
+    args = parser.parse_args()
+    if args.profile is None:
+        await run_examples(args)
+        return
+
+    global PROFILER
+    PROFILER = SamplingProfiler().start()
+    try:
+        await run_examples(args)
+    finally:
+        PROFILER.stop()
+        PROFILER.write_collapsed(args.profile)
+        print(f"\n{PROFILER.summary()}", file=sys.stderr)
+        print(f"Collapsed stacks written to {args.profile}", file=sys.stderr)
+
+
+async def run_examples(args: argparse.Namespace):
+    options = build_options()
+    # The calculator tools are pure functions, so a response only depends on
+    # the prompt and the options (which include the server version)
+    cache = ResponseCache(RESPONSE_CACHE_FILE, ttl=24 * 3600)
 
     # Example prompts to demonstrate calculator usage
     prompts = [
@@ -171,18 +496,27 @@ async def main():
         "Calculate the square root of 144",
         "What is 2 raised to the power of 8?",
         "Calculate (12 + 8) * 3 - 10",  # Complex calculation
+        "Take the square root of each of 4, 9, -1, 16 and 25",  # Batch calculation
     ]
 
+    renderer = PlainRenderer(show_tool_results=True)
+    metrics = MetricsCollector(METRICS_FILE)
+
     for prompt in prompts:
         print(f"\n{'=' * 50}")
         print(f"Prompt: {prompt}")
         print(f"{'=' * 50}")
 
-        async with ClaudeSDKClient(options=options) as client:
-            await client.query(prompt)
+        async with CachedClient(ClaudeSDKClient(options=options), cache) as client:
+            await client.query(prompt, cache=not args.no_cache)
+            if client.last_hit:
+                print("(cached response)")
+            await renderer.consume(
+                metrics.observe(client.receive_response(), prompt_type=prompt)
+            )
 
-            async for message in client.receive_response():
-                display_message(message)
+    if COMPACTION_STATS.tools:
+        print(f"\n{COMPACTION_STATS.report()}")
 
 
 if __name__ == "__main__":
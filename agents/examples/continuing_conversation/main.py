@@ -6,39 +6,115 @@
 # requires-python = ">=3.11"
 # ///
 
+import argparse
 import asyncio
-from claude_code_sdk import ClaudeSDKClient, AssistantMessage, TextBlock
+import sys
+from pathlib import Path
+
+from claude_code_sdk import (
+    AssistantMessage,
+    ClaudeCodeOptions,
+    ClaudeSDKClient,
+    ResultMessage,
+    TextBlock,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.metrics import SessionCosts  # noqa: E402
+from common.sessions import SessionIndex, resume_options  # noqa: E402
+
+SESSIONS_DB = Path(__file__).parent / "sessions.db"
+
+QUESTIONS = [
+    "What's the capital of France?",
+    # Follow-up question - Claude remembers the previous context
+    "What's the population of that city?",
+    # Another follow-up - still in the same conversation
+    "What are some famous landmarks there?",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Multi-turn conversation that can be resumed or forked later"
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="SESSION_ID",
+        help="continue a recorded session (default: the most recent one)",
+    )
+    group.add_argument(
+        "--fork",
+        metavar="SESSION_ID",
+        help="start a new session branched off a recorded one",
+    )
+    group.add_argument("--list", action="store_true", help="list recorded sessions")
+    parser.add_argument("prompts", nargs="*", help="questions to ask")
+    return parser.parse_args()
 
 
 async def main():
-    async with ClaudeSDKClient() as client:
-        # First question
-        await client.query("What's the capital of France?")
-
-        # Process response
-        async for message in client.receive_response():
-            if isinstance(message, AssistantMessage):
-                for block in message.content:
-                    if isinstance(block, TextBlock):
-                        print(f"Claude: {block.text}")
-
-        # Follow-up question - Claude remembers the previous context
-        await client.query("What's the population of that city?")
-
-        async for message in client.receive_response():
-            if isinstance(message, AssistantMessage):
-                for block in message.content:
-                    if isinstance(block, TextBlock):
-                        print(f"Claude: {block.text}")
-
-        # Another follow-up - still in the same conversation
-        await client.query("What are some famous landmarks there?")
-
-        async for message in client.receive_response():
-            if isinstance(message, AssistantMessage):
-                for block in message.content:
-                    if isinstance(block, TextBlock):
-                        print(f"Claude: {block.text}")
+    args = parse_args()
+    index = SessionIndex(SESSIONS_DB)
+    try:
+        await run(args, index)
+    finally:
+        index.close()
+
+
+async def run(args: argparse.Namespace, index: SessionIndex) -> None:
+    if args.list:
+        for record in index.list():
+            print(
+                f"{record.session_id}  {record.last_used_at}  "
+                f"turns={record.num_turns}  cost=${record.total_cost_usd:.4f}  "
+                f"{record.title or ''}"
+            )
+        return
+
+    options = ClaudeCodeOptions()
+    questions = args.prompts or QUESTIONS
+    parent_id = None
+
+    wanted = args.resume or args.fork
+    if wanted:
+        record = index.latest() if wanted == "latest" else index.find(wanted)
+        if record is None:
+            print(f"Unknown session: {wanted}", file=sys.stderr)
+            sys.exit(1)
+        parent_id = record.session_id
+        options = resume_options(options, parent_id, fork=bool(args.fork))
+        questions = args.prompts or ["What have we talked about so far?"]
+
+    session_id = None
+    costs = SessionCosts()  # total_cost_usd is a running total per client
+    async with ClaudeSDKClient(options=options) as client:
+        for question in questions:
+            await client.query(question)
+
+            # Process response
+            async for message in client.receive_response():
+                if isinstance(message, AssistantMessage):
+                    for block in message.content:
+                        if isinstance(block, TextBlock):
+                            print(f"Claude: {block.text}")
+                elif isinstance(message, ResultMessage):
+                    index.record(
+                        message,
+                        title=questions[0],
+                        parent_id=parent_id,
+                        cost_usd=costs.query_cost(message),
+                    )
+                    session_id = message.session_id
+
+    if session_id:
+        print(f"\nSession {session_id} recorded.")
+        print(f"Continue it with: --resume {session_id}")
+        print(f"Branch off it with: --fork {session_id}")
 
 
 asyncio.run(main())
@@ -2,19 +2,32 @@
 # /// script
 # dependencies = [
 #   "claude-code-sdk==0.0.22",
+#   "msgpack",
 # ]
 # requires-python = ">=3.11"
 # ///
 
 import asyncio
+import sys
+from pathlib import Path
+
 from claude_code_sdk import ClaudeSDKClient
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.streaming import PlainRenderer  # noqa: E402
+from common.transcript import TranscriptRecorder  # noqa: E402
+
+# Every message is kept here; inspect it with
+#   uv run agents/common/transcript.py agents/examples/hello_claude/transcript.bin
+TRANSCRIPT_FILE = Path(__file__).parent / "transcript.bin"
+
 
 async def main():
-    async with ClaudeSDKClient() as client:
-        await client.query("Hello Claude")
-        async for message in client.receive_response():
-            print(message)
+    with TranscriptRecorder(TRANSCRIPT_FILE) as transcript:
+        async with ClaudeSDKClient() as client:
+            await client.query("Hello Claude")
+            await PlainRenderer().consume(transcript.record(client.receive_response()))
 
 
 asyncio.run(main())
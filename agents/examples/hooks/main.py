@@ -9,32 +9,27 @@
 import asyncio
 import logging
 import sys
+from pathlib import Path
 from typing import Any
 
 from claude_code_sdk import ClaudeCodeOptions, ClaudeSDKClient
 from claude_code_sdk.types import (
-    AssistantMessage,
     HookContext,
     HookJSONOutput,
     HookMatcher,
-    Message,
-    ResultMessage,
-    TextBlock,
 )
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.streaming import PlainRenderer  # noqa: E402
+
 # Set up logging to see what's happening
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
-def display_message(msg: Message) -> None:
-    """Standardized message display function."""
-    if isinstance(msg, AssistantMessage):
-        for block in msg.content:
-            if isinstance(block, TextBlock):
-                print(f"Claude: {block.text}")
-    elif isinstance(msg, ResultMessage):
-        print("Result ended")
+# Standardized message display: Claude's text and the end of each response
+renderer = PlainRenderer(show_tools=False, show_cost=False)
 
 
 ##### Hook callback functions
@@ -100,8 +95,7 @@ async def example_pretooluse() -> None:
         print("User: Run the bash command: ./foo.sh --help")
         await client.query("Run the bash command: ./foo.sh --help")
 
-        async for msg in client.receive_response():
-            display_message(msg)
+        await renderer.consume(client.receive_response())
 
         print("\n" + "=" * 50 + "\n")
 
@@ -110,8 +104,7 @@ async def example_pretooluse() -> None:
         print("User: Run the bash command: echo 'Hello from hooks example!'")
         await client.query("Run the bash command: echo 'Hello from hooks example!'")
 
-        async for msg in client.receive_response():
-            display_message(msg)
+        await renderer.consume(client.receive_response())
 
         print("\n" + "=" * 50 + "\n")
 
@@ -135,8 +128,7 @@ async def example_userpromptsubmit() -> None:
         print("User: What's my favorite color?")
         await client.query("What's my favorite color?")
 
-        async for msg in client.receive_response():
-            display_message(msg)
+        await renderer.consume(client.receive_response())
 
     print("\n")
 
@@ -7,8 +7,15 @@
 # ///
 
 import asyncio
+import sys
+from pathlib import Path
+
 from claude_code_sdk import ClaudeSDKClient
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.streaming import PlainRenderer  # noqa: E402
+
 
 async def message_stream():
     """Generate messages dynamically for streaming mode.
@@ -32,19 +39,19 @@ async def message_stream():
 
 
 async def main():
+    renderer = PlainRenderer()
+
     async with ClaudeSDKClient() as client:
         # Stream input to Claude
         await client.query(message_stream())
 
-        # Process response
-        async for message in client.receive_response():
-            print(message)
+        # Process response, printing each block as it arrives
+        await renderer.consume(client.receive_response())
 
         # Follow-up in same session
         await client.query("Should we be concerned about these readings?")
 
-        async for message in client.receive_response():
-            print(message)
+        await renderer.consume(client.receive_response())
 
 
 asyncio.run(main())
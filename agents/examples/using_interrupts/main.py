@@ -7,29 +7,38 @@
 # ///
 
 import asyncio
+import sys
+from pathlib import Path
+
 from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.scheduler import Budget, QueryScheduler  # noqa: E402
+from common.streaming import PlainRenderer  # noqa: E402
+
 
 async def interruptible_task():
     options = ClaudeCodeOptions(allowed_tools=["Bash"], permission_mode="acceptEdits")
 
     async with ClaudeSDKClient(options=options) as client:
-        # Start a long-running task
-        await client.query("Count from 1 to 100 slowly")
-
-        # Let it run for a bit
-        await asyncio.sleep(2)
-
-        # Interrupt the task
-        await client.interrupt()
-        print("Task interrupted!")
-
-        # Send a new command
-        await client.query("Just say hello instead")
-
-        async for message in client.receive_response():
-            # Process the new response
-            pass
+        scheduler = QueryScheduler(client, consumer=PlainRenderer())
+
+        # Start a long-running task, but give it only 2 seconds
+        report = await scheduler.submit(
+            "Count from 1 to 100 slowly", Budget(deadline=2.0)
+        )
+        print(f"Task {report.summary()}")
+
+        # Replace a running task: the second submit interrupts the first one
+        # and waits until its response has been drained
+        long_task = asyncio.create_task(scheduler.submit("Count from 1 to 100 slowly"))
+        await asyncio.sleep(1)
+        report = await scheduler.submit(
+            "Just say hello instead", Budget(deadline=30.0, max_output_tokens=200)
+        )
+        print(f"First task {(await long_task).summary()}")
+        print(f"Second task {report.summary()}")
 
 
 asyncio.run(interruptible_task())
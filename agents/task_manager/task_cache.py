@@ -0,0 +1,156 @@
+"""シャードごとのタスク読み取りキャッシュ
+
+``CachedConnection`` はタスクの読み取り結果をメモリに保持する SQLite 接続。
+ID→行のマップと、フィルタ（ステータス, 優先度）ごとの結果リストを ``__slots__`` の
+``TaskRecord`` で持つ。
+
+読み取りのたびに ``PRAGMA data_version``（他の接続・他プロセスのコミットで変わる）と
+``total_changes``（この接続自身の書き込みで増える）を確認し、どちらかが変わっていれば
+キャッシュ全体を捨てる。確認はどちらもディスクを読まないので、ヒット時はメモリだけで返せる。
+
+接続と同じく、シャードの専用スレッドからだけ使うこと。
+"""
+
+import sqlite3
+from collections import OrderedDict
+from typing import Any
+
+COLUMNS = ("id", "name", "priority", "status", "external_id")
+SELECT_COLUMNS = ", ".join(COLUMNS)
+
+
+class TaskRecord:
+    __slots__ = COLUMNS
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        priority: str,
+        status: str,
+        external_id: str | None = None,
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.priority = priority
+        self.status = status
+        self.external_id = external_id
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict と同じ形で列を読む（format_rows などに渡すため）"""
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {column: getattr(self, column) for column in COLUMNS}
+
+
+FilterKey = tuple[str | None, str | None]
+
+
+class TaskCache:
+    def __init__(self, *, max_result_sets: int = 32, max_rows: int = 200_000) -> None:
+        self.max_result_sets = max_result_sets
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._stamp: tuple[int, int] | None = None
+        self._by_id: dict[int, TaskRecord] = {}
+        self._results: OrderedDict[FilterKey, list[TaskRecord]] = OrderedDict()
+        self._complete = False  # _by_id に全タスクが入っているか
+
+    def validate(self, conn: sqlite3.Connection) -> None:
+        stamp = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+        if stamp != self._stamp:
+            self.clear()
+            self._stamp = stamp
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._results.clear()
+        self._complete = False
+
+    def select(
+        self,
+        conn: sqlite3.Connection,
+        status: str | None = None,
+        priority: str | None = None,
+    ) -> list[TaskRecord]:
+        """フィルタに合うタスクを ID 順に返す"""
+        self.validate(conn)
+        key = (status or None, priority or None)
+        records = self._results.get(key)
+        if records is not None:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return records
+
+        if self._complete:
+            # 全件がメモリにあるので、別のフィルタも SQL なしで作れる
+            self.hits += 1
+            records = [
+                r
+                for r in self._by_id.values()
+                if (key[0] is None or r.status == key[0])
+                and (key[1] is None or r.priority == key[1])
+            ]
+        else:
+            self.misses += 1
+            conditions, params = [], []
+            if key[0] is not None:
+                conditions.append("status = ?")
+                params.append(key[0])
+            if key[1] is not None:
+                conditions.append("priority = ?")
+                params.append(key[1])
+            query = f"SELECT {SELECT_COLUMNS} FROM tasks"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY id"
+            records = [self._intern(row) for row in conn.execute(query, params)]
+            if key == (None, None) and len(self._by_id) <= self.max_rows:
+                # 先に get() や別のフィルタで入った行があると挿入順が ID 順と
+                # ずれるので、全件の結果（ID 順）で作り直す
+                self._by_id = {r.id: r for r in records}
+                self._complete = True
+
+        self._remember(key, records)
+        return records
+
+    def get(self, conn: sqlite3.Connection, task_id: int) -> TaskRecord | None:
+        self.validate(conn)
+        record = self._by_id.get(task_id)
+        if record is not None or self._complete:
+            self.hits += 1
+            return record
+        self.misses += 1
+        row = conn.execute(
+            f"SELECT {SELECT_COLUMNS} FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        return self._intern(row) if row is not None else None
+
+    def _intern(self, row: sqlite3.Row | tuple[Any, ...]) -> TaskRecord:
+        record = self._by_id.get(row[0])
+        if record is None:
+            record = TaskRecord(*row)
+            self._by_id[record.id] = record
+        return record
+
+    def _remember(self, key: FilterKey, records: list[TaskRecord]) -> None:
+        if len(self._by_id) > self.max_rows:
+            # 大きすぎる結果は保持しない（次回はまた SQL で読む）
+            self.clear()
+            return
+        self._results[key] = records
+        while len(self._results) > self.max_result_sets:
+            self._results.popitem(last=False)
+
+
+class CachedConnection(sqlite3.Connection):
+    """``task_cache`` を持つ SQLite 接続（``sqlite3.connect(factory=...)`` 用）"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.task_cache = TaskCache()
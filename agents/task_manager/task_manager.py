@@ -2,6 +2,7 @@
 # /// script
 # dependencies = [
 #   "claude-code-sdk==0.0.22",
+#   "msgpack",
 #   "rich",
 # ]
 # requires-python = ">=3.11"
@@ -9,39 +10,98 @@
 # exclude-newer = "2025-09-17T08:41:05Z"
 # ///
 
+import argparse
 import asyncio
+import csv
+import functools
+import io
+import os
 import sqlite3
 import sys
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from claude_code_sdk import (
-    AssistantMessage,
     ClaudeCodeOptions,
     ClaudeSDKClient,
     HookContext,
     HookMatcher,
-    ResultMessage,
-    SystemMessage,
-    TextBlock,
-    ToolUseBlock,
     create_sdk_mcp_server,
     tool,
 )
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.text import Text
-from rich.prompt import Prompt
 
-console = Console()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common.batch import BatchItem, BatchSummary, read_items, run_batch  # noqa: E402
+from common.cache import CachedClient, ResponseCache  # noqa: E402
+from common.compaction import (  # noqa: E402
+    CompactionPolicy,
+    CompactionStats,
+    compact_tools,
+    estimate_tokens,
+    format_rows,
+    rows_result,
+)
+from common.mcp_serve import check_host, serve_sse, serve_stdio, sse_config  # noqa: E402
+from common.metrics import MetricsCollector  # noqa: E402
+from common.profiling import SamplingProfiler, profile_hooks, profile_tools  # noqa: E402
+from common.singleflight import SingleFlight, single_flight  # noqa: E402
+from common.streaming import Labels, RichRenderer  # noqa: E402
+from task_cache import CachedConnection, TaskRecord  # noqa: E402
+from task_store import (  # noqa: E402
+    DEFAULT_PROJECT,
+    ShardRouter,
+    current_project,
+    validate_project,
+)
+from task_transfer import TransferReport, export_tasks, import_tasks  # noqa: E402
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+    from common.transcript import TranscriptRecorder
 
-DB_FILE = Path(__file__).parent / "tasks.db"
+# プロジェクトごとの tasks*.db を置くディレクトリ（task_store を参照）
+DATA_DIR = Path(__file__).parent
+METRICS_FILE = Path(__file__).parent / "metrics.jsonl"
+RESPONSE_CACHE_FILE = Path(__file__).parent / "response_cache.db"
+
+# この接頭辞で始まる入力は応答キャッシュを使わずに必ずモデルへ送る
+NO_CACHE_PREFIX = "!"
 
 TASK_STATUSES = ["未着手", "進行中", "レビュー中", "完了"]
 TASK_PRIORITIES = ["高", "中", "低"]
 
-STATUS_ICONS = {"未着手": "⭕", "進行中": "🔄", "レビュー中": "👀", "完了": "✅"}
-PRIORITY_ICONS = {"高": "🔥", "中": "📋", "低": "📝"}
+TASK_COLUMNS = ["id", "name", "priority", "status"]
+EVENT_COLUMNS = [
+    "seq",
+    "task_id",
+    "kind",
+    "name",
+    "priority",
+    "old_status",
+    "new_status",
+    "at",
+]
+MAX_EVENTS_PER_CALL = 100
+
+# ツール結果はそのままモデルのコンテキストに残るため、この目安を超えたら切り詰める
+TOOL_RESULT_MAX_TOKENS = 4000
+COMPACTION_STATS = CompactionStats()
+# 読み取り専用ツールの同時・同一呼び出しを1回の実行にまとめる（バッチ実行向け）
+SINGLE_FLIGHT = SingleFlight()
+# --profile のときだけ設定される（ツールとフックを span で計測する）
+PROFILER: Optional[SamplingProfiler] = None
+# --server-url のとき設定される。プロセス内ではなく serve で起動した共有サーバーを使う
+TASK_SERVER_URL: Optional[str] = None
+# 共有サーバーへ操作するプロジェクトを伝えるヘッダー（セッションごと）
+PROJECT_HEADER = "X-Task-Project"
+# 共有サーバーの認証トークンを渡す環境変数（serve と --server-url の両方で読む）。
+# ループバック以外のアドレスで serve するときは必須
+TOKEN_ENV = "TASK_SERVER_TOKEN"
+# --transcript のとき設定される。応答の全メッセージをバイナリログに記録する
+TRANSCRIPT: Optional["TranscriptRecorder"] = None
 
 
 SYSTEM_PROMPT = """あなたは高度なタスク管理専門エージェントです。タスク管理の効率化と組織化を支援することが唯一の使命です。
@@ -75,7 +135,13 @@ SYSTEM_PROMPT = """あなたは高度なタスク管理専門エージェント
 利用可能なツール：
 - add_task: 新規タスク追加（name: 必須, priority: 高/中/低）
 - list_tasks: タスク一覧表示（status_filter, priority_filter: オプション）
+  結果はタブ区切り（id, name, priority, status）で返るので、ユーザーには読みやすく整形して伝える
 - change_task_status: タスクのステータス変更（task_id, status）
+- changes_since: タスクの変更履歴を差分取得（cursor: 必須, limit: オプション）
+  kind は created/status/updated/deleted。進捗の追跡や報告には一覧の再取得ではなくこちらを使う
+- task_stats: ステータス×優先度ごとの件数と日別の作成・完了件数（days: オプション）
+  「高優先度のレビュー中タスクは何件？」のような集計の質問にはこちらを使う
+- import_tasks / export_tasks: transfer ディレクトリの CSV / JSONL ファイルとの一括入出力（file: ファイル名）
 
 注意：更新・削除などの操作はID指定のみに対応します。名前は重複の可能性があるため使用しません。
 
@@ -125,16 +191,8 @@ SYSTEM_PROMPT = """あなたは高度なタスク管理専門エージェント
 重要：タスク管理機能の範囲内で最高のサービスを提供し、範囲外のリクエストは丁寧かつ明確に拒否してください。"""
 
 
-def get_db_connection() -> sqlite3.Connection:
-    """データベース接続を取得"""
-    conn = sqlite3.connect(str(DB_FILE))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def ensure_database():
-    """データベースとテーブルが存在しない場合は作成する"""
-    conn = get_db_connection()
+def init_schema(conn: sqlite3.Connection):
+    """シャードのテーブルが存在しない場合は作成する"""
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -146,54 +204,202 @@ def ensure_database():
         )
     """)
 
+    # 外部トラッカーの ID（一括インポートの upsert キー）。既存 DB には列を追加する
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(tasks)")}
+    if "external_id" not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN external_id TEXT")
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_external_id ON tasks (external_id)"
+    )
+
+    # tasks への書き込みごとに増えるバージョン番号（応答キャッシュのキーに使う）
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    cursor.execute(
+        "INSERT OR IGNORE INTO meta (key, value) VALUES ('tasks_version', 0)"
+    )
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS tasks_version_{event.lower()}
+            AFTER {event} ON tasks
+            BEGIN
+                UPDATE meta SET value = value + 1 WHERE key = 'tasks_version';
+            END
+        """)
+
+    # 変更履歴（追記のみ）。トリガーで書くので変更と同じトランザクションに入る
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS task_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT,
+            priority TEXT,
+            old_status TEXT,
+            new_status TEXT,
+            at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        )
+    """)
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS task_events_created AFTER INSERT ON tasks
+        BEGIN
+            INSERT INTO task_events (task_id, kind, name, priority, new_status)
+            VALUES (new.id, 'created', new.name, new.priority, new.status);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS task_events_status AFTER UPDATE OF status ON tasks
+        WHEN old.status IS NOT new.status
+        BEGIN
+            INSERT INTO task_events
+                (task_id, kind, name, priority, old_status, new_status)
+            VALUES
+                (new.id, 'status', new.name, new.priority, old.status, new.status);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS task_events_updated
+        AFTER UPDATE OF name, priority ON tasks
+        WHEN old.name IS NOT new.name OR old.priority IS NOT new.priority
+        BEGIN
+            INSERT INTO task_events (task_id, kind, name, priority, new_status)
+            VALUES (new.id, 'updated', new.name, new.priority, new.status);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS task_events_deleted AFTER DELETE ON tasks
+        BEGIN
+            INSERT INTO task_events (task_id, kind, name, priority, old_status)
+            VALUES (old.id, 'deleted', old.name, old.priority, old.status);
+        END;
+    """)
+    # task_stats の集計をテーブル本体に触れずに索引だけで済ませるための covering index
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_priority ON tasks (status, priority)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_task_events_kind_day "
+        "ON task_events (kind, substr(at, 1, 10), new_status)"
+    )
+    # 履歴導入前からあるタスクは作成イベントとして一度だけ取り込む
+    cursor.execute("""
+        INSERT INTO task_events (task_id, kind, name, priority, new_status)
+        SELECT id, 'created', name, priority, status FROM tasks
+        WHERE NOT EXISTS (SELECT 1 FROM task_events)
+        ORDER BY id
+    """)
+
     conn.commit()
-    conn.close()
 
 
-def load_tasks(
-    status_filter: Optional[str] = None, priority_filter: Optional[str] = None
-) -> List[Dict[str, Any]]:
-    """データベースからタスクを読み込む"""
-    ensure_database()
-    conn = get_db_connection()
-    cursor = conn.cursor()
+store = ShardRouter(DATA_DIR, init=init_schema, factory=CachedConnection)
 
-    conditions = []
-    params = []
 
-    if status_filter and status_filter in TASK_STATUSES:
-        conditions.append("status = ?")
-        params.append(status_filter)
+def open_store(data_dir: Path) -> ShardRouter:
+    """タスクストアのデータディレクトリを切り替える（ベンチマーク用）"""
+    global store
+    store.close()
+    store = ShardRouter(data_dir, init=init_schema, factory=CachedConnection)
+    return store
 
-    if priority_filter and priority_filter in TASK_PRIORITIES:
-        conditions.append("priority = ?")
-        params.append(priority_filter)
 
-    query = "SELECT * FROM tasks"
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY id"
+# 以下の DB 関数は接続を第1引数に取り、store.run() / store.call() 経由で
+# シャードの専用スレッド上で実行する
 
-    cursor.execute(query, params)
-    tasks = [dict(row) for row in cursor.fetchall()]
 
-    conn.close()
-    return tasks
+def get_tasks_version(conn: sqlite3.Connection) -> int:
+    """タスクテーブルのバージョンを取得"""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'tasks_version'").fetchone()
+    return row["value"]
 
 
-def get_task_by_id(task_id: int | str) -> Optional[Dict[str, Any]]:
+def load_tasks(
+    conn: CachedConnection,
+    status_filter: Optional[str] = None,
+    priority_filter: Optional[str] = None,
+) -> List[TaskRecord]:
+    """タスクを読み込む（変更がなければメモリ上のキャッシュから返す）"""
+    if status_filter not in TASK_STATUSES:
+        status_filter = None
+    if priority_filter not in TASK_PRIORITIES:
+        priority_filter = None
+    return conn.task_cache.select(conn, status_filter, priority_filter)
+
+
+def changes_since(
+    conn: sqlite3.Connection, cursor: int = 0, limit: int = 100
+) -> tuple[List[Dict[str, Any]], int]:
+    """cursor より後の変更イベントと次回の cursor を返す（変更件数に比例したコスト）"""
+    rows = conn.execute(
+        "SELECT * FROM task_events WHERE seq > ? ORDER BY seq LIMIT ?",
+        (cursor, limit),
+    ).fetchall()
+    events = [dict(row) for row in rows]
+    return events, events[-1]["seq"] if events else cursor
+
+
+def task_stats(conn: sqlite3.Connection, days: int = 14) -> Dict[str, Any]:
+    """ステータス×優先度の件数と、直近 days 日の日別の作成・完了件数を集計"""
+    counts = [
+        dict(row)
+        for row in conn.execute(
+            "SELECT status, priority, COUNT(*) AS count FROM tasks "
+            "GROUP BY status, priority"
+        )
+    ]
+    since = conn.execute(
+        "SELECT strftime('%Y-%m-%d', 'now', ?)", (f"-{int(days)} days",)
+    ).fetchone()[0]
+    per_day: Dict[str, Dict[str, Any]] = {}
+    for column, condition in (
+        ("created", "kind = 'created'"),
+        ("completed", "kind = 'status' AND new_status = '完了'"),
+    ):
+        for day, count in conn.execute(
+            f"""
+            SELECT substr(at, 1, 10) AS day, COUNT(*) FROM task_events
+            WHERE {condition} AND substr(at, 1, 10) >= ?
+            GROUP BY substr(at, 1, 10)
+            """,
+            (since,),
+        ):
+            entry = per_day.setdefault(day, {"day": day, "created": 0, "completed": 0})
+            entry[column] = count
+    throughput = [per_day[day] for day in sorted(per_day)]
+    return {"counts": counts, "throughput": throughput}
+
+
+def get_task_by_id(conn: CachedConnection, task_id: int | str) -> Optional[TaskRecord]:
     """IDでタスクを取得"""
     try:
         tid = int(task_id)
     except (TypeError, ValueError):
         return None
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks WHERE id = ?", (tid,))
-    task = cursor.fetchone()
-    conn.close()
-    return dict(task) if task else None
+    return conn.task_cache.get(conn, tid)
+
+
+def insert_task(conn: sqlite3.Connection, name: str, priority: str) -> int:
+    """未着手のタスクを追加して ID を返す"""
+    with conn:
+        cursor = conn.execute(
+            """INSERT INTO tasks (name, priority, status)
+               VALUES (?, ?, ?)""",
+            (name, priority, "未着手"),
+        )
+    return cursor.lastrowid
+
+
+def update_task_status(
+    conn: CachedConnection, task_id: int | str, status: str
+) -> Optional[TaskRecord]:
+    """ステータスを更新し、更新前のタスクを返す（存在しなければ None）"""
+    with conn:
+        task = get_task_by_id(conn, task_id)
+        if task is not None:
+            conn.execute("UPDATE tasks SET status = ? WHERE id = ?", (status, task.id))
+    return task
 
 
 @tool(
@@ -215,18 +421,7 @@ async def add_task(args: Dict[str, Any]) -> Dict[str, Any]:
             ]
         }
 
-    ensure_database()
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """INSERT INTO tasks (name, priority, status)
-           VALUES (?, ?, ?)""",
-        (task_name, priority, "未着手"),
-    )
-    task_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    task_id = await store.run(insert_task, task_name, priority)
 
     return {
         "content": [
@@ -243,6 +438,7 @@ async def add_task(args: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+@single_flight(read_only=True, group=SINGLE_FLIGHT, scope=current_project.get)
 @tool(
     "list_tasks",
     "タスク一覧を表示します。オプションでステータス（未着手、進行中、レビュー中、完了）や優先度（高、中、低）でフィルタリング可能。フィルタを指定しない場合は全タスクを表示。",
@@ -256,7 +452,7 @@ async def list_tasks(args: Dict[str, Any]) -> Dict[str, Any]:
     status_filter = args.get("status_filter")
     priority_filter = args.get("priority_filter")
 
-    filtered_tasks = load_tasks(status_filter, priority_filter)
+    filtered_tasks = await store.run(load_tasks, status_filter, priority_filter)
 
     if not filtered_tasks:
         filter_text = ""
@@ -277,31 +473,7 @@ async def list_tasks(args: Dict[str, Any]) -> Dict[str, Any]:
             ]
         }
 
-    table = Table(title="📋 タスク一覧", show_header=True, header_style="bold blue")
-    table.add_column("ID", style="dim", width=4)
-    table.add_column("タスク名", style="bold", min_width=20)
-    table.add_column("優先度", justify="center", width=8)
-    table.add_column("ステータス", justify="center", width=10)
-
-    for task in filtered_tasks:
-        status_icon = STATUS_ICONS.get(task["status"], "❓")
-        priority_icon = PRIORITY_ICONS.get(task["priority"], "❓")
-
-        table.add_row(
-            str(task["id"]),
-            task["name"],
-            f"{priority_icon} {task['priority']}",
-            f"{status_icon} {task['status']}",
-        )
-
-    from io import StringIO
-
-    string_io = StringIO()
-    temp_console = Console(file=string_io, width=100, legacy_windows=False)
-    temp_console.print(table)
-    table_output = string_io.getvalue()
-
-    return {"content": [{"type": "text", "text": table_output}]}
+    return rows_result(filtered_tasks, TASK_COLUMNS)
 
 
 @tool(
@@ -357,7 +529,7 @@ async def change_task_status(args: Dict[str, Any]) -> Dict[str, Any]:
             ]
         }
 
-    task_to_update = get_task_by_id(task_id)
+    task_to_update = await store.run(update_task_status, task_id, new_status)
 
     if not task_to_update:
         return {
@@ -369,16 +541,7 @@ async def change_task_status(args: Dict[str, Any]) -> Dict[str, Any]:
             ]
         }
 
-    old_status = task_to_update.get("status")
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE tasks SET status = ? WHERE id = ?",
-        (new_status, task_to_update["id"]),
-    )
-    conn.commit()
-    conn.close()
+    old_status = task_to_update.status
 
     status_change = (
         f"{old_status} → {new_status}"
@@ -392,8 +555,8 @@ async def change_task_status(args: Dict[str, Any]) -> Dict[str, Any]:
                 "type": "text",
                 "text": (
                     "✅ タスクのステータスを更新しました:\n"
-                    f"#️⃣ ID: {task_to_update['id']}\n"
-                    f"📝 {task_to_update['name']}\n"
+                    f"#️⃣ ID: {task_to_update.id}\n"
+                    f"📝 {task_to_update.name}\n"
                     f"🔄 {status_change}"
                 ),
             }
@@ -401,134 +564,326 @@ async def change_task_status(args: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def display_message(msg):
-    """メッセージをRichで美しく表示"""
-    if isinstance(msg, AssistantMessage):
-        for block in msg.content:
-            if isinstance(block, TextBlock):
-                claude_panel = Panel(
-                    Text(block.text, style="white"),
-                    title="🤖 Claude",
-                    title_align="left",
-                    border_style="blue",
-                    padding=(0, 1),
-                )
-                console.print(claude_panel)
-            elif isinstance(block, ToolUseBlock):
-                tool_info = f"[bold cyan]ツール:[/bold cyan] {block.name}"
-                if block.input:
-                    input_str = ", ".join([f"{k}={v}" for k, v in block.input.items()])
-                    tool_info += f"\n[dim]入力: {input_str}[/dim]"
-
-                tool_panel = Panel(
-                    tool_info,
-                    title="🔧 ツール実行",
-                    title_align="left",
-                    border_style="green",
-                    padding=(0, 1),
-                )
-                console.print(tool_panel)
-    elif isinstance(msg, SystemMessage):
-        pass
-    elif isinstance(msg, ResultMessage):
-        if msg.total_cost_usd:
-            console.print(f"💰 [dim]コスト: ${msg.total_cost_usd:.6f}[/dim]")
+@single_flight(read_only=True, group=SINGLE_FLIGHT, scope=current_project.get)
+@tool(
+    "changes_since",
+    "cursor（イベント番号 seq）より後のタスク変更履歴を古い順に返します。初回は cursor=0。"
+    "次回は結果の先頭行の next_cursor を cursor に指定すると差分だけを取得できます。",
+    {
+        "type": "object",
+        "properties": {
+            "cursor": {"type": "integer", "minimum": 0},
+            "limit": {"type": "integer", "minimum": 1, "maximum": MAX_EVENTS_PER_CALL},
+        },
+        "required": ["cursor"],
+    },
+)
+async def changes_since_tool(args: Dict[str, Any]) -> Dict[str, Any]:
+    """タスクの変更履歴を差分で返す"""
+    try:
+        cursor = int(args.get("cursor", 0))
+        limit = int(args.get("limit", MAX_EVENTS_PER_CALL))
+    except (TypeError, ValueError):
+        return {
+            "content": [
+                {
+                    "type": "text",
+                    "text": "❌ エラー: cursor と limit は数値で指定してください。",
+                }
+            ]
+        }
 
+    events, next_cursor = await store.run(
+        changes_since, cursor, max(1, min(limit, MAX_EVENTS_PER_CALL))
+    )
+    if not events:
+        return {
+            "content": [
+                {
+                    "type": "text",
+                    "text": f"📋 cursor={cursor} 以降の変更はありません",
+                }
+            ]
+        }
+    # 圧縮で末尾の行が切られると next_cursor より前のイベントを読み飛ばすので、
+    # 上限に収まるまで自分で行を減らし、最後に返した seq を next_cursor にする
+    text = format_rows(events, EVENT_COLUMNS)
+    while len(events) > 1 and estimate_tokens(text) > TOOL_RESULT_MAX_TOKENS - 20:
+        events = events[: len(events) * 3 // 4]
+        next_cursor = events[-1]["seq"]
+        text = format_rows(events, EVENT_COLUMNS)
+    return {"content": [{"type": "text", "text": f"next_cursor={next_cursor}\n{text}"}]}
 
-async def process_claude_response(client, prompt_text: str):
-    """Claudeの応答をSpinnerと共に処理"""
-    await client.query(prompt_text)
 
-    with console.status(
-        "[bold green]🤖 Claude が考えています...", spinner="dots"
-    ) as status:
-        async for message in client.receive_response():
-            status.stop()
-            display_message(message)
-            if isinstance(message, (AssistantMessage, SystemMessage)):
-                status.start()
+@single_flight(read_only=True, group=SINGLE_FLIGHT, scope=current_project.get)
+@tool(
+    "task_stats",
+    "タスクの集計を返します。ステータス×優先度ごとの件数と、直近 days 日（既定14日）の"
+    "日別の作成件数・完了件数。件数や進捗を尋ねられたら list_tasks ではなくこちらを使ってください。",
+    {
+        "type": "object",
+        "properties": {"days": {"type": "integer", "minimum": 1, "maximum": 365}},
+    },
+)
+async def task_stats_tool(args: Dict[str, Any]) -> Dict[str, Any]:
+    """タスクの集計結果を返す"""
+    try:
+        days = max(1, min(int(args.get("days", 14)), 365))
+    except (TypeError, ValueError):
+        return {
+            "content": [
+                {"type": "text", "text": "❌ エラー: days は数値で指定してください。"}
+            ]
+        }
 
+    stats = await store.run(task_stats, days)
+    by_cell = {(c["status"], c["priority"]): c["count"] for c in stats["counts"]}
+    rows = []
+    for status in TASK_STATUSES:
+        row: Dict[str, Any] = {"status": status}
+        for priority in TASK_PRIORITIES:
+            row[priority] = by_cell.get((status, priority), 0)
+        row["合計"] = sum(row[p] for p in TASK_PRIORITIES)
+        rows.append(row)
+    total = sum(by_cell.values())
+
+    text = (
+        f"タスク総数\t{total}\n"
+        + format_rows(rows, ["status", *TASK_PRIORITIES, "合計"])
+        + f"\n\n直近{days}日の推移\n"
+        + format_rows(stats["throughput"], ["day", "created", "completed"])
+    )
+    return {"content": [{"type": "text", "text": text}]}
 
-async def interactive_mode():
-    """インタラクティブモード"""
-    welcome_text = """📋 タスク管理エージェントへようこそ！
 
-自然な日本語でタスクを管理できます。
-例: 「新機能の設計書作成タスクを追加」「進行中のタスクを表示」
+def transfer_dir() -> Path:
+    """インポート・エクスポートツールが読み書きできるディレクトリ"""
+    return store.data_dir / "transfer"
 
-[dim]終了方法: 'quit', 'exit', 'q'[/dim]"""
 
-    welcome_panel = Panel(
-        welcome_text,
-        title="🚀 タスク管理エージェント",
-        title_align="center",
-        border_style="cyan",
-        padding=(1, 2),
-    )
-    console.print(welcome_panel)
+def resolve_transfer_path(file_name: str) -> Path:
+    """transfer ディレクトリ直下のファイルパスに解決（それ以外は ValueError）"""
+    base = transfer_dir().resolve()
+    path = (base / file_name).resolve()
+    if path.parent != base:
+        raise ValueError(f"ファイルは {base} 直下のみ指定できます: {file_name}")
+    return path
+
+
+def _transfer_error(message: str) -> Dict[str, Any]:
+    return {"content": [{"type": "text", "text": f"❌ エラー: {message}"}]}
+
+
+@tool(
+    "import_tasks",
+    "transfer ディレクトリにある CSV / JSONL ファイルからタスクを一括登録します。"
+    "列: external_id（任意。同じ ID の行は更新）, name, priority, status。",
+    {"file": str},
+)
+async def import_tasks_tool(args: Dict[str, Any]) -> Dict[str, Any]:
+    """タスクを一括インポート"""
+    try:
+        path = resolve_transfer_path(str(args.get("file", "")))
+        report = await store.run(
+            import_tasks,
+            path,
+            statuses=TASK_STATUSES,
+            priorities=TASK_PRIORITIES,
+        )
+    except (OSError, ValueError, csv.Error) as e:
+        return _transfer_error(str(e))
+    return {"content": [{"type": "text", "text": f"✅ インポート: {report.summary()}"}]}
+
+
+@tool(
+    "export_tasks",
+    "全タスクを transfer ディレクトリの CSV / JSONL ファイル（拡張子で判定）に書き出します。",
+    {"file": str},
+)
+async def export_tasks_tool(args: Dict[str, Any]) -> Dict[str, Any]:
+    """タスクを一括エクスポート"""
+    try:
+        path = resolve_transfer_path(str(args.get("file", "")))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = await store.run(export_tasks, path)
+    except (OSError, ValueError) as e:
+        return _transfer_error(str(e))
+    return {
+        "content": [
+            {
+                "type": "text",
+                "text": f"✅ エクスポート: {path.name} に {report.summary()}",
+            }
+        ]
+    }
+
 
-    task_server = create_sdk_mcp_server(
-        name="task-manager",
-        version="1.0.0",
-        tools=[add_task, list_tasks, change_task_status],
+TASK_TOOLS = [
+    add_task,
+    list_tasks,
+    change_task_status,
+    changes_since_tool,
+    task_stats_tool,
+    import_tasks_tool,
+    export_tasks_tool,
+]
+ALLOWED_TOOLS = [f"mcp__task_manager__{t.name}" for t in TASK_TOOLS]
+
+
+def create_task_server():
+    """タスク管理ツールを提供するSDK MCPサーバーを作成"""
+    tools = compact_tools(
+        TASK_TOOLS,
+        policy=CompactionPolicy(max_tokens=TOOL_RESULT_MAX_TOKENS),
+        stats=COMPACTION_STATS,
     )
+    if PROFILER is not None:
+        tools = profile_tools(tools, PROFILER)
+    return create_sdk_mcp_server(name="task-manager", version="1.0.0", tools=tools)
 
-    async def pre_tool_hook(
-        input_data: dict[str, Any], tool_use_id: str | None, context: HookContext
-    ) -> dict[str, Any]:
-        tool_name = input_data.get("tool_name", "")
-        tool_input = input_data.get("tool_input", {}) or {}
 
-        allowed_mcp = {
-            "mcp__task_manager__add_task",
-            "mcp__task_manager__list_tasks",
-            "mcp__task_manager__change_task_status",
-        }
+async def pre_tool_hook(
+    input_data: dict[str, Any], tool_use_id: str | None, context: HookContext
+) -> dict[str, Any]:
+    tool_name = input_data.get("tool_name", "")
+    tool_input = input_data.get("tool_input", {}) or {}
 
-        def deny(reason: str) -> dict[str, Any]:
-            return {
-                "hookSpecificOutput": {
-                    "hookEventName": "PreToolUse",
-                    "permissionDecision": "deny",
-                    "permissionDecisionReason": reason,
-                }
+    def deny(reason: str) -> dict[str, Any]:
+        return {
+            "hookSpecificOutput": {
+                "hookEventName": "PreToolUse",
+                "permissionDecision": "deny",
+                "permissionDecisionReason": reason,
             }
+        }
 
-        if tool_name in allowed_mcp:
-            return {}
+    if tool_name in ALLOWED_TOOLS:
+        return {}
 
-        if tool_name in {"Bash", "WebFetch"}:
-            return deny("Bash/WebFetch はこのエージェントでは許可されていません")
+    if tool_name in {"Bash", "WebFetch"}:
+        return deny("Bash/WebFetch はこのエージェントでは許可されていません")
 
-        if tool_name in {"Read", "Edit"}:
-            fp = tool_input.get("file_path")
-            if not fp:
-                return deny("Read/Edit には file_path が必要です")
+    if tool_name in {"Read", "Edit"}:
+        fp = tool_input.get("file_path")
+        if not fp:
+            return deny("Read/Edit には file_path が必要です")
 
-            try:
-                requested = Path(fp).resolve()
-                allowed = DB_FILE.resolve()
-            except (OSError, ValueError):
-                return deny(f"無効なファイルパス: {fp}")
+        try:
+            requested = Path(fp).resolve()
+            allowed = store.path_for().resolve()
+        except (OSError, ValueError):
+            return deny(f"無効なファイルパス: {fp}")
 
-            if requested != allowed:
-                return deny(f"Read/Edit は {allowed} のみ許可。要求: {fp}")
+        if requested != allowed:
+            return deny(f"Read/Edit は {allowed} のみ許可。要求: {fp}")
 
-            return {}
+        return {}
 
-        return deny(f"{tool_name} は許可されていません")
+    return deny(f"{tool_name} は許可されていません")
 
-    options = ClaudeCodeOptions(
-        mcp_servers={"task_manager": task_server},
-        allowed_tools=[
-            "mcp__task_manager__add_task",
-            "mcp__task_manager__list_tasks",
-            "mcp__task_manager__change_task_status",
-        ],
+
+def task_server_config():
+    """mcp_servers に渡すタスクサーバーの設定（プロセス内または共有サーバー）"""
+    if TASK_SERVER_URL is None:
+        return create_task_server()
+    return sse_config(
+        TASK_SERVER_URL,
+        {PROJECT_HEADER: current_project.get()},
+        token=os.environ.get(TOKEN_ENV),
+    )
+
+
+def build_options(task_server=None) -> ClaudeCodeOptions:
+    """エージェントのオプションを構築"""
+    hooks = {"PreToolUse": [HookMatcher(hooks=[pre_tool_hook])]}
+    if PROFILER is not None:
+        hooks = profile_hooks(hooks, PROFILER)
+    return ClaudeCodeOptions(
+        mcp_servers={"task_manager": task_server or task_server_config()},
+        allowed_tools=ALLOWED_TOOLS,
         system_prompt=SYSTEM_PROMPT,
         permission_mode="default",
-        hooks={"PreToolUse": [HookMatcher(hooks=[pre_tool_hook])]},
+        hooks=hooks,
+    )
+
+
+TASK_LABELS = Labels(
+    assistant="🤖 Claude",
+    tool_title="🔧 ツール実行",
+    tool="ツール",
+    tool_input="入力",
+    cost="💰 コスト",
+    status="[bold green]🤖 Claude が考えています...",
+)
+
+
+def recorded(messages):
+    """--transcript のときは応答のメッセージを記録しながらそのまま流す"""
+    return messages if TRANSCRIPT is None else TRANSCRIPT.record(messages)
+
+
+async def cache_state_version() -> tuple[str, int]:
+    """応答キャッシュのキーに使う (プロジェクト, タスクテーブルのバージョン)"""
+    return current_project.get(), await store.run(get_tasks_version)
+
+
+async def process_claude_response(client: CachedClient, prompt_text: str):
+    """Claudeの応答を受信したブロックから順に表示"""
+    use_cache = not prompt_text.startswith(NO_CACHE_PREFIX)
+    prompt_text = prompt_text.removeprefix(NO_CACHE_PREFIX).strip()
+    await client.query(prompt_text, cache=use_cache)
+    console = get_console()
+    if client.last_hit:
+        console.print(
+            "[dim]♻️ キャッシュ済みの応答を表示します（'!' を先頭に付けると再問い合わせ）[/dim]"
+        )
+
+    renderer = RichRenderer(console, labels=TASK_LABELS)
+    metrics = MetricsCollector(METRICS_FILE)
+    await renderer.consume(
+        metrics.observe(recorded(client.receive_response()), prompt_type="interactive")
+    )
+
+
+@functools.cache
+def get_console() -> "Console":
+    """対話モードの rich Console（バッチや import/export では rich を読み込まない）"""
+    from rich.console import Console
+
+    return Console()
+
+
+async def interactive_mode(*, use_cache: bool = True):
+    """インタラクティブモード"""
+    from rich.panel import Panel
+    from rich.prompt import Prompt
+
+    console = get_console()
+    cache_hint = (
+        "タスクが変わっていない同じ質問はキャッシュから応答します。先頭に '!' を付けると必ず再問い合わせします。"
+        if use_cache
+        else "応答キャッシュは無効です（--no-cache）。"
     )
+    welcome_text = f"""📋 タスク管理エージェントへようこそ！
+
+プロジェクト: [bold]{current_project.get()}[/bold]
+自然な日本語でタスクを管理できます。
+例: 「新機能の設計書作成タスクを追加」「進行中のタスクを表示」
+[dim]{cache_hint}[/dim]
+
+[dim]終了方法: 'quit', 'exit', 'q'[/dim]"""
+
+    welcome_panel = Panel(
+        welcome_text,
+        title="🚀 タスク管理エージェント",
+        title_align="center",
+        border_style="cyan",
+        padding=(1, 2),
+    )
+    console.print(welcome_panel)
+
+    options = build_options()
+    cache = ResponseCache(RESPONSE_CACHE_FILE, ttl=600) if use_cache else None
 
     while True:
         try:
@@ -549,7 +904,11 @@ async def interactive_mode():
             if not user_input:
                 continue
 
-            async with ClaudeSDKClient(options=options) as client:
+            async with CachedClient(
+                ClaudeSDKClient(options=options),
+                cache,
+                state_version=cache_state_version,
+            ) as client:
                 await process_claude_response(client, user_input)
 
         except KeyboardInterrupt:
@@ -572,11 +931,294 @@ async def interactive_mode():
             )
             console.print(error_panel)
 
+    if COMPACTION_STATS.tools:
+        console.print()
+        console.print(COMPACTION_STATS.report(), markup=False, highlight=False)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="タスク管理エージェント")
+    parser.add_argument(
+        "--project",
+        default=DEFAULT_PROJECT,
+        help=f"操作するプロジェクト（既定: {DEFAULT_PROJECT}、tasks-<project>.db に保存）",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=Path("profile.folded"),
+        type=Path,
+        metavar="FILE",
+        help="サンプリングプロファイラを有効にし、終了時に collapsed stack を FILE"
+        "（既定: profile.folded）に書き出して上位の関数とツール・フックの時間を表示",
+    )
+    parser.add_argument(
+        "--transcript",
+        type=Path,
+        metavar="FILE",
+        help="応答の全メッセージを FILE（バイナリログ、索引は FILE.idx）に追記する。"
+        "uv run agents/common/transcript.py FILE で検索・再生",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"応答キャッシュ（{RESPONSE_CACHE_FILE.name}）を使わず、作成もしない",
+    )
+    parser.add_argument(
+        "--server-url",
+        metavar="URL",
+        help="serve で起動した共有タスクサーバーの SSE エンドポイント"
+        "（例: http://127.0.0.1:8765/sse）。省略時はプロセス内のサーバーを使う",
+    )
+    commands = parser.add_subparsers(dest="command")
+    for name, help_text in (
+        ("import", "CSV / JSONL ファイルからタスクを一括インポート"),
+        ("export", "タスクを CSV / JSONL ファイルへ一括エクスポート"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("file", type=Path)
+        command.add_argument(
+            "--format", choices=["csv", "jsonl"], help="省略時は拡張子で判定"
+        )
+        command.add_argument(
+            "--batch-size", type=int, default=5000, help="1トランザクションの行数"
+        )
+
+    batch = commands.add_parser(
+        "batch",
+        help="プロンプトを1行ずつ読み、並列に処理して結果を JSONL で出力（対話なし）",
+    )
+    batch.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="プロンプトのファイル（1行1件、テキストまたは JSONL）。省略または - で標準入力",
+    )
+    batch.add_argument(
+        "-o", "--output", type=Path, help="結果の JSONL（既定: 標準出力）"
+    )
+    batch.add_argument(
+        "-c", "--concurrency", type=int, default=4, help="同時セッション数"
+    )
+    batch.add_argument(
+        "--timeout", type=float, default=300.0, help="1件あたりの制限時間（秒）"
+    )
+    # batch の後ろに書いても効くように。省略時は全体の --no-cache の値を残す
+    batch.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="応答キャッシュを使わない",
+    )
+
+    serve = commands.add_parser(
+        "serve",
+        help="タスクツールを共有 MCP サーバーとして起動（DB 接続とキャッシュを一元管理）",
+    )
+    serve.add_argument(
+        "--transport",
+        choices=["sse", "stdio"],
+        default="sse",
+        help="sse: 複数のエージェントが --server-url で接続 / stdio: 起動元の1クライアント専用",
+    )
+    serve.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help=f"待ち受けるアドレス。ループバック以外は環境変数 {TOKEN_ENV} のトークンが必須",
+    )
+    serve.add_argument("--port", type=int, default=8765)
+    return parser.parse_args(argv)
+
+
+async def batch_mode(args: argparse.Namespace) -> BatchSummary:
+    """ヘッドレスのバッチモード（rich での描画はしない）"""
+    # 全セッションで1つの MCP サーバーを共有。共有サーバーではプロジェクトを
+    # ヘッダーで渡すので、prepare() の後に行ごとのオプションを作る
+    options = build_options() if TASK_SERVER_URL is None else None
+    cache = None if args.no_cache else ResponseCache(RESPONSE_CACHE_FILE, ttl=600)
+    metrics = MetricsCollector(METRICS_FILE)
+
+    def make_client(item: BatchItem):
+        client = ClaudeSDKClient(options=options or build_options())
+        if cache is None:
+            return client
+        return CachedClient(client, cache, state_version=cache_state_version)
+
+    def prepare(item: BatchItem) -> None:
+        # ワーカーごとのコンテキストに設定するので、指定がない行は既定に戻す
+        current_project.set(validate_project(item.project or args.project))
+
+    # 不正な UTF-8 の行はその行だけ invalid として報告する（read_items 参照）
+    if args.input == "-":
+        if isinstance(sys.stdin, io.TextIOWrapper):
+            sys.stdin.reconfigure(errors="surrogateescape")
+        source = sys.stdin
+    else:
+        source = open(args.input, encoding="utf-8", errors="surrogateescape")
+    output = (
+        sys.stdout if args.output is None else args.output.open("a", encoding="utf-8")
+    )
+    try:
+        return await run_batch(
+            read_items(source),
+            make_client=make_client,
+            output=output,
+            concurrency=max(1, args.concurrency),
+            timeout=args.timeout,
+            prepare=prepare,
+            observe=lambda messages: metrics.observe(
+                recorded(messages), prompt_type="batch"
+            ),
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+def set_session_project(headers: Mapping[str, str]) -> None:
+    """共有サーバーのセッションごとに、ヘッダーで指定されたプロジェクトを設定"""
+    project = headers.get(PROJECT_HEADER)
+    if project:
+        current_project.set(validate_project(project))
+
+
+async def serve_mode(args: argparse.Namespace) -> None:
+    """タスクツールを単独の MCP サーバーとして提供する"""
+    server = create_task_server()["instance"]
+    if args.transport == "stdio":
+        # 標準出力はプロトコル専用。ログは標準エラーへ
+        await serve_stdio(server)
+        return
+    token = os.environ.get(TOKEN_ENV)
+    try:
+        check_host(args.host, token)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        if not args.host.startswith("["):
+            print(f"   トークンは環境変数 {TOKEN_ENV} で指定します", file=sys.stderr)
+        sys.exit(2)
+    host = f"[{args.host}]" if ":" in args.host else args.host
+    print(
+        f"📡 タスクサーバー: http://{host}:{args.port}/sse"
+        f"（エージェントは --server-url で接続、既定プロジェクト: {current_project.get()}）",
+        file=sys.stderr,
+    )
+    await serve_sse(
+        server,
+        host=args.host,
+        port=args.port,
+        session_setup=set_session_project,
+        token=token,
+    )
+
+
+def run_transfer(args: argparse.Namespace) -> None:
+    """import / export サブコマンドを実行"""
+
+    def progress(report: TransferReport) -> None:
+        rate = report.rows / report.elapsed if report.elapsed else 0.0
+        sys.stderr.write(f"\r{report.rows:,} 行 ({rate:,.0f} 行/秒)")
+        sys.stderr.flush()
+
+    if args.command == "import":
+        report = store.call(
+            import_tasks,
+            args.file,
+            statuses=TASK_STATUSES,
+            priorities=TASK_PRIORITIES,
+            fmt=args.format,
+            batch_size=args.batch_size,
+            progress=progress,
+        )
+    else:
+        report = store.call(
+            export_tasks,
+            args.file,
+            fmt=args.format,
+            batch_size=args.batch_size,
+            progress=progress,
+        )
+    sys.stderr.write("\n")
+    print(f"✅ {report.summary()}")
+
 
 async def main():
+    global PROFILER, TRANSCRIPT
+    args = parse_args()
+    if args.transcript is not None:
+        # msgpack は記録するときだけ読み込む
+        from common.transcript import TranscriptRecorder
+
+        TRANSCRIPT = TranscriptRecorder(args.transcript)
+    try:
+        if args.profile is None:
+            await run(args)
+            return
+
+        PROFILER = SamplingProfiler().start()
+        try:
+            await run(args)
+        finally:
+            PROFILER.stop()
+            PROFILER.write_collapsed(args.profile)
+            print(f"\n{PROFILER.summary()}", file=sys.stderr)
+            print(f"📄 collapsed stack: {args.profile}", file=sys.stderr)
+    finally:
+        if TRANSCRIPT is not None:
+            TRANSCRIPT.close()
+
+
+async def run(args: argparse.Namespace):
+    global TASK_SERVER_URL
+    try:
+        current_project.set(validate_project(args.project))
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+    TASK_SERVER_URL = args.server_url
+
+    if args.command == "serve":
+        try:
+            await serve_mode(args)
+        finally:
+            store.close()
+        return
+
+    if args.command == "batch":
+        try:
+            summary = await batch_mode(args)
+        except OSError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            store.close()
+        print(summary, file=sys.stderr)
+        for message in summary.invalid:
+            print(f"  {message}", file=sys.stderr)
+        if any(s.coalesced for s in SINGLE_FLIGHT.tools.values()):
+            print(SINGLE_FLIGHT.report(), file=sys.stderr)
+        if COMPACTION_STATS.tools:
+            print(COMPACTION_STATS.report(), file=sys.stderr)
+        sys.exit(1 if summary.failed or summary.invalid else 0)
+
+    if args.command:
+        try:
+            run_transfer(args)
+        except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            store.close()
+        return
+
     try:
-        await interactive_mode()
+        await interactive_mode(use_cache=not args.no_cache)
     except Exception as e:
+        from rich.console import Console
+        from rich.panel import Panel
+
         error_panel = Panel(
             f"❌ 予期しないエラーが発生しました: {e}",
             title="致命的エラー",
@@ -584,8 +1226,10 @@ async def main():
             border_style="red",
             padding=(0, 1),
         )
-        console.print(error_panel, file=sys.stderr)
+        Console(stderr=True).print(error_panel)
         sys.exit(1)
+    finally:
+        store.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+"""プロジェクト単位でシャーディングされたタスクストア
+
+プロジェクトごとに別の SQLite ファイルを使うため、書き込みロックはプロジェクト間で
+競合しない。既定プロジェクトは従来どおり ``tasks.db``、それ以外は
+``tasks-<project>.db`` に保存する。
+
+ツール呼び出しの宛先は ``current_project`` (ContextVar) で決まる。ルーターは開いた
+シャードを LRU で保持し、上限を超えた古いシャードから閉じる。
+
+各シャードは専用のスレッドを1本持ち、接続の作成も含めてすべての DB 処理はそのスレッドで
+実行する。``await store.run(fn, ...)`` はイベントループを止めずに ``fn(conn, ...)`` を
+実行し、呼び出し側がキャンセルされたら ``conn.interrupt()`` で実行中の SQL を中断する。
+ディスクが遅い・ロック待ちのシャードがあっても、他のセッションや他のシャードは止まらない。
+"""
+
+import asyncio
+import functools
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_PROJECT = "default"
+PROJECT_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")
+
+current_project: ContextVar[str] = ContextVar("task_project", default=DEFAULT_PROJECT)
+
+
+def validate_project(project: str) -> str:
+    """プロジェクト名を検証（ファイル名に使うため英数字・'-'・'_' のみ許可）"""
+    if not PROJECT_PATTERN.fullmatch(project):
+        raise ValueError(
+            f"無効なプロジェクト名: {project!r}（英数字・'-'・'_' で64文字以内）"
+        )
+    return project
+
+
+class _Shard:
+    """1シャード分の接続と、それを専有するスレッド"""
+
+    __slots__ = ("conn", "executor", "running")
+
+    def __init__(self, project: str) -> None:
+        self.conn: sqlite3.Connection | None = None
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"task-store-{project}"
+        )
+        self.running: object | None = None  # 実行中のジョブ（interrupt の対象確認用）
+
+
+class ShardRouter:
+    """プロジェクト名から SQLite シャードを引き、その専用スレッドで処理を実行する
+
+    ``init`` は各シャードを最初に開いたときに一度だけ呼ばれ、スキーマを作成する。
+    ``factory`` は ``sqlite3.connect()`` に渡す接続クラス。
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        *,
+        init: Callable[[sqlite3.Connection], None] | None = None,
+        factory: type[sqlite3.Connection] = sqlite3.Connection,
+        max_open: int = 8,
+        busy_timeout_ms: int = 5000,
+    ) -> None:
+        self.data_dir = data_dir
+        self.init = init
+        self.factory = factory
+        self.max_open = max_open
+        self.busy_timeout_ms = busy_timeout_ms
+        self._shards: OrderedDict[str, _Shard] = OrderedDict()
+        self._initialized: set[Path] = set()
+        self._lock = threading.Lock()
+
+    def path_for(self, project: str | None = None) -> Path:
+        project = validate_project(project or current_project.get())
+        if project == DEFAULT_PROJECT:
+            return self.data_dir / "tasks.db"
+        return self.data_dir / f"tasks-{project}.db"
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        project: str | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """シャードのスレッドで ``fn(conn, *args, **kwargs)`` を実行して結果を待つ"""
+        project = project or current_project.get()
+        shard = self._shard(project)
+        job = object()
+        future = asyncio.get_running_loop().run_in_executor(
+            shard.executor,
+            functools.partial(self._execute, shard, project, job, fn, args, kwargs),
+        )
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # まだ始まっていなければ run_in_executor 側で取り消される。
+            # 実行中ならこのジョブの SQL だけを中断する
+            if shard.running is job and shard.conn is not None:
+                shard.conn.interrupt()
+            raise
+
+    def call(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        project: str | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """``run()`` の同期版（CLI など、イベントループの外から使う）"""
+        project = project or current_project.get()
+        shard = self._shard(project)
+        future = shard.executor.submit(
+            self._execute, shard, project, object(), fn, args, kwargs
+        )
+        return future.result()
+
+    def _shard(self, project: str) -> _Shard:
+        with self._lock:
+            shard = self._shards.get(project)
+            if shard is not None:
+                self._shards.move_to_end(project)
+                return shard
+
+            self.path_for(project)  # 名前の検証
+            shard = self._shards[project] = _Shard(project)
+            while len(self._shards) > self.max_open:
+                _, oldest = self._shards.popitem(last=False)
+                self._close_shard(oldest, wait=False)
+            return shard
+
+    def _execute(
+        self,
+        shard: _Shard,
+        project: str,
+        job: object,
+        fn: Callable[..., T],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> T:
+        # シャードのスレッド上で実行される
+        if shard.conn is None:
+            shard.conn = self._open(project)
+        shard.running = job
+        try:
+            return fn(shard.conn, *args, **kwargs)
+        finally:
+            shard.running = None
+
+    def _open(self, project: str) -> sqlite3.Connection:
+        path = self.path_for(project)
+        conn = sqlite3.connect(str(path), check_same_thread=False, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        if self.init is not None and path not in self._initialized:
+            self.init(conn)
+            self._initialized.add(path)
+        return conn
+
+    @staticmethod
+    def _close_shard(shard: _Shard, *, wait: bool) -> None:
+        def close() -> None:
+            if shard.conn is not None:
+                shard.conn.close()
+                shard.conn = None
+
+        # 待ち行列に残っているジョブを実行し終えてから閉じる
+        shard.executor.submit(close)
+        shard.executor.shutdown(wait=wait)
+
+    def projects(self) -> list[str]:
+        """データディレクトリにあるプロジェクトの一覧"""
+        found = []
+        for path in sorted(self.data_dir.glob("tasks*.db")):
+            if path.name == "tasks.db":
+                found.append(DEFAULT_PROJECT)
+            elif path.name.startswith("tasks-"):
+                found.append(path.stem.removeprefix("tasks-"))
+        return found
+
+    def close(self) -> None:
+        with self._lock:
+            while self._shards:
+                _, shard = self._shards.popitem()
+                self._close_shard(shard, wait=True)
@@ -0,0 +1,204 @@
+"""タスクの一括インポート・エクスポート（CSV / JSONL）
+
+ファイルは1行ずつ読み書きし、``batch_size`` 件ごとに ``executemany`` で1トランザクション
+として書き込むため、件数に関係なくメモリ使用量は一定。``external_id`` を持つ行は
+upsert されるので、同じファイルを何度インポートしても結果は変わらない（内容が同じ行は
+更新もしないので履歴も増えない）。``external_id`` のない行は毎回新規タスクになる。
+
+列: external_id（任意）, name（必須）, priority（既定: 中）, status（既定: 未着手）
+"""
+
+import csv
+import json
+import sqlite3
+import time
+from collections.abc import Callable, Collection, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+EXPORT_COLUMNS = ["id", "external_id", "name", "priority", "status"]
+FORMATS = ("csv", "jsonl")
+MAX_REPORTED_ERRORS = 20
+
+UPSERT_SQL = """
+    INSERT INTO tasks (external_id, name, priority, status)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (external_id) DO UPDATE SET
+        name = excluded.name,
+        priority = excluded.priority,
+        status = excluded.status
+    WHERE name IS NOT excluded.name
+       OR priority IS NOT excluded.priority
+       OR status IS NOT excluded.status
+"""
+
+
+@dataclass
+class TransferReport:
+    rows: int = 0  # 読み込んだ（書き出した）行数
+    written: int = 0  # 追加・更新された行数
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+    elapsed: float = 0.0
+    exported: bool = False
+
+    @property
+    def unchanged(self) -> int:
+        return self.rows - self.written - self.skipped
+
+    def summary(self) -> str:
+        rate = self.rows / self.elapsed if self.elapsed else 0.0
+        if self.exported:
+            return (
+                f"{self.rows:,} 行を書き出し {self.elapsed:.1f}秒 ({rate:,.0f} 行/秒)"
+            )
+        text = (
+            f"{self.rows:,} 行を処理（書き込み {self.written:,} / 変更なし "
+            f"{self.unchanged:,} / スキップ {self.skipped:,}）{self.elapsed:.1f}秒 "
+            f"({rate:,.0f} 行/秒)"
+        )
+        if self.errors:
+            text += "\n" + "\n".join(self.errors)
+            if self.skipped > len(self.errors):
+                text += f"\n…ほか {self.skipped - len(self.errors)} 件"
+        return text
+
+
+Progress = Callable[[TransferReport], None]
+
+
+def detect_format(path: Path, fmt: str | None = None) -> str:
+    fmt = fmt or path.suffix.lstrip(".").lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"対応していない形式です: {fmt}（{', '.join(FORMATS)}）")
+    return fmt
+
+
+def read_rows(
+    path: Path, fmt: str | None = None
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    """(行番号, 行) を1件ずつ返す"""
+    fmt = detect_format(path, fmt)
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            # strict: 閉じていない引用符を黙って後の行とつなげず、エラーにする
+            reader = csv.DictReader(f, strict=True)
+            try:
+                for row in reader:
+                    yield reader.line_num, row
+            except csv.Error as e:
+                # 壊れた行の後は行の区切りが分からないので、ここで止める。
+                # line_num は読めなかった行を数えないので、その次の行が壊れた行
+                message = f"CSV として読めません（以降の行は読み込みません）: {e}"
+                yield reader.line_num + 1, {"__error__": message}
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = {"__error__": f"JSON として読めません: {e}"}
+                if not isinstance(row, dict):
+                    row = {"__error__": "JSON オブジェクトではありません"}
+                yield line_no, row
+
+
+def _normalize(
+    row: dict[str, Any], statuses: Collection[str], priorities: Collection[str]
+) -> tuple[str | None, str, str, str] | str:
+    """DB に書く値のタプル、またはエラーメッセージを返す"""
+    if "__error__" in row:
+        return row["__error__"]
+    name = str(row.get("name") or "").strip()
+    if not name:
+        return "name がありません"
+    priority = str(row.get("priority") or "中").strip()
+    if priority not in priorities:
+        return f"優先度が不正です: {priority}"
+    status = str(row.get("status") or "未着手").strip()
+    if status not in statuses:
+        return f"ステータスが不正です: {status}"
+    external_id = row.get("external_id")
+    external_id = str(external_id).strip() if external_id not in (None, "") else None
+    return external_id, name, priority, status
+
+
+def import_tasks(
+    conn: sqlite3.Connection,
+    path: Path,
+    *,
+    statuses: Collection[str],
+    priorities: Collection[str],
+    fmt: str | None = None,
+    batch_size: int = 5000,
+    progress: Progress | None = None,
+) -> TransferReport:
+    """ファイルからタスクを upsert する（batch_size 件ごとにコミット）"""
+    report = TransferReport()
+    started = time.perf_counter()
+    batch: list[tuple[str | None, str, str, str]] = []
+
+    def flush() -> None:
+        with conn:
+            # rowcount はトリガー内の書き込みを含まず、内容が同じ行の upsert は 0 件
+            report.written += conn.executemany(UPSERT_SQL, batch).rowcount
+        batch.clear()
+        report.elapsed = time.perf_counter() - started
+        if progress is not None:
+            progress(report)
+
+    for line_no, row in read_rows(path, fmt):
+        report.rows += 1
+        values = _normalize(row, statuses, priorities)
+        if isinstance(values, str):
+            report.skipped += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                report.errors.append(f"{line_no} 行目: {values}")
+            continue
+        batch.append(values)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def export_tasks(
+    conn: sqlite3.Connection,
+    path: Path,
+    *,
+    fmt: str | None = None,
+    batch_size: int = 5000,
+    progress: Progress | None = None,
+) -> TransferReport:
+    """全タスクを ID 順にファイルへ書き出す"""
+    fmt = detect_format(path, fmt)
+    report = TransferReport(exported=True)
+    started = time.perf_counter()
+    cursor = conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM tasks ORDER BY id")
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer is not None:
+            writer.writerow(EXPORT_COLUMNS)
+        while rows := cursor.fetchmany(batch_size):
+            if writer is not None:
+                writer.writerows(tuple(row) for row in rows)
+            else:
+                f.writelines(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False)
+                    + "\n"
+                    for row in rows
+                )
+            report.rows += len(rows)
+            report.elapsed = time.perf_counter() - started
+            if progress is not None:
+                progress(report)
+
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -6,36 +6,87 @@
 #   "pyyaml",
 #   "pytz",
 #   "beautifulsoup4",
+#   "markdownify",
 # ]
 # ///
 
+import codecs
+import os
+import queue
+import re
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import requests
 import yaml
 from datetime import datetime
 import pytz
 import argparse
-from urllib.parse import urlparse, unquote
-from bs4 import BeautifulSoup
-
-
-parser = argparse.ArgumentParser(
-    description="Fetch and convert web content to markdown"
+from urllib.parse import urljoin, urlparse, unquote
+from bs4 import BeautifulSoup, Tag
+from markdownify import MarkdownConverter
+from requests.compat import chardet
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/117.0.0.0 Safari/537.36"
 )
-parser.add_argument("url", help="URL to fetch")
-parser.add_argument(
-    "--debug", action="store_true", help="Enable debug mode to show response headers"
+ENGINES = ("local", "jina")
+
+# 本文とみなす要素（先に見つかったものを使う）
+MAIN_SELECTORS = ["main", "article", "[role=main]", "#content", ".content"]
+# 本文の外にある要素（ナビゲーションなど）は変換前に取り除く
+NOISE_SELECTORS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    "form",
+    "button",
+    "nav",
+    "footer",
+    "aside",
+    "img",
+    "picture",
+    "[role=navigation]",
+    "[aria-hidden=true]",
+]
+# ページ全体のヘッダー。本文の要素が見つかったときは、その外側ごと捨てられるので
+# 取り除かない（<article><header><h1> の見出しを残すため）
+PAGE_CHROME_SELECTORS = ["header", "[role=banner]"]
+# これより短い本文しか取れなければ、JS で描画するページとみなして Jina に任せる
+MIN_LOCAL_CHARS = 200
+# 直取得がこの秒数で終わらなければ Jina も並行して始める
+DEFAULT_HEDGE_DELAY = 5.0
+CHUNK_SIZE = 64 * 1024
+CHARSET_IN_HEADER = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+# <meta charset="..."> と <meta http-equiv="Content-Type" content="...; charset=...">
+CHARSET_IN_META = re.compile(
+    rb"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE
 )
+META_SCAN_BYTES = 4096
 
-args = parser.parse_args()
-url = args.url
+debug = False
 
 
 def dprint(msg: str):
-    if args.debug:
+    if debug:
         print(msg, file=sys.stderr)
 
 
+class UnusableContent(Exception):
+    """取得はできたが、そのままでは使えない内容だった"""
+
+
+class FetchCancelled(Exception):
+    """ヘッジで負けた側の取得を打ち切った"""
+
+
 # タイトルを元のHTMLページから取得
 def fetch_html_title(original_url: str, debug: bool = False):
     try:
@@ -45,13 +96,7 @@ def fetch_html_title(original_url: str, debug: bool = False):
         html_response = requests.get(
             original_url,
             timeout=20,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/117.0.0.0 Safari/537.36"
-                )
-            },
+            headers={"User-Agent": USER_AGENT},
         )
         html_response.raise_for_status()
         html_response.encoding = html_response.apparent_encoding
@@ -152,24 +197,61 @@ def is_probably_text_url(u: str) -> bool:
     )
 
 
-def fetch_direct(u: str):
-    resp = requests.get(
-        u,
-        timeout=30,
-        headers={
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/117.0.0.0 Safari/537.36"
-            )
-        },
+def is_html(content_type: str) -> bool:
+    ct = content_type.lower()
+    return "text/html" in ct or "html;" in ct
+
+
+def http_get_text(u: str, *, headers: dict, timeout: float, cancel=None):
+    """GET して (本文, レスポンスヘッダー) を返す
+
+    本文は少しずつ読み、``cancel`` (threading.Event) がセットされたら打ち切る。
+    文字コードは ``decode_body`` で決める。
+    """
+    with requests.get(u, headers=headers, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        data = bytearray()
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            if cancel is not None and cancel.is_set():
+                raise FetchCancelled(u)
+            data += chunk
+        response_headers = resp.headers
+    body = decode_body(bytes(data), response_headers.get("Content-Type", ""))
+    return body, response_headers
+
+
+def _known_codec(name: str | None) -> str | None:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def decode_body(data: bytes, content_type: str) -> str:
+    """Content-Type の charset、HTML の <meta charset>、本文からの推定の順で文字コードを決める
+
+    推定は短い本文や ASCII がほとんどの本文で外れやすいので、宣言があればそれに従う。
+    """
+    match = CHARSET_IN_HEADER.search(content_type)
+    encoding = _known_codec(match.group(1) if match else None)
+    if encoding is None and is_html(content_type):
+        match = CHARSET_IN_META.search(data[:META_SCAN_BYTES])
+        encoding = _known_codec(match.group(1).decode("ascii") if match else None)
+    if encoding is None and chardet:
+        encoding = _known_codec(chardet.detect(data)["encoding"])
+    return data.decode(encoding or "utf-8", errors="replace")
+
+
+def fetch_direct(u: str, cancel=None):
+    text, headers = http_get_text(
+        u, headers={"User-Agent": USER_AGENT}, timeout=30, cancel=cancel
     )
-    resp.raise_for_status()
-    resp.encoding = resp.apparent_encoding
-    return resp.text, resp.headers.get("Content-Type", "")
+    return text, headers.get("Content-Type", "")
 
 
-def fetch_via_jina(u: str) -> str:
+def fetch_via_jina(u: str, cancel=None) -> str:
     jina_url = f"https://r.jina.ai/{u}"
     dprint(f"=== Using Jina Reader AI for {jina_url} ===")
     headers = {
@@ -177,78 +259,320 @@ def fetch_via_jina(u: str) -> str:
         "X-Retain-Images": "none",
         "X-Return-Format": "markdown",
     }
-    r = requests.get(jina_url, headers=headers, timeout=60)
-    r.raise_for_status()
-    if args.debug:
+    text, response_headers = http_get_text(
+        jina_url, headers=headers, timeout=60, cancel=cancel
+    )
+    if debug:
         dprint(f"=== Response Headers for {jina_url} ===")
-        for key, value in r.headers.items():
+        for key, value in response_headers.items():
             dprint(f"{key}: {value}")
         dprint("=" * 50)
-    return r.text.strip()
+    return text.strip()
+
+
+def _code_language(el: Tag) -> str | None:
+    # <pre><code class="language-python"> / <pre class="lang-py"> など
+    for node in (el, el.find("code")):
+        if not isinstance(node, Tag):
+            continue
+        for cls in node.get("class") or []:
+            for prefix in ("language-", "lang-"):
+                if cls.startswith(prefix):
+                    return cls[len(prefix) :]
+    return None
 
 
-# 1) コンテンツ取得（テキスト直取得 or Jina）
-markdown = None
-fetched_as_text = False
-try:
+def _decompose_all(root: Tag, selectors: list[str]) -> None:
+    # セレクタごとに木をたどると大きなページで遅いので、まとめて1回で探す
+    for el in root.select(", ".join(selectors)):
+        if not el.decomposed:
+            el.decompose()
+
+
+def extract_main(soup: BeautifulSoup) -> Tag:
+    """ナビゲーション等を除いた本文の要素を返す"""
+    _decompose_all(soup, NOISE_SELECTORS)
+    for selector in MAIN_SELECTORS:
+        for found in soup.select(selector):
+            # サイトのヘッダー内の .content などは本文ではない
+            in_chrome = any(
+                parent.name == "header" or parent.get("role") == "banner"
+                for parent in found.parents
+            )
+            if not in_chrome and found.get_text(strip=True):
+                return found
+    body = soup.body or soup
+    _decompose_all(body, PAGE_CHROME_SELECTORS)
+    return body
+
+
+def convert_html(html: str, base_url: str) -> tuple[str | None, str]:
+    """HTML から (タイトル, 本文の Markdown) を作る
+
+    ネットワークにもグローバル状態にも触れないので、プロセスプールからも呼べる。
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    title_tag = soup.find("title")
+    title = title_tag.get_text(strip=True) if title_tag else None
+
+    main = extract_main(soup)
+    for a in main.find_all("a", href=True):
+        a["href"] = urljoin(base_url, a["href"])
+
+    converter = MarkdownConverter(
+        heading_style="ATX", bullets="-", code_language_callback=_code_language
+    )
+    markdown = converter.convert_soup(main)
+    markdown = re.sub(r"[ \t]+\n", "\n", markdown)
+    markdown = re.sub(r"\n{3,}", "\n\n", markdown).strip()
+    return title or None, markdown
+
+
+def _convert_page(page: tuple[str, str]) -> tuple[str | None, str]:
+    return convert_html(*page)
+
+
+def convert_pages(
+    pages: list[tuple[str, str]], workers: int = 1
+) -> list[tuple[str | None, str]]:
+    """(HTML, URL) の列をまとめて変換する。workers > 1 ならプロセスプールで並列に"""
+    if workers <= 1 or len(pages) <= 1:
+        return [convert_html(html, u) for html, u in pages]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1ページでも十分大きな仕事なので、均等に配るため1件ずつ渡す
+        return list(pool.map(_convert_page, pages))
+
+
+def benchmark(files: list[Path], workers: int, repeat: int) -> None:
+    """保存済みの HTML ファイルでローカル変換のスループットを測る（ネットワークなし）"""
+    pages = [
+        (f.read_text(encoding="utf-8", errors="replace"), f.resolve().as_uri())
+        for f in files
+    ] * repeat
+    size_mb = sum(len(html.encode("utf-8")) for html, _ in pages) / 1e6
+    print(f"{len(pages)} pages, {size_mb:.1f} MB of HTML")
+    for n in sorted({1, workers}):
+        started = time.perf_counter()
+        converted = convert_pages(pages, n)
+        elapsed = time.perf_counter() - started
+        chars = sum(len(markdown) for _, markdown in converted)
+        print(
+            f"workers={n:<3} {elapsed:7.2f} s  {len(pages) / elapsed:8.1f} pages/s  "
+            f"{size_mb / elapsed:7.2f} MB/s  ({chars:,} chars of Markdown)"
+        )
+
+
+def fetch_via_local(u: str, cancel=None) -> tuple[str | None, str]:
+    """HTML を直接取得してこのプロセス内で Markdown に変換する"""
+    dprint(f"=== Converting {u} locally ===")
+    body, content_type = fetch_direct(u, cancel)
+    if not is_html(content_type):
+        return None, body.strip()
+    return convert_checked(body, u)
+
+
+def convert_checked(html: str, u: str) -> tuple[str | None, str]:
+    title, markdown = convert_html(html, u)
+    if len(markdown) < MIN_LOCAL_CHARS:
+        # JS で描画するページなど
+        raise UnusableContent(f"only {len(markdown)} characters of content extracted")
+    return title, markdown
+
+
+def fetch_primary(url: str, engine: str, cancel=None) -> tuple[str, str | None, bool]:
+    """Jina を使わない取得（テキスト直取得 / ローカル変換）"""
     if is_probably_text_url(url):
         dprint(f"=== Directly fetching text-like URL: {url} ===")
-        body, content_type = fetch_direct(url)
-        ct = content_type.lower()
-        # HTMLが返ってきたらJinaにフォールバック
-        if "text/html" in ct or "html;" in ct:
-            dprint("Content-Type indicates HTML; falling back to Jina")
-            markdown = fetch_via_jina(url)
-        else:
+        body, content_type = fetch_direct(url, cancel)
+        if not is_html(content_type):
             markdown = body.strip()
-            fetched_as_text = True
-            if args.debug:
-                dprint(f"Content length: {len(markdown)}")
-    else:
-        markdown = fetch_via_jina(url)
-except requests.RequestException as e:
-    # 直取得が失敗した場合はJinaへフォールバック
-    dprint(f"Direct fetch failed: {e}; trying Jina")
-    markdown = fetch_via_jina(url)
-
-
-# 2) タイトル取得
-if args.debug:
-    dprint("=== Extracting title ===")
-
-try:
-    if fetched_as_text:
-        # テキストファイルの場合はMarkdownから、またはURLパスから
-        title = extract_title_from_markdown(markdown, url)
-    else:
-        # HTMLページの場合はまずHTMLから、失敗したらMarkdownから
-        title = fetch_html_title(url, args.debug) or extract_title_from_markdown(
-            markdown, url
-        )
-    if args.debug:
-        dprint(f"=== Extracted title: {title} ===")
-except Exception as e:
-    if args.debug:
-        dprint(f"=== Error extracting title: {e} ===")
-    title = "Error extracting title"
+            dprint(f"Content length: {len(markdown)}")
+            return markdown, None, True
+        if engine != "local":
+            raise UnusableContent("Content-Type indicates HTML")
+        title, markdown = convert_checked(body, url)
+        return markdown, title, False
+
+    title, markdown = fetch_via_local(url, cancel)
+    return markdown, title, False
+
+
+def hedged(primary, secondary, delay: float):
+    """primary を始め、delay 秒で終わらなければ secondary も始めて、先に成功した方を返す
+
+    primary が先に失敗したら、待たずに secondary を始める。delay が負ならヘッジせず、
+    primary が失敗したときだけ secondary を実行する。どちらも ``fn(cancel)`` の形で
+    呼ばれ、勝負がついたら負けた側は ``cancel`` で打ち切られる。スレッドは daemon
+    なので、接続待ちのまま止まっていても終了は待たない。
+    """
+    results: queue.Queue = queue.Queue()
+    cancel = threading.Event()
+    started = time.monotonic()
+
+    def start(name: str, fn) -> None:
+        def run() -> None:
+            try:
+                results.put((name, fn(cancel), None))
+            except Exception as e:
+                results.put((name, None, e))
+
+        threading.Thread(target=run, name=f"fetch-{name}", daemon=True).start()
+
+    start("primary", primary)
+    pending, hedge_started, error = 1, False, None
+    while pending:
+        timeout = None
+        if not hedge_started and delay >= 0:
+            timeout = max(0.0, started + delay - time.monotonic())
+        try:
+            name, value, exc = results.get(timeout=timeout)
+        except queue.Empty:
+            dprint(f"No result after {delay}s; starting Jina as a hedge")
+            start("jina", secondary)
+            pending, hedge_started = pending + 1, True
+            continue
+
+        pending -= 1
+        elapsed = time.monotonic() - started
+        if exc is None:
+            dprint(f"=== {name} won after {elapsed:.2f}s ===")
+            cancel.set()
+            return value
+        if not isinstance(exc, (requests.RequestException, UnusableContent)):
+            cancel.set()
+            raise exc
+        dprint(f"{name} failed after {elapsed:.2f}s: {exc}")
+        error = exc
+        if not hedge_started:
+            start("jina", secondary)
+            pending, hedge_started = pending + 1, True
+    raise error
+
+
+def fetch_content(
+    url: str, engine: str, hedge_delay: float = DEFAULT_HEDGE_DELAY
+) -> tuple[str, str | None, bool]:
+    """(Markdown, HTML から取れたタイトル, テキストとして直取得したか) を返す
+
+    直取得（テキスト / ローカル変換）と Jina をヘッジして、先に使える結果を返す。
+    """
+
+    def jina(cancel):
+        return fetch_via_jina(url, cancel), None, False
+
+    if engine == "jina" and not is_probably_text_url(url):
+        return jina(None)
+    return hedged(lambda cancel: fetch_primary(url, engine, cancel), jina, hedge_delay)
+
+
+def build_document(url: str, markdown: str, title: str) -> str:
+    jst = pytz.timezone("Asia/Tokyo")
+    updated_at = datetime.now(jst).isoformat()
+
+    frontmatter_data = {
+        "title": title,
+        "url": url,
+        "updated_at": updated_at,
+    }
+    frontmatter = yaml.dump(
+        frontmatter_data, default_flow_style=False, allow_unicode=True
+    ).strip()
+    return f"---\n{frontmatter}\n---\n\n{markdown}"
 
 
-# 3) Frontmatter を付与して出力
-jst = pytz.timezone("Asia/Tokyo")
-updated_at = datetime.now(jst).isoformat()
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Fetch and convert web content to markdown"
+    )
+    parser.add_argument("url", nargs="?", help="URL to fetch")
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="local",
+        help=(
+            "HTML to Markdown conversion: 'local' converts in-process and falls "
+            "back to r.jina.ai when it fails, 'jina' always uses r.jina.ai"
+        ),
+    )
+    parser.add_argument(
+        "--hedge-delay",
+        type=float,
+        default=DEFAULT_HEDGE_DELAY,
+        metavar="SECONDS",
+        help=(
+            "start r.jina.ai in parallel if the direct fetch has not finished "
+            "after this many seconds and use whichever succeeds first "
+            "(0: start both at once, negative: only after the direct fetch fails; "
+            f"default: {DEFAULT_HEDGE_DELAY})"
+        ),
+    )
+    parser.add_argument(
+        "--benchmark",
+        nargs="+",
+        type=Path,
+        metavar="HTML_FILE",
+        help="measure local conversion throughput on saved HTML files instead of fetching",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="process pool size for --benchmark (compared against 1 worker)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="convert every --benchmark file N times"
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Enable debug mode to show response headers",
+    )
+    args = parser.parse_args(argv)
+    if (args.url is None) == (args.benchmark is None):
+        parser.error("give either a URL or --benchmark HTML_FILE...")
+    return args
+
+
+def main() -> None:
+    global debug
+    args = parse_args()
+    debug = args.debug
+    if args.benchmark:
+        benchmark(args.benchmark, max(1, args.workers), max(1, args.repeat))
+        return
+    url = args.url
+
+    # 1) コンテンツ取得（テキスト直取得 / ローカル変換 / Jina）
+    markdown, html_title, fetched_as_text = fetch_content(
+        url, args.engine, args.hedge_delay
+    )
 
-frontmatter_data = {
-    "title": title,
-    "url": url,
-    "updated_at": updated_at,
-}
-frontmatter = yaml.dump(
-    frontmatter_data, default_flow_style=False, allow_unicode=True
-).strip()
+    # 2) タイトル取得
+    dprint("=== Extracting title ===")
+    try:
+        if fetched_as_text:
+            # テキストファイルの場合はMarkdownから、またはURLパスから
+            title = extract_title_from_markdown(markdown, url)
+        else:
+            # HTMLページの場合はまずHTMLから、失敗したらMarkdownから
+            # （ローカル変換なら取得済みの HTML のタイトルを使い、再取得しない）
+            title = (
+                html_title
+                or fetch_html_title(url, debug)
+                or extract_title_from_markdown(markdown, url)
+            )
+        dprint(f"=== Extracted title: {title} ===")
+    except Exception as e:
+        dprint(f"=== Error extracting title: {e} ===")
+        title = "Error extracting title"
 
-output = f"---\n{frontmatter}\n---\n\n{markdown}"
-if args.debug:
+    # 3) Frontmatter を付与して出力
+    output = build_document(url, markdown, title)
     dprint(f"Final output length: {len(output)}")
     dprint(f"Title: {title}")
-print(output)
-sys.stdout.flush()
+    print(output)
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()